@@ -16,6 +16,11 @@ import app.models.user
 import app.models.lesson
 import app.models.feed_item
 import app.models.user_progress
+import app.models.user_feed
+import app.models.ingestion_job
+import app.models.quiz
+import app.models.refresh_token
+from app.models.lesson import SEARCH_DB_OBJECTS
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -33,6 +38,13 @@ if config.config_file_name is not None:
 # target_metadata = None
 target_metadata = Base.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Database-managed objects with no model counterpart
+    if reflected and compare_to is None and name in SEARCH_DB_OBJECTS:
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -59,6 +71,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -86,7 +99,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
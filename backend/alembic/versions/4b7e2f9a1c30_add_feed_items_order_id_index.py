@@ -0,0 +1,27 @@
+"""add feed_items (order, id) index
+
+Revision ID: 4b7e2f9a1c30
+Revises: 987654321000
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e2f9a1c30'
+down_revision: Union[str, None] = '987654321000'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Composite index backing keyset pagination on GET /feed
+    op.create_index('ix_feed_items_order_id', 'feed_items', ['order', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_feed_items_order_id', table_name='feed_items')
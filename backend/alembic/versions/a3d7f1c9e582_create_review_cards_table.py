@@ -0,0 +1,46 @@
+"""create review_cards table
+
+Revision ID: a3d7f1c9e582
+Revises: f6b2d8e4a915
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d7f1c9e582'
+down_revision: Union[str, None] = 'f6b2d8e4a915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('review_cards',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('lesson_id', sa.Integer(), nullable=False),
+    sa.Column('ease', sa.Float(), nullable=False),
+    sa.Column('interval_days', sa.Float(), nullable=False),
+    sa.Column('repetitions', sa.Integer(), nullable=False),
+    sa.Column('lapses', sa.Integer(), nullable=False),
+    sa.Column('due_at', sa.DateTime(), nullable=False),
+    sa.Column('last_reviewed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['lesson_id'], ['lessons.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'lesson_id')
+    )
+    op.create_index('ix_review_cards_user_due', 'review_cards', ['user_id', 'due_at'], unique=False)
+    # Lessons already completed enter the queue as if completed now
+    op.execute("""
+        INSERT INTO review_cards (user_id, lesson_id, ease, interval_days, repetitions, lapses, due_at)
+        SELECT user_id, lesson_id, 2.5, 1, 0, 0, (now() AT TIME ZONE 'utc') + interval '1 day'
+        FROM user_progress WHERE completed
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_review_cards_user_due', table_name='review_cards')
+    op.drop_table('review_cards')
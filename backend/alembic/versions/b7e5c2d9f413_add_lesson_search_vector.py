@@ -0,0 +1,42 @@
+"""add lesson full-text search vector and trigram title index
+
+Revision ID: b7e5c2d9f413
+Revises: d4f1a8c3e267
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e5c2d9f413'
+down_revision: Union[str, None] = 'd4f1a8c3e267'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Title terms outrank body terms; bodies are capped well below tsvector's 1 MB limit.
+    # Adding a STORED column rewrites the table, so run this in a maintenance window on large catalogs.
+    op.execute("""
+        ALTER TABLE lessons ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english'::regconfig, left(coalesce(content, ''), 200000)), 'B')
+        ) STORED
+    """)
+    op.create_index('ix_lessons_search_vector', 'lessons', ['search_vector'], postgresql_using='gin')
+    op.create_index(
+        'ix_lessons_title_trgm', 'lessons', ['title'],
+        postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_lessons_title_trgm', table_name='lessons')
+    op.drop_index('ix_lessons_search_vector', table_name='lessons')
+    op.drop_column('lessons', 'search_vector')
@@ -0,0 +1,38 @@
+"""add user_progress (user_id, lesson_id) unique index
+
+Revision ID: d4f1a8c3e267
+Revises: 9a2c6d1e8b47
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f1a8c3e267'
+down_revision: Union[str, None] = '9a2c6d1e8b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Collapse duplicates first: keep the oldest row, completed if any duplicate was
+    op.execute("""
+        UPDATE user_progress AS p SET completed = true
+        WHERE p.completed IS NOT TRUE AND EXISTS (
+            SELECT 1 FROM user_progress AS q
+            WHERE q.user_id = p.user_id AND q.lesson_id = p.lesson_id AND q.completed
+        )
+    """)
+    op.execute("""
+        DELETE FROM user_progress AS a USING user_progress AS b
+        WHERE a.user_id = b.user_id AND a.lesson_id = b.lesson_id AND a.id > b.id
+    """)
+    op.create_index('uq_user_progress_user_lesson', 'user_progress', ['user_id', 'lesson_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_user_progress_user_lesson', table_name='user_progress')
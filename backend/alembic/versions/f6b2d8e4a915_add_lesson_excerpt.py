@@ -0,0 +1,38 @@
+"""add lessons.excerpt
+
+Revision ID: f6b2d8e4a915
+Revises: e3a9c5f1d702
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b2d8e4a915'
+down_revision: Union[str, None] = 'e3a9c5f1d702'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('lessons', sa.Column('excerpt', sa.String(length=281), nullable=True))
+    # Same rule as app.models.lesson.make_excerpt (280 chars, cut at a word
+    # boundary); only the first 1120 chars of each body are read
+    op.execute("""
+        UPDATE lessons SET excerpt = CASE
+            WHEN length(s.flat) <= 280 THEN s.flat
+            ELSE rtrim(regexp_replace(left(s.flat, 281), '\\s\\S*$', ''), ' ,.;:') || '…'
+        END
+        FROM (
+            SELECT id, btrim(regexp_replace(left(content, 1120), '\\s+', ' ', 'g')) AS flat FROM lessons
+        ) AS s
+        WHERE lessons.id = s.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('lessons', 'excerpt')
@@ -1,11 +1,97 @@
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.security import require_role
 from app.api.deps import require_role
+from app.db.session import SessionLocal, get_async_db
+from app.models.ingestion_job import IngestionJob
+from app.services.ingestion_service import IngestionService
+from app.services.job_queue import job_queue
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+admin_only = require_role(["super admin", "admin"])
+
 @router.get("/stats")
 # Requirement: Only 'super admin' and 'admin' can access
-def get_admin_stats(current_user = Depends(require_role(["super admin", "admin"]))):
+async def get_admin_stats(current_user = Depends(admin_only)):
     return {"status": "success", "data": "Admin Dashboard Statistics"}
+
+
+class IngestionRequest(BaseModel):
+    source: str  # path to a JSONL/CSV file readable by the API server
+    format: str = "jsonl"
+    batch_size: int | None = None
+
+
+def serialize_job(job: IngestionJob) -> dict:
+    return {
+        "id": job.id,
+        "source": job.source,
+        "format": job.format,
+        "status": job.status,
+        "rows_committed": job.rows_committed,
+        "rows_rejected": job.rows_rejected,
+        "error": job.error,
+    }
+
+
+async def _queue_ingestion(job_id: int, batch_size: int | None, user_id: int) -> str:
+    # One queued run per ingestion job; a second start/resume returns the same queue job
+    queued, _ = await job_queue.enqueue(
+        "run_ingestion",
+        {"job_id": job_id, "batch_size": batch_size},
+        dedup_key=f"ingestion:{job_id}",
+        user_id=user_id,
+    )
+    return queued["id"]
+
+
+def _create_job(source: str, fmt: str) -> dict:
+    db = SessionLocal()
+    try:
+        return serialize_job(IngestionService().create_job(db, source, fmt))
+    finally:
+        db.close()
+
+
+@router.post("/ingestions", status_code=202)
+async def start_ingestion(
+    body: IngestionRequest,
+    current_user = Depends(admin_only),
+):
+    try:
+        job = await run_in_threadpool(_create_job, body.source, body.format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    job["queue_job_id"] = await _queue_ingestion(job["id"], body.batch_size, current_user.id)
+    return job
+
+
+@router.post("/ingestions/{job_id}/resume", status_code=202)
+async def resume_ingestion(
+    job_id: int,
+    batch_size: int | None = None,
+    current_user = Depends(admin_only),
+    db: AsyncSession = Depends(get_async_db),
+):
+    job = await db.get(IngestionJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    if job.status == "running":
+        raise HTTPException(status_code=409, detail="Ingestion job is already running")
+    return {**serialize_job(job), "queue_job_id": await _queue_ingestion(job_id, batch_size, current_user.id)}
+
+
+@router.get("/ingestions/{job_id}")
+async def get_ingestion(
+    job_id: int,
+    current_user = Depends(admin_only),
+    db: AsyncSession = Depends(get_async_db),
+):
+    job = await db.get(IngestionJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return serialize_job(job)
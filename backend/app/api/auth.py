@@ -1,64 +1,68 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Request
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from app.db.session import get_db
+from app.api.users import UserOut
+from app.db.session import get_async_db
 from app.models.user import User
-from app.core.security import create_access_token, verify_password, get_password_hash
+from app.core.hashing import password_hasher
+from app.core.rate_limit import rate_limit
+from app.services.token_service import InvalidRefreshToken, RefreshInProgress, TokenPair, token_service
 from app.core.config import settings
-from authlib.integrations.starlette_client import OAuth
-import os
-import httpx 
+from app.services.oidc_service import STATE_TTL, OIDCError, OIDCIdentity, oidc_client
+from sqlalchemy.exc import IntegrityError
+from urllib.parse import urlencode
 import logging
-# Set insecure transport for Docker/Proxy env
-os.environ['AUTHLIB_INSECURE_TRANSPORT'] = '1'
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 router = APIRouter()
-# --- OAuth Setup ---
-oauth = OAuth()
-oauth.register(
-    name='google',
-    client_id=settings.GOOGLE_CLIENT_ID,
-    client_secret=settings.GOOGLE_CLIENT_SECRET,
-    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-    client_kwargs={'scope': 'openid email profile'}
-)
-oauth.register(
-    name='microsoft',
-    client_id=settings.MICROSOFT_CLIENT_ID,
-    client_secret=settings.MICROSOFT_CLIENT_SECRET,
-    server_metadata_url='https://login.microsoftonline.com/common/v2.0/.well-known/openid-configuration',
-    client_kwargs={'scope': 'User.Read'}
-)
-# -------------------
 class AuthRequest(BaseModel):
     email: str
     password: str
 class UserCreate(BaseModel):
     email: str
     password: str
-@router.post("/login")
-def login(request: AuthRequest, db: Session = Depends(get_db)):
+class RefreshRequest(BaseModel):
+    refresh_token: str
+class OAuthCodeRequest(BaseModel):
+    code: str
+class TokenResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    expires_in: int
+    token_type: str = "bearer"
+    user: UserOut
+class RefreshResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    expires_in: int
+    token_type: str = "bearer"
+class RegisterResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    expires_in: int
+    msg: str
+    user: UserOut
+@router.post("/login", response_model=TokenResponse, dependencies=[Depends(rate_limit("login"))])
+async def login(request: AuthRequest, db: AsyncSession = Depends(get_async_db)):
     normalized_email = request.email.lower().strip()
-    user = db.query(User).filter(User.email == normalized_email).first()
-    if not user or not verify_password(request.password, user.hashed_password):
+    # bcrypt runs in the password hashing pool, never on the event loop
+    user = await _get_user_by_email(db, normalized_email)
+    if not user or not await password_hasher.verify(request.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    access_token = create_access_token(user_id=user.id, role=user.role)
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user": {
-            "id": user.id,
-            "email": user.email,
-            "role": user.role
-        }
-    }
-@router.post("/register")
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
+    tokens = await token_service.issue(db, user.id, user.role)
+    return TokenResponse(
+        access_token=tokens.access_token,
+        refresh_token=tokens.refresh_token,
+        expires_in=tokens.expires_in,
+        user=UserOut(id=user.id, email=user.email, role=user.role),
+    )
+@router.post("/register", response_model=RegisterResponse, dependencies=[Depends(rate_limit("register"))])
+async def register(user_in: UserCreate, db: AsyncSession = Depends(get_async_db)):
     normalized_email = user_in.email.lower().strip()
     
-    if db.query(User).filter(User.email == normalized_email).first():
+    if await _get_user_by_email(db, normalized_email):
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists."
@@ -66,110 +70,147 @@ def register(user_in: UserCreate, db: Session = Depends(get_db)):
     
     user = User(
         email=normalized_email,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await password_hasher.hash(user_in.password),
         role="user", 
         is_active=True
     )
+    await _save_user(db, user)
+    tokens = await token_service.issue(db, user.id, user.role)
+    return RegisterResponse(
+        access_token=tokens.access_token,
+        refresh_token=tokens.refresh_token,
+        expires_in=tokens.expires_in,
+        msg="Registration successful",
+        user=UserOut(id=user.id, email=user.email, role=user.role),
+    )
+@router.post("/refresh", response_model=RefreshResponse, dependencies=[Depends(rate_limit("refresh"))])
+async def refresh(body: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    # Rotates the refresh token; no password check, so no bcrypt
+    try:
+        tokens = await token_service.rotate(db, body.refresh_token)
+    except RefreshInProgress:
+        # Another request is exchanging the same token right now; retrying returns its pair
+        raise HTTPException(status_code=409, detail="Refresh already in progress", headers={"Retry-After": "1"})
+    except InvalidRefreshToken:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return RefreshResponse(
+        access_token=tokens.access_token,
+        refresh_token=tokens.refresh_token,
+        expires_in=tokens.expires_in,
+    )
+@router.post("/logout", status_code=204)
+async def logout(body: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    # Outstanding access tokens stay valid until they expire (ACCESS_TOKEN_EXPIRE_MINUTES)
+    await token_service.revoke(db, body.refresh_token)
+async def _get_user_by_email(db: AsyncSession, email: str):
+    return (await db.execute(select(User).where(User.email == email))).scalar_one_or_none()
+async def _save_user(db: AsyncSession, user: User):
     db.add(user)
-    db.commit()
-    db.refresh(user)
-    access_token = create_access_token(user_id=user.id, role=user.role)
-    return {
-        "access_token": access_token,
-        "msg": "Registration successful", 
-        "user": {
-            "id": user.id,
-            "email": user.email,
-            "role": user.role
-        }
-    }
-# --- OAUTH ROUTES (MANUAL IMPLEMENTATION) ---
-@router.get("/google")
-async def google_login(request: Request):
+    await db.commit()
+    await db.refresh(user)
+async def _frontend_callback_url(tokens: TokenPair) -> str:
+    # Only a one-time code goes through the browser (history, access logs,
+    # Referer); the frontend exchanges it at POST /auth/oauth/token
+    return f"{settings.FRONTEND_URL}/auth/callback?{urlencode({'code': await token_service.stash(tokens)})}"
+# --- OAUTH ROUTES ---
+# Code exchange and ID token verification go through oidc_service (pooled HTTP
+# client, cached discovery/JWKS); the DB work below runs on the AsyncSession
+GOOGLE_CALLBACK = "/auth/complete/google-oauth2/"
+MICROSOFT_CALLBACK = "/auth/microsoft/callback"
+_PROVIDER_COLUMNS = {"google": User.google_id, "microsoft": User.microsoft_id}
+# Binds the OAuth state to the browser that started the login (login CSRF);
+# SameSite=Lax still sends it on the provider's top-level redirect back
+STATE_COOKIE = "oidc_state"
+STATE_COOKIE_PATH = "/auth"
+async def _oauth_login_redirect(provider: str, callback: str) -> RedirectResponse:
     try:
-        # [MODIFIED FOR LOCAL DEV]
-        # Changed hardcoded URL to use dynamic settings.API_BASE_URL
-        redirect_uri = f"{settings.API_BASE_URL}/auth/complete/google-oauth2/"
-        return await oauth.google.authorize_redirect(request, redirect_uri)
-    except Exception as e:
-         logger.error(f"Google Login Start Error: {str(e)}")
-         raise HTTPException(status_code=500, detail="Could not start Google Login")
-@router.get("/complete/google-oauth2/")
-async def google_auth(request: Request, db: Session = Depends(get_db)):
+        url, binding = await oidc_client.authorization_url(provider, f"{settings.API_BASE_URL}{callback}")
+    except OIDCError as e:
+        logger.error(f"{provider} login start error: {e}")
+        raise HTTPException(status_code=503, detail=f"Could not start {provider.capitalize()} login")
+    response = RedirectResponse(url)
+    response.set_cookie(
+        STATE_COOKIE,
+        binding,
+        max_age=STATE_TTL,
+        path=STATE_COOKIE_PATH,
+        secure=settings.API_BASE_URL.startswith("https://"),
+        httponly=True,
+        samesite="lax",
+    )
+    return response
+async def _oauth_user(db: AsyncSession, identity: OIDCIdentity) -> User:
+    """Match by provider id (indexed), then by verified email (linking the id), else create."""
+    column = _PROVIDER_COLUMNS[identity.provider]
+    user = (await db.execute(select(User).where(column == identity.subject))).scalar_one_or_none()
+    if user is not None:
+        return user
+    if not identity.email:
+        raise HTTPException(status_code=400, detail=f"No email returned from {identity.provider.capitalize()}")
+    if identity.email_verified:
+        user = await _get_user_by_email(db, identity.email)
+        if user is not None:
+            if getattr(user, column.key) is None:
+                setattr(user, column.key, identity.subject)
+                await db.commit()
+            return user
+    # OAuth-only users have no password; skip bcrypt entirely
+    user = User(email=identity.email, hashed_password=None, role="user", is_active=True)
+    setattr(user, column.key, identity.subject)
     try:
-        # MANUAL TOKEN FETCH to avoid Authlib session conflicts
-        # [MODIFIED FOR LOCAL DEV]
-        # Changed hardcoded URL to use dynamic settings.API_BASE_URL
-        redirect_uri = f"{settings.API_BASE_URL}/auth/complete/google-oauth2/"
-        
-        # 1. Manually exchange code for token using fetch_access_token
-        # This bypasses authorize_access_token which relies on session verification that is failing
-        token = await oauth.google.fetch_access_token(
-            redirect_uri=redirect_uri,
-            grant_type='authorization_code',
-            code=request.query_params.get('code')
-        )
-        
-        # 2. Get User Info
-        if 'userinfo' in token:
-            user_info = token['userinfo']
-        else:
-            user_info = await oauth.google.userinfo(token=token)
-            
-    except Exception as e:
-        # Note: Changed Error Log prefix for verification
-        logger.error(f"OAuth Manual Callback Error: {str(e)}")
-        raise HTTPException(status_code=400, detail=f"OAuth Manual Error: {str(e)}")
-    email = user_info.get('email')
-    if not email:
-        raise HTTPException(status_code=400, detail="No email returned from Google")
-    
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        user = User(
-            email=email,
-            hashed_password=get_password_hash("oauth_social_login"),
-            role="user", 
-            is_active=True
+        await _save_user(db, user)
+    except IntegrityError:
+        # Concurrent first sign-in for the same account, or the email belongs to
+        # an unverified-email account we won't link to
+        await db.rollback()
+        user = (await db.execute(select(User).where(column == identity.subject))).scalar_one_or_none()
+        if user is None:
+            raise HTTPException(status_code=409, detail="An account with this email already exists")
+    return user
+async def _oauth_callback(provider: str, callback: str, request: Request, db: AsyncSession) -> RedirectResponse:
+    try:
+        identity = await oidc_client.complete(
+            provider,
+            request.query_params.get("code"),
+            request.query_params.get("state"),
+            f"{settings.API_BASE_URL}{callback}",
+            request.cookies.get(STATE_COOKIE),
         )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-    
-    access_token = create_access_token(user_id=user.id, role=user.role)
-    return RedirectResponse(url=f"{settings.FRONTEND_URL}/auth/callback?access_token={access_token}")
+    except OIDCError as e:
+        logger.error(f"{provider} OAuth callback error: {e}")
+        raise HTTPException(status_code=400, detail=f"OAuth Error: {e}")
+    user = await _oauth_user(db, identity)
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="Account is disabled")
+    tokens = await token_service.issue(db, user.id, user.role)
+    response = RedirectResponse(url=await _frontend_callback_url(tokens))
+    # One login per state
+    response.delete_cookie(STATE_COOKIE, path=STATE_COOKIE_PATH)
+    return response
+@router.post("/oauth/token", response_model=RefreshResponse)
+async def oauth_token(body: OAuthCodeRequest):
+    # Single use, LOGIN_CODE_TTL seconds
+    tokens = await token_service.redeem(body.code)
+    if tokens is None:
+        raise HTTPException(status_code=400, detail="Invalid or expired code")
+    return RefreshResponse(
+        access_token=tokens.access_token,
+        refresh_token=tokens.refresh_token,
+        expires_in=tokens.expires_in,
+    )
+@router.get("/google")
+async def google_login():
+    return await _oauth_login_redirect("google", GOOGLE_CALLBACK)
+@router.get("/complete/google-oauth2/")
+async def google_auth(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await _oauth_callback("google", GOOGLE_CALLBACK, request, db)
 @router.get("/microsoft")
-async def microsoft_login(request: Request):
-    # [MODIFIED FOR LOCAL DEV]
-    # Using dynamic redirect_uri generation
-    redirect_uri = request.url_for('microsoft_auth')
-    # Or if explicit override is needed:
-    # redirect_uri = f"{settings.API_BASE_URL}/auth/microsoft/callback"
-    return await oauth.microsoft.authorize_redirect(request, redirect_uri)
+async def microsoft_login():
+    return await _oauth_login_redirect("microsoft", MICROSOFT_CALLBACK)
 @router.get("/microsoft/callback")
-async def microsoft_auth(request: Request, db: Session = Depends(get_db)):
-    try:
-        token = await oauth.microsoft.authorize_access_token(request)
-    except Exception as e:
-        logger.error(f"Microsoft OAuth Callback Error: {str(e)}")
-        raise HTTPException(status_code=400, detail=f"OAuth Error: {str(e)}")
-    user_info = await oauth.microsoft.userinfo(token=token)
-    email = user_info.get('mail') or user_info.get('userPrincipalName')
-    
-    if not email:
-         raise HTTPException(status_code=400, detail="Could not retrieve email.")
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        user = User(
-            email=email,
-            hashed_password=get_password_hash("oauth_social_login"),
-            role="user",
-            is_active=True
-        )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-    
-    access_token = create_access_token(user_id=user.id, role=user.role)
-    
-    return RedirectResponse(url=f"{settings.FRONTEND_URL}/auth/callback?access_token={access_token}")
+async def microsoft_auth(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await _oauth_callback("microsoft", MICROSOFT_CALLBACK, request, db)
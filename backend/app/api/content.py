@@ -1,4 +1,210 @@
+import base64
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-router = APIRouter()
+from app.core.config import settings
+from app.core.response_cache import CachedResponder, cache_response
+from app.db.session import get_read_db
+from app.models.lesson import Lesson
+from app.services.audio_service import AudioNotFound, audio_service, etag_for, iter_file_range, parse_range
+from app.services.job_queue import job_queue
+from app.services.search_service import search_service
+from app.services.similarity_service import lesson_index
+
+router = APIRouter(prefix="/lessons", tags=["Content"])
+
+
+async def load_lesson(db: AsyncSession, lesson_id: int) -> dict:
+    lesson = (await db.execute(
+        select(Lesson.id, Lesson.title, Lesson.content, Lesson.excerpt, Lesson.type).where(Lesson.id == lesson_id)
+    )).one_or_none()
+    if lesson is None:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+    return {
+        "id": lesson.id,
+        "title": lesson.title,
+        "content": lesson.content,
+        "excerpt": lesson.excerpt,
+        "type": lesson.type,
+    }
+
+
+def iter_lesson_body(content: str, chunk_chars: int):
+    """Yield an already-loaded body ``chunk_chars`` characters at a time, UTF-8 encoded."""
+    for start in range(0, len(content), chunk_chars):
+        yield content[start:start + chunk_chars].encode()
+
+
+def encode_search_cursor(rank: float, lesson_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{rank!r}:{lesson_id}".encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        rank, lesson_id = base64.urlsafe_b64decode(padded.encode()).decode().split(":")
+        return float(rank), int(lesson_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def load_search_page(db: AsyncSession, q: str, after: str | None, limit: int) -> dict:
+    result = await search_service.search(db, q, limit, decode_search_cursor(after) if after else None)
+    next_key = result["next_key"]
+    return {
+        "items": result["items"],
+        "next_cursor": encode_search_cursor(*next_key) if next_key else None,
+    }
+
+
+# Declared before /{lesson_id} so "search" isn't parsed as an id
+@router.get("/search")
+async def search_lessons(
+    q: str = Query(..., min_length=1, max_length=200),
+    after: str | None = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    limit: int = Query(20, ge=1, le=50),
+    cache: CachedResponder = Depends(cache_response("search", ttl=settings.SEARCH_CACHE_TTL)),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Ranked full-text search over lesson titles and content.
+    - The last word matches as a prefix, so results update while typing
+    - Titles also match by trigram similarity, which tolerates typos
+    - Results carry <mark>-highlighted title and content snippets
+    """
+    if after:
+        decode_search_cursor(after)
+    return await cache.respond(
+        lambda: load_search_page(db, q, after, limit),
+        headers={"Cache-Control": f"public, max-age={settings.SEARCH_CACHE_TTL}"},
+    )
+
+
+@router.get("/{lesson_id}")
+async def get_lesson(
+    lesson_id: int,
+    cache: CachedResponder = Depends(cache_response("lesson", ttl=settings.LESSON_CACHE_TTL)),
+    db: AsyncSession = Depends(get_read_db),
+):
+    return await cache.respond(
+        lambda: load_lesson(db, lesson_id),
+        headers={"Cache-Control": f"public, max-age={settings.LESSON_CACHE_TTL}"},
+    )
+
+
+@router.get("/{lesson_id}/similar")
+async def similar_lessons(
+    lesson_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Lessons most like this one by embedding cosine similarity, best first
+    - Scored off the event loop against the shared memory-mapped index: exact
+      for small catalogs, IVF-partitioned above VECTOR_IVF_MIN_ROWS
+    - Empty for lessons not indexed yet (see the rebuild_lesson_index job)
+    """
+    matches = await run_in_threadpool(lesson_index.similar, lesson_id, limit)
+    lessons = {
+        row.id: row
+        for row in (await db.execute(
+            select(Lesson.id, Lesson.title, Lesson.type, Lesson.excerpt)
+            .where(Lesson.id.in_([lesson_id] + [match for match, _ in matches]))
+        )).all()
+    }
+    if lesson_id not in lessons:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+    return {
+        "items": [
+            {
+                "lesson": {"id": match, "title": lessons[match].title, "type": lessons[match].type,
+                           "excerpt": lessons[match].excerpt},
+                "score": round(score, 4),
+            }
+            for match, score in matches
+            if match in lessons
+        ]
+    }
+
+
+@router.get("/{lesson_id}/body")
+async def stream_lesson_body(lesson_id: int, db: AsyncSession = Depends(get_read_db)):
+    """Lesson body as text/plain, streamed in LESSON_BODY_CHUNK_CHARS chunks (chunked encoding).
+
+    The body is read in one query, so it is detoasted once and comes from a single
+    snapshot; the connection is free again before the first chunk is sent.
+    """
+    row = (await db.execute(select(Lesson.content).where(Lesson.id == lesson_id))).one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+    return StreamingResponse(
+        iter_lesson_body(row.content or "", settings.LESSON_BODY_CHUNK_CHARS),
+        media_type="text/plain",
+        headers={"Cache-Control": f"public, max-age={settings.LESSON_CACHE_TTL}"},
+    )
+
+
+@router.get("/{lesson_id}/audio")
+async def stream_lesson_audio(
+    lesson_id: int,
+    request: Request,
+    bitrate: int | None = Query(None, description="Transcoded variant in kbit/s; original if omitted"),
+):
+    """Serve lesson audio with byte-range support, strong ETags and long cache headers."""
+    try:
+        path, ready = await run_in_threadpool(audio_service.resolve_cached, lesson_id, bitrate)
+    except AudioNotFound:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    cache_control = f"public, max-age={settings.AUDIO_CACHE_MAX_AGE}"
+    if not ready:
+        # ffmpeg runs on the job queue, not in a request thread; serve the original
+        # meanwhile, without letting caches keep it under the variant's URL
+        await job_queue.enqueue(
+            "transcode_audio", {"lesson_id": lesson_id, "bitrate": bitrate},
+            dedup_key=f"audio:{lesson_id}:{bitrate}",
+        )
+        cache_control = "no-cache"
+
+    size = path.stat().st_size
+    etag = etag_for(path)
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": cache_control,
+    }
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    accel = audio_service.accel_path(path)
+    if accel:
+        # nginx takes over with sendfile and its own Range handling
+        return Response(headers={**headers, "X-Accel-Redirect": accel}, media_type="audio/mpeg")
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range != etag:
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        (start, end), status_code = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        iter_file_range(path, start, end),
+        status_code=status_code,
+        media_type="audio/mpeg",
+        headers=headers,
+    )
@@ -1,18 +1,21 @@
 from fastapi import Depends, HTTPException
 from app.core.security import get_current_user as security_get_current_user
-from app.models.user import User
+from app.core.security import get_current_principal
+from app.core.auth_cache import Principal, UserSnapshot
 
 # This is the standard way to provide the user to routes
-def get_current_user(user: User = Depends(security_get_current_user)):
+async def get_current_user(user: UserSnapshot = Depends(security_get_current_user)):
     return user
 
-# This helper allows you to check for multiple roles at once
+# This helper allows you to check for multiple roles at once.
+# Authorizes from the token's role claim; no user row is loaded unless the
+# user's role changed after the token was issued.
 def require_role(allowed_roles: list):
-    def role_checker(current_user: User = Depends(get_current_user)):
-        if current_user.role not in allowed_roles:
+    async def role_checker(principal: Principal = Depends(get_current_principal)):
+        if principal.role not in allowed_roles:
             raise HTTPException(
                 status_code=403,
-                detail=f"Role {current_user.role} is not authorized"
+                detail=f"Role {principal.role} is not authorized"
             )
-        return current_user
+        return principal
     return role_checker
@@ -1,21 +1,150 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+import base64
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_read_db
+from app.core.auth_cache import Principal
+from app.core.config import settings
+from app.core.response_cache import CachedResponder, cache_response
+from app.core.security import get_current_principal
 from app.models.feed_item import FeedItem
+from app.models.lesson import Lesson
+from app.services.feed_service import feed_service
 
 router = APIRouter(prefix="/feed", tags=["Feed"])
 
-@router.get("")
-def get_feed(db: Session = Depends(get_db)):
+
+class FeedLesson(BaseModel):
+    id: int
+    title: str
+    # Full body via GET /lessons/{id} or streamed from /lessons/{id}/body
+    excerpt: str | None
+    type: str
+
+
+class FeedItemOut(BaseModel):
+    id: int
+    lesson_id: int
+    order: int
+    content_type: str | None
+    created_at: datetime | None
+    lesson: FeedLesson
+
+
+class FeedPage(BaseModel):
+    items: list[FeedItemOut]
+    next_cursor: str | None
+
+
+class UserFeedLesson(BaseModel):
+    id: int
+    title: str
+    type: str
+
+
+class UserFeedItem(BaseModel):
+    position: int
+    score: float
+    lesson: UserFeedLesson
+
+
+class UserFeedPage(BaseModel):
+    items: list[UserFeedItem]
+    next_offset: int | None
+
+
+def encode_cursor(order: int, item_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{order}:{item_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        order, item_id = base64.urlsafe_b64decode(padded.encode()).decode().split(":")
+        return int(order), int(item_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def load_feed_page(db: AsyncSession, after: str | None, limit: int) -> dict:
+    # Plain column rows: read-only page, no ORM identity map or relationship
+    # loading, and the precomputed excerpt instead of the (possibly huge) body
+    query = (
+        select(
+            FeedItem.id, FeedItem.lesson_id, FeedItem.order, FeedItem.content_type, FeedItem.created_at,
+            Lesson.title, Lesson.excerpt, Lesson.type,
+        )
+        .join(Lesson, Lesson.id == FeedItem.lesson_id)
+    )
+    if after:
+        query = query.where(tuple_(FeedItem.order, FeedItem.id) > tuple_(*decode_cursor(after)))
+    rows = (await db.execute(
+        query
+        .order_by(FeedItem.order.asc(), FeedItem.id.asc())
+        .limit(limit + 1)
+    )).all()
+    items = rows[:limit]
+    next_cursor = encode_cursor(items[-1].order, items[-1].id) if len(rows) > limit else None
+    return {
+        "items": [
+            {
+                "id": item_id,
+                "lesson_id": lesson_id,
+                "order": order,
+                "content_type": content_type,
+                "created_at": created_at,
+                "lesson": {"id": lesson_id, "title": title, "excerpt": excerpt, "type": lesson_type},
+            }
+            for item_id, lesson_id, order, content_type, created_at, title, excerpt, lesson_type in items
+        ],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("", response_model=FeedPage)
+async def get_feed(
+    after: str | None = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    limit: int = Query(20, ge=1, le=100),
+    cache: CachedResponder = Depends(cache_response("feed", ttl=settings.FEED_CACHE_TTL)),
+    db: AsyncSession = Depends(get_read_db),
+):
     """
-    Sprint‑2: deterministic feed (ordered by 'order' field)
-    - No AI
-    - No extra fields
+    Deterministic feed ordered by (order, id), paginated by keyset cursor.
+    - Each page is an index range scan on ix_feed_items_order_id, so latency
+      doesn't depend on how far the client has scrolled
+    - Lessons are joined in, no follow-up calls needed
+    - Pages are served from the shared response cache; clients re-polling an
+      unchanged page get a 304 via If-None-Match without any DB work
     """
-    items = (
-        db.query(FeedItem)
-        .order_by(FeedItem.order.asc())  # ← Use 'order' field you actually have
-        .limit(20)
-        .all()
+    if after:
+        decode_cursor(after)
+    return await cache.respond(
+        lambda: load_feed_page(db, after, limit),
+        headers={"Cache-Control": "private, no-cache"},
     )
-    return items
+
+
+@router.get("/me", response_model=UserFeedPage)
+async def get_my_feed(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Personalized feed, read from the user's precomputed next-N list.
+    - Read-only, so it can be served by a replica
+    - A feed that was never materialized is built by a background job; until
+      then the first page is the global feed order
+    """
+    rows = await feed_service.get_user_feed(db, principal.id, offset=offset, limit=limit)
+    return {
+        "items": [
+            {"position": position, "score": score, "lesson": {"id": lesson_id, "title": title, "type": lesson_type}}
+            for position, score, lesson_id, title, lesson_type in rows
+        ],
+        "next_offset": offset + limit if len(rows) == limit else None,
+    }
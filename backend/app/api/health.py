@@ -1,7 +1,38 @@
-from fastapi import APIRouter
+import hmac
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.core.metrics import render, render_multiprocess, write_snapshot
+from app.core.rate_limit import address_in
 
 router = APIRouter()
 
 @router.get("/health")
 def health():
     return {"status": "ok"}
+
+def _may_scrape(request: Request) -> bool:
+    if settings.METRICS_TOKEN:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+            return True
+    return request.client is not None and address_in(request.client.host, settings.METRICS_ALLOWED_CLIENTS)
+
+def _render_all_workers() -> str:
+    # Our own numbers fresh, the other workers' as of their last flush
+    write_snapshot(settings.METRICS_MULTIPROC_DIR)
+    return render_multiprocess(settings.METRICS_MULTIPROC_DIR)
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    # Port 8000 is published, so this can't rely on nginx's allow list alone
+    if not _may_scrape(request):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.METRICS_MULTIPROC_DIR:
+        body = await run_in_threadpool(_render_all_workers)
+    else:
+        body = render()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+
+from app.api.deps import require_role
+from app.core.auth_cache import Principal
+from app.core.security import get_current_principal
+from app.services.job_queue import UnknownTask, job_queue
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+admin_only = require_role(["super admin", "admin"])
+ADMIN_ROLES = ("super admin", "admin")
+
+
+class JobRequest(BaseModel):
+    task: str
+    kwargs: dict = Field(default_factory=dict)
+    # Enqueueing again while a job with the same key is queued or running returns that job
+    dedup_key: str | None = Field(default=None, max_length=200)
+
+
+@router.post("", status_code=202)
+async def enqueue_job(body: JobRequest, principal: Principal = Depends(admin_only)):
+    """Queue a registered task (see app/workers/tasks.py); poll `GET /jobs/{id}` for the outcome."""
+    try:
+        job, deduplicated = await job_queue.enqueue(
+            body.task, body.kwargs, dedup_key=body.dedup_key, user_id=principal.id
+        )
+    except UnknownTask:
+        raise HTTPException(status_code=400, detail=f"Unknown task {body.task!r}")
+    return {**job, "deduplicated": deduplicated}
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, principal: Principal = Depends(get_current_principal)):
+    """
+    Job status: `queued`, `running`, `retrying`, `succeeded` or `failed`
+    - Visible to admins and to the user who enqueued it
+    - Kept for JOB_RESULT_TTL after the job finishes
+    """
+    job = await job_queue.get(job_id)
+    if job is None or (principal.role not in ADMIN_ROLES and job["user_id"] != principal.id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
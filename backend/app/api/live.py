@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.security import decode_token
+from app.core.serialization import dumps
+from app.services.live_service import live_hub
+
+router = APIRouter(prefix="/live", tags=["Live"])
+
+# WebSocket close codes (4000-4999 are application-defined)
+WS_POLICY_VIOLATION = 1008
+WS_TRY_AGAIN_LATER = 1013
+WS_TOKEN_EXPIRED = 4001
+
+
+def _bearer(connection, token: str | None) -> str | None:
+    # EventSource and browser WebSockets can't set headers, so ?token= is accepted too
+    header = connection.headers.get("authorization", "")
+    if header.lower().startswith("bearer "):
+        return header[7:]
+    return token
+
+
+def _authenticate(token: str | None) -> tuple[int, float]:
+    """``(user_id, expires_at)`` from an access token; the stream ends when it expires."""
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    claims = decode_token(token)
+    return int(claims["sub"]), float(claims.get("exp") or time.time() + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+@router.get("/sse")
+async def stream_sse(request: Request, token: str | None = Query(None)):
+    """
+    Server-sent events: `feed`, `progress` and `resync` events with JSON data.
+    - `: ping` comments every LIVE_HEARTBEAT_SECONDS keep proxies from closing idle streams
+    - An `expired` event ends the stream when the access token expires; reconnect with a fresh one
+    """
+    user_id, expires_at = _authenticate(_bearer(request, token))
+    if live_hub.full:
+        raise HTTPException(status_code=503, detail="Too many live connections", headers={"Retry-After": "5"})
+
+    async def events():
+        # Registered inside the generator so the finally below always pairs with it
+        conn = live_hub.connect(user_id, "sse")
+        if conn is None:
+            return
+        try:
+            yield f"retry: {settings.LIVE_RETRY_MS}\n\n"
+            while True:
+                remaining = expires_at - time.time()
+                if remaining <= 0:
+                    yield "event: expired\ndata: {}\n\n"
+                    return
+                batch = await conn.next(min(settings.LIVE_HEARTBEAT_SECONDS, remaining))
+                if not batch:
+                    yield ": ping\n\n"
+                    continue
+                yield "".join(f"event: {m['type']}\ndata: {dumps(m).decode()}\n\n" for m in batch)
+        finally:
+            # Also runs when the client disconnects (Starlette cancels the stream)
+            live_hub.disconnect(conn)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def stream_ws(websocket: WebSocket, token: str | None = Query(None)):
+    """Same events as `/live/sse` as JSON text frames, plus `{"type": "ping"}` heartbeats."""
+    try:
+        user_id, expires_at = _authenticate(_bearer(websocket, token))
+    except HTTPException:
+        await websocket.close(code=WS_POLICY_VIOLATION)
+        return
+    if live_hub.full:
+        await websocket.close(code=WS_TRY_AGAIN_LATER)
+        return
+    await websocket.accept()
+    conn = live_hub.connect(user_id, "ws")
+    if conn is None:
+        await websocket.close(code=WS_TRY_AGAIN_LATER)
+        return
+
+    async def watch_disconnect():
+        # Client frames are ignored; this only notices the close
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+        conn.close()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        while not conn.closed:
+            remaining = expires_at - time.time()
+            if remaining <= 0:
+                await websocket.close(code=WS_TOKEN_EXPIRED)
+                return
+            batch = await conn.next(min(settings.LIVE_HEARTBEAT_SECONDS, remaining))
+            if conn.closed:
+                return
+            for message in batch or [{"type": "ping"}]:
+                await websocket.send_text(dumps(message).decode())
+    except (WebSocketDisconnect, RuntimeError, OSError):
+        # The client went away mid-send
+        pass
+    finally:
+        watcher.cancel()
+        live_hub.disconnect(conn)
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.auth_cache import Principal
+from app.core.config import settings
+from app.core.security import get_current_principal
+from app.db.session import get_read_db
+from app.models.user_progress import UserProgress
+from app.services.progress_service import progress_buffer
+
+router = APIRouter(prefix="/progress", tags=["Progress"])
+
+
+class ProgressEvent(BaseModel):
+    lesson_id: int
+    completed: bool = True
+
+
+class ProgressBatch(BaseModel):
+    events: list[ProgressEvent] = Field(min_length=1, max_length=settings.PROGRESS_EVENTS_MAX_BATCH)
+
+
+@router.post("/events", status_code=202)
+async def record_progress(body: ProgressBatch, principal: Principal = Depends(get_current_principal)):
+    """
+    Accept a batch of progress events (e.g. everything completed while scrolling).
+    - No DB work on the request path: events are coalesced per (user, lesson) in
+      the write-behind buffer and upserted on the next flush
+    - PROGRESS_DURABILITY=sync commits before responding
+    """
+    await progress_buffer.add_many(principal.id, [(e.lesson_id, e.completed) for e in body.events])
+    await progress_buffer.settle()
+    return {"accepted": len(body.events)}
+
+
+@router.get("")
+async def get_my_progress(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Committed progress merged with this user's still-buffered events (read-your-writes)."""
+    rows = dict((await db.execute(
+        select(UserProgress.lesson_id, UserProgress.completed).where(UserProgress.user_id == principal.id)
+    )).all())
+    merged = progress_buffer.overlay(rows, await progress_buffer.pending_for(principal.id))
+    return {
+        "progress": [
+            {"lesson_id": lesson_id, "completed": bool(completed)}
+            for lesson_id, completed in sorted(merged.items())
+        ]
+    }
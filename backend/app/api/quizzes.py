@@ -1,4 +1,85 @@
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
 
-router = APIRouter()
+from app.api.deps import require_role
+from app.core.auth_cache import Principal
+from app.core.security import get_current_principal
+from app.db.session import get_async_db, get_read_db
+from app.services.progress_service import progress_buffer
+from app.services.quiz_service import QuizNotFound, quiz_service
+
+router = APIRouter(prefix="/quizzes", tags=["Quizzes"])
+
+
+class QuizQuestion(BaseModel):
+    id: str
+    prompt: str
+    choices: list[str] = Field(min_length=2)
+    answer: int | list[int]
+
+
+class QuizCreate(BaseModel):
+    questions: list[QuizQuestion] = Field(min_length=1)
+    pass_score: float = Field(0.7, ge=0, le=1)
+
+
+class Submission(BaseModel):
+    lesson_id: int
+    version: int | None = None
+    answers: dict[str, int | list[int]]
+
+
+class BatchSubmission(BaseModel):
+    submissions: list[Submission] = Field(min_length=1, max_length=500)
+
+
+def serialize_result(result) -> dict:
+    return {
+        "lesson_id": result.lesson_id,
+        "version": result.version,
+        "correct": result.correct,
+        "total": result.total,
+        "score": result.score,
+        "passed": result.passed,
+    }
+
+
+@router.post("/submissions")
+async def grade_submissions(
+    body: BatchSubmission,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Grade a batch of submissions; results reach UserProgress on the next buffered flush."""
+    try:
+        results = await quiz_service.grade_batch(
+            db, principal.id, [(s.lesson_id, s.version, s.answers) for s in body.submissions]
+        )
+    except QuizNotFound as e:
+        raise HTTPException(status_code=404, detail=f"Quiz for lesson {e.args[0]} not found")
+    await progress_buffer.settle()
+    return {"results": [serialize_result(r) for r in results]}
+
+
+@router.get("/{lesson_id}")
+async def get_quiz(lesson_id: int, version: int | None = None, db: AsyncSession = Depends(get_read_db)):
+    try:
+        compiled = await quiz_service.get(db, lesson_id, version)
+    except QuizNotFound:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    return {"lesson_id": lesson_id, "version": compiled.version, "questions": compiled.public}
+
+
+@router.post("/{lesson_id}", status_code=201)
+async def create_quiz_version(
+    lesson_id: int,
+    body: QuizCreate,
+    current_user = Depends(require_role(["super admin", "admin"])),
+    db: AsyncSession = Depends(get_async_db),
+):
+    compiled = await quiz_service.create_version(
+        db, lesson_id, [q.model_dump() for q in body.questions], body.pass_score
+    )
+    return {"lesson_id": lesson_id, "version": compiled.version}
@@ -0,0 +1,74 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.auth_cache import Principal
+from app.core.config import settings
+from app.core.security import get_current_principal
+from app.db.session import get_async_db, get_read_db
+from app.services.review_service import MAX_GRADE, review_scheduler
+
+router = APIRouter(prefix="/reviews", tags=["Reviews"])
+
+
+class ReviewResult(BaseModel):
+    lesson_id: int
+    grade: int = Field(ge=0, le=MAX_GRADE, description="0-2 forgotten, 3 recalled with difficulty, 4 good, 5 easy")
+
+
+class ReviewBatch(BaseModel):
+    results: list[ReviewResult] = Field(min_length=1, max_length=settings.REVIEW_RESULTS_MAX_BATCH)
+
+
+@router.get("/due")
+async def get_due_reviews(
+    limit: int = Query(20, ge=1, le=100),
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Lessons due for review now, most overdue first (one range scan on ix_review_cards_user_due)."""
+    rows = await review_scheduler.due(db, principal.id, limit)
+    return {
+        "items": [
+            {
+                "lesson": {"id": lesson_id, "title": title, "type": lesson_type, "excerpt": excerpt},
+                "due_at": due_at,
+                "interval_days": interval_days,
+                "repetitions": repetitions,
+            }
+            for lesson_id, due_at, interval_days, repetitions, title, lesson_type, excerpt in rows
+        ]
+    }
+
+
+@router.post("")
+async def record_reviews(
+    body: ReviewBatch,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Grade a batch of reviews and return the new schedules.
+    - Results apply in the order sent; a lesson may appear more than once
+    - Lessons that don't exist are skipped
+    """
+    now = datetime.utcnow()
+    cards = await db.run_sync(
+        review_scheduler.apply, [(principal.id, r.lesson_id, r.grade, now) for r in body.results]
+    )
+    await db.commit()
+    return {
+        "cards": [
+            {
+                "lesson_id": card["lesson_id"],
+                "due_at": card["due_at"],
+                "interval_days": card["interval_days"],
+                "ease": card["ease"],
+                "repetitions": card["repetitions"],
+                "lapses": card["lapses"],
+            }
+            for card in cards.values()
+        ]
+    }
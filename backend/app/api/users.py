@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends
+from pydantic import BaseModel
 from app.core.security import get_current_user
-from app.models.user import User
+from app.core.auth_cache import UserSnapshot
 
 router = APIRouter(prefix="/users", tags=["users"])
 
-@router.get("/me")
-def read_current_user(current_user: User = Depends(get_current_user)):
-    return {
-        "id": current_user.id,
-        "email": current_user.email,
-        "role": current_user.role,
-    }
+
+class UserOut(BaseModel):
+    id: int
+    email: str
+    role: str
+
+
+@router.get("/me", response_model=UserOut)
+async def read_current_user(current_user: UserSnapshot = Depends(get_current_user)):
+    return UserOut(id=current_user.id, email=current_user.email, role=current_user.role)
@@ -0,0 +1,174 @@
+"""Auth principal caches.
+
+* ``token_cache``: verified JWT -> claims, so a token is decoded and its
+  signature checked once per process instead of on every request. Entries are
+  keyed by the full token (not just the signature) so a tampered payload can
+  never reuse a cached verification.
+* ``user snapshots``: a small immutable view of a ``User`` row keyed by user id,
+  cached in-process for ``AUTH_USER_CACHE_TTL`` seconds and optionally shared
+  through Redis.
+
+When a user's role or ``is_active`` changes, ``invalidate_user`` drops the
+snapshot and records a "stale before" timestamp; tokens issued before it are no
+longer trusted for claims-only authorization and fall back to a fresh snapshot.
+Markers read from Redis are memoized for only ``STALE_MARKER_TTL`` seconds, so
+a change made through another worker takes effect here within that long.
+
+The lookups run on the request path and use the asyncio Redis client;
+``invalidate_user`` runs inside ORM flush events and stays synchronous.
+"""
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+
+from sqlalchemy import event, inspect
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.core.redis import get_async_redis, get_redis, mark_unavailable
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+auth_cache_lookups = Counter(
+    "auth_cache_lookups_total",
+    "Auth cache lookups by cache and result",
+    labelnames=("cache", "result"),
+)
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    id: int
+    email: str
+    role: str
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            role=user.role,
+            is_active=bool(user.is_active),
+        )
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Identity taken from verified token claims alone (no DB row)."""
+    id: int
+    role: str
+    issued_at: float | None = None
+
+
+token_cache = LRUCache(maxsize=settings.AUTH_TOKEN_CACHE_SIZE)
+_user_cache = LRUCache(maxsize=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL)
+# user_id -> unix time; tokens issued before it carry stale role claims.
+_stale_markers = LRUCache(maxsize=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL)
+# How long a marker read from Redis (or its absence) is trusted locally
+STALE_MARKER_TTL = 1.0
+
+_USER_KEY = "auth:user:{}"
+_STALE_KEY = "auth:stale:{}"
+
+
+def get_cached_claims(token: str, leeway: int = 0) -> dict | None:
+    claims = token_cache.get(token)
+    if claims is None:
+        auth_cache_lookups.inc(labels=("token", "miss"))
+        return None
+    exp = claims.get("exp")
+    if exp is not None and exp + leeway <= time.time():
+        token_cache.delete(token)
+        auth_cache_lookups.inc(labels=("token", "expired"))
+        return None
+    auth_cache_lookups.inc(labels=("token", "hit"))
+    return claims
+
+
+def cache_claims(token: str, claims: dict):
+    token_cache.set(token, claims)
+
+
+async def get_user_snapshot(user_id: int) -> UserSnapshot | None:
+    snapshot = _user_cache.get(user_id)
+    if snapshot is not None:
+        auth_cache_lookups.inc(labels=("user", "hit"))
+        return snapshot
+    r = get_async_redis()
+    if r is not None:
+        try:
+            raw = await r.get(_USER_KEY.format(user_id))
+        except Exception as e:
+            mark_unavailable(e)
+            raw = None
+        if raw:
+            snapshot = UserSnapshot(**json.loads(raw))
+            _user_cache.set(user_id, snapshot)
+            auth_cache_lookups.inc(labels=("user", "redis_hit"))
+            return snapshot
+    auth_cache_lookups.inc(labels=("user", "miss"))
+    return None
+
+
+async def cache_user_snapshot(snapshot: UserSnapshot):
+    _user_cache.set(snapshot.id, snapshot)
+    r = get_async_redis()
+    if r is not None:
+        try:
+            await r.set(_USER_KEY.format(snapshot.id), json.dumps(asdict(snapshot)), ex=settings.AUTH_USER_CACHE_TTL)
+        except Exception as e:
+            mark_unavailable(e)
+
+
+async def stale_before(user_id: int) -> float:
+    """Return the time before which this user's tokens carry stale claims (0 if none)."""
+    marker = _stale_markers.get(user_id)
+    if marker is not None:
+        return marker
+    r = get_async_redis()
+    if r is None:
+        # Only this worker's own invalidations are known
+        return 0.0
+    try:
+        raw = await r.get(_STALE_KEY.format(user_id))
+    except Exception as e:
+        mark_unavailable(e)
+        return 0.0
+    marker = float(raw) if raw else 0.0
+    _stale_markers.set(user_id, marker, ttl=STALE_MARKER_TTL)
+    return marker
+
+
+def invalidate_user(user_id: int):
+    """Drop cached state for a user whose role or active flag changed."""
+    now = time.time()
+    # Tokens live at most ACCESS_TOKEN_EXPIRE_MINUTES (plus a minute of leeway),
+    # so the marker can expire with them.
+    ttl = (settings.ACCESS_TOKEN_EXPIRE_MINUTES + 1) * 60
+    _user_cache.delete(user_id)
+    _stale_markers.set(user_id, now, ttl=ttl)
+    r = get_redis()
+    if r is not None:
+        try:
+            pipe = r.pipeline()
+            pipe.delete(_USER_KEY.format(user_id))
+            pipe.set(_STALE_KEY.format(user_id), now, ex=ttl)
+            pipe.execute()
+        except Exception as e:
+            mark_unavailable(e)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_auth_change(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.role.history.has_changes() or state.attrs.is_active.history.has_changes():
+        invalidate_user(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_on_delete(mapper, connection, target):
+    invalidate_user(target.id)
@@ -0,0 +1,56 @@
+"""Negotiated response compression.
+
+Brotli (when ``brotli-asgi`` is installed) or gzip is applied according to the
+client's ``Accept-Encoding``, but only for bodies of at least
+``RESPONSE_COMPRESSION_MIN_BYTES``; small bodies aren't worth the CPU.
+Audio streams and Range requests bypass compression entirely: mp3 doesn't
+shrink, and compressing a byte range would break ``Content-Range``. Event
+streams (``Accept: text/event-stream``) bypass it too, since the compressor
+would buffer events until enough bytes accumulate.
+"""
+import logging
+
+from starlette.middleware.gzip import GZipMiddleware
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Path suffixes that are never compressed
+UNCOMPRESSED_SUFFIXES = ("/audio",)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int | None = None, mode: str | None = None):
+        self.app = app
+        minimum_size = minimum_size or settings.RESPONSE_COMPRESSION_MIN_BYTES
+        mode = mode or settings.RESPONSE_COMPRESSION
+        self.compressed = None
+        if mode == "br":
+            try:
+                from brotli_asgi import BrotliMiddleware
+
+                # Falls back to gzip for clients that don't accept br
+                self.compressed = BrotliMiddleware(
+                    app, quality=4, minimum_size=minimum_size, gzip_fallback=True
+                )
+            except ImportError:
+                logger.warning("brotli-asgi not installed; using gzip compression")
+                mode = "gzip"
+        if mode == "gzip":
+            self.compressed = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=5)
+
+    async def __call__(self, scope, receive, send):
+        if self.compressed is None or scope["type"] != "http" or self._bypass(scope):
+            await self.app(scope, receive, send)
+            return
+        await self.compressed(scope, receive, send)
+
+    @staticmethod
+    def _bypass(scope) -> bool:
+        if scope["path"].endswith(UNCOMPRESSED_SUFFIXES):
+            return True
+        for name, value in scope["headers"]:
+            if name == b"range" or (name == b"accept" and b"text/event-stream" in value):
+                return True
+        return False
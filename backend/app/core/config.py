@@ -5,10 +5,44 @@ from fastapi.security import OAuth2PasswordBearer
 
 class Settings(BaseSettings):
     DATABASE_URL: str = os.getenv("DATABASE_URL", "postgresql://learning_user:MulaiBeraksi2024@db:5432/learning_platform")
+    # Optional explicit async URL; derived from DATABASE_URL (asyncpg) when empty
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+    # One extra round-trip per checkout; without it the first query on each connection
+    # that died in a failover or restart fails (a 500) before the pool notices
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # Server-wide connection budget (postgresql.conf max_connections), minus what
+    # migrations, psql and cron jobs need; split across workers and engines
+    DB_MAX_CONNECTIONS: int = int(os.getenv("DB_MAX_CONNECTIONS", "100"))
+    DB_RESERVED_CONNECTIONS: int = int(os.getenv("DB_RESERVED_CONNECTIONS", "10"))
+    # Server worker processes (set by gunicorn.conf.py; 1 under plain uvicorn).
+    # Set it explicitly in .env when running job workers: they size their pools
+    # from the same split and can't see gunicorn's CPU-count default
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    # Job worker processes (app/workers/runner.py) across the deployment, each
+    # with the same pools as a web worker; 0 when no job worker runs
+    JOB_WORKER_PROCESSES: int = int(os.getenv("JOB_WORKER_PROCESSES", "1"))
+    # Read replicas: comma-separated URLs like DATABASE_URL (async driver derived the same
+    # way); read-only endpoints use them while they are up and within DB_REPLICA_MAX_LAG
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    DB_REPLICA_MAX_LAG: float = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+    DB_REPLICA_CHECK_INTERVAL: float = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "5"))
+    DB_REPLICA_CHECK_TIMEOUT: float = float(os.getenv("DB_REPLICA_CHECK_TIMEOUT", "1"))
+    # Reads stay on the primary this long after a user's write; keep it above
+    # PROGRESS_FLUSH_INTERVAL so buffered progress is committed before reads move back
+    DB_READ_YOUR_WRITES_SECONDS: float = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    # Access tokens are checked from claims alone (no revocation lookup), so keep
+    # them short; clients renew them via /auth/refresh
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
     REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+    # A used refresh token presented again this soon after its rotation (concurrent
+    # tabs) gets the same successor pair instead of revoking the family
+    REFRESH_REUSE_GRACE_SECONDS: float = float(os.getenv("REFRESH_REUSE_GRACE_SECONDS", "5"))
     CORS_ORIGINS: List[str] = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:3001,https://noleij.com").split(",")
     
     # OAuth settings
@@ -16,6 +50,14 @@ class Settings(BaseSettings):
     GOOGLE_CLIENT_SECRET: str = os.getenv("GOOGLE_CLIENT_SECRET", "")
     MICROSOFT_CLIENT_ID: str = os.getenv("MICROSOFT_CLIENT_ID", "")
     MICROSOFT_CLIENT_SECRET: str = os.getenv("MICROSOFT_CLIENT_SECRET", "")
+    GOOGLE_DISCOVERY_URL: str = os.getenv("GOOGLE_DISCOVERY_URL", "https://accounts.google.com/.well-known/openid-configuration")
+    MICROSOFT_DISCOVERY_URL: str = os.getenv("MICROSOFT_DISCOVERY_URL", "https://login.microsoftonline.com/common/v2.0/.well-known/openid-configuration")
+    # Discovery documents and signing keys are cached per worker; an unknown key id
+    # refetches the JWKS at most once per OIDC_JWKS_MIN_REFRESH seconds
+    OIDC_METADATA_TTL: float = float(os.getenv("OIDC_METADATA_TTL", "3600"))
+    OIDC_JWKS_TTL: float = float(os.getenv("OIDC_JWKS_TTL", "3600"))
+    OIDC_JWKS_MIN_REFRESH: float = float(os.getenv("OIDC_JWKS_MIN_REFRESH", "60"))
+    OIDC_HTTP_TIMEOUT: float = float(os.getenv("OIDC_HTTP_TIMEOUT", "5"))
     
     # Frontend URL
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "https://noleij.com")
@@ -24,6 +66,133 @@ class Settings(BaseSettings):
     # Added API_BASE_URL to support dynamic OAuth redirects on localhost
     API_BASE_URL: str = os.getenv("API_BASE_URL", "https://noleij.com")
     
+    # Redis (optional; empty disables it and in-process fallbacks are used)
+    REDIS_URL: str = os.getenv("REDIS_URL", "")
+    REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.1"))
+
+    # Auth principal caches
+    AUTH_TOKEN_CACHE_SIZE: int = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+    AUTH_USER_CACHE_SIZE: int = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+    AUTH_USER_CACHE_TTL: int = int(os.getenv("AUTH_USER_CACHE_TTL", "30"))
+
+    # Response cache
+    RESPONSE_CACHE_TTL: int = int(os.getenv("RESPONSE_CACHE_TTL", "30"))
+    RESPONSE_CACHE_LOCK_TIMEOUT: float = float(os.getenv("RESPONSE_CACHE_LOCK_TIMEOUT", "5"))
+    RESPONSE_CACHE_LOCAL_SIZE: int = int(os.getenv("RESPONSE_CACHE_LOCAL_SIZE", "1024"))
+    FEED_CACHE_TTL: int = int(os.getenv("FEED_CACHE_TTL", "15"))
+    LESSON_CACHE_TTL: int = int(os.getenv("LESSON_CACHE_TTL", "300"))
+    LESSON_BODY_CHUNK_CHARS: int = int(os.getenv("LESSON_BODY_CHUNK_CHARS", "32768"))
+
+    # Bulk ingestion
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "5000"))
+
+    # Audio delivery
+    AUDIO_STORAGE_DIR: str = os.getenv("AUDIO_STORAGE_DIR", "media/audio/originals")
+    AUDIO_CACHE_DIR: str = os.getenv("AUDIO_CACHE_DIR", "media/audio/variants")
+    AUDIO_CACHE_MAX_BYTES: int = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+    AUDIO_BITRATES: str = os.getenv("AUDIO_BITRATES", "32,64,128")
+    AUDIO_CACHE_MAX_AGE: int = int(os.getenv("AUDIO_CACHE_MAX_AGE", "604800"))
+    # When set (e.g. /protected-audio), nginx serves the file via X-Accel-Redirect
+    AUDIO_X_ACCEL_PREFIX: str = os.getenv("AUDIO_X_ACCEL_PREFIX", "")
+    FFMPEG_BIN: str = os.getenv("FFMPEG_BIN", "ffmpeg")
+
+    # Quizzes and progress write-behind
+    QUIZ_CACHE_SIZE: int = int(os.getenv("QUIZ_CACHE_SIZE", "10000"))
+    QUIZ_LATEST_VERSION_TTL: int = int(os.getenv("QUIZ_LATEST_VERSION_TTL", "60"))
+    PROGRESS_FLUSH_INTERVAL: float = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "2"))
+    PROGRESS_FLUSH_MAX_PENDING: int = int(os.getenv("PROGRESS_FLUSH_MAX_PENDING", "5000"))
+    # memory: a crash loses up to PROGRESS_FLUSH_INTERVAL of events; redis: survives
+    # worker crashes; sync: every request commits before it is acknowledged. With
+    # memory, other workers don't see a user's events until they are flushed, so
+    # use redis or sync when WEB_CONCURRENCY > 1
+    PROGRESS_DURABILITY: str = os.getenv("PROGRESS_DURABILITY", "memory")
+    PROGRESS_EVENTS_MAX_BATCH: int = int(os.getenv("PROGRESS_EVENTS_MAX_BATCH", "500"))
+    # A batch that keeps failing for reasons other than a lost connection is set
+    # aside after this many flushes instead of blocking every later one
+    PROGRESS_FLUSH_MAX_ATTEMPTS: int = int(os.getenv("PROGRESS_FLUSH_MAX_ATTEMPTS", "5"))
+    # Spaced repetition: completed lessons are first due for review this many days later
+    REVIEW_FIRST_INTERVAL_DAYS: float = float(os.getenv("REVIEW_FIRST_INTERVAL_DAYS", "1"))
+    REVIEW_RESULTS_MAX_BATCH: int = int(os.getenv("REVIEW_RESULTS_MAX_BATCH", "500"))
+
+    # Similar lessons: embeddings memory-mapped from VECTOR_INDEX_DIR (shared by all
+    # workers; mount it in both the API and job worker containers)
+    VECTOR_INDEX_DIR: str = os.getenv("VECTOR_INDEX_DIR", "media/vector_index")
+    EMBEDDING_DIM: int = int(os.getenv("EMBEDDING_DIM", "256"))
+    # float16 halves the index files but converts every scored row (slower queries)
+    EMBEDDING_DTYPE: str = os.getenv("EMBEDDING_DTYPE", "float32")
+    VECTOR_INDEX_RELOAD_INTERVAL: float = float(os.getenv("VECTOR_INDEX_RELOAD_INTERVAL", "2"))
+    # Below this many lessons every query is exact; above, IVF partitions are
+    # trained on rebuild (VECTOR_IVF_LISTS=0: sqrt(lessons)) and probed per query
+    VECTOR_IVF_MIN_ROWS: int = int(os.getenv("VECTOR_IVF_MIN_ROWS", "100000"))
+    VECTOR_IVF_LISTS: int = int(os.getenv("VECTOR_IVF_LISTS", "0"))
+    VECTOR_IVF_NPROBE: int = int(os.getenv("VECTOR_IVF_NPROBE", "16"))
+
+    # Response compression: br (brotli, gzip fallback), gzip or off
+    RESPONSE_COMPRESSION: str = os.getenv("RESPONSE_COMPRESSION", "br")
+    RESPONSE_COMPRESSION_MIN_BYTES: int = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+
+    # Auth rate limiting: comma-separated <ip|email>:<count>/<seconds> sliding windows
+    # per policy (an empty value disables that policy)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_LOGIN: str = os.getenv("RATE_LIMIT_LOGIN", "ip:30/60,email:10/300")
+    RATE_LIMIT_REGISTER: str = os.getenv("RATE_LIMIT_REGISTER", "ip:10/3600")
+    RATE_LIMIT_REFRESH: str = os.getenv("RATE_LIMIT_REFRESH", "ip:120/60")
+    # Comma-separated proxy addresses/CIDRs whose X-Real-IP is taken as the client
+    # address; any other peer is rate limited by its own address. Behind the host
+    # nginx and Docker's published port, the peer is the bridge gateway.
+    RATE_LIMIT_TRUSTED_PROXIES: str = os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "127.0.0.1,::1")
+    RATE_LIMIT_LOCAL_SIZE: int = int(os.getenv("RATE_LIMIT_LOCAL_SIZE", "10000"))
+
+    # /metrics answers peers in METRICS_ALLOWED_CLIENTS (addresses/CIDRs; the host
+    # nginx only proxies /api/metrics from localhost) or "Authorization: Bearer METRICS_TOKEN"
+    METRICS_ALLOWED_CLIENTS: str = os.getenv("METRICS_ALLOWED_CLIENTS", "127.0.0.1,::1")
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+    # Workers write metric snapshots here every METRICS_FLUSH_INTERVAL seconds and a
+    # scrape merges them (set by gunicorn.conf.py); empty: the scraped worker only
+    METRICS_MULTIPROC_DIR: str = os.getenv("METRICS_MULTIPROC_DIR", "")
+    METRICS_FLUSH_INTERVAL: float = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+    # Live push (SSE/WebSocket); limits are per worker
+    LIVE_MAX_CONNECTIONS: int = int(os.getenv("LIVE_MAX_CONNECTIONS", "10000"))
+    LIVE_QUEUE_MAX_ITEMS: int = int(os.getenv("LIVE_QUEUE_MAX_ITEMS", "100"))
+    # Below nginx's proxy_read_timeout and typical mobile carrier idle timeouts
+    LIVE_HEARTBEAT_SECONDS: float = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "25"))
+    LIVE_RETRY_MS: int = int(os.getenv("LIVE_RETRY_MS", "5000"))
+
+    # Lesson search
+    SEARCH_MAX_CANDIDATES: int = int(os.getenv("SEARCH_MAX_CANDIDATES", "1000"))
+    SEARCH_CACHE_TTL: int = int(os.getenv("SEARCH_CACHE_TTL", "60"))
+
+    # AI orchestrator: JSON map of provider name -> ProviderConfig fields
+    AI_PROVIDERS: str = os.getenv("AI_PROVIDERS", "{}")
+    AI_CACHE_DIR: str = os.getenv("AI_CACHE_DIR", "media/ai_cache")
+    AI_CACHE_MAX_BYTES: int = int(os.getenv("AI_CACHE_MAX_BYTES", str(512 * 1024 ** 2)))
+
+    # Password hashing pool (0 workers = min(2, cpu_count) shared across WEB_CONCURRENCY workers)
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "16"))
+
+    # Personalized feed materialization
+    USER_FEED_SIZE: int = int(os.getenv("USER_FEED_SIZE", "100"))
+    USER_FEED_REBUILD_CHUNK: int = int(os.getenv("USER_FEED_REBUILD_CHUNK", "1000"))
+    USER_FEED_CATALOG_TTL: int = int(os.getenv("USER_FEED_CATALOG_TTL", "300"))
+
+    # Background jobs (app/services/job_queue.py); JOB_WORKER_QUEUES is <queue>:<concurrency>
+    # per worker process (python -m app.workers.runner)
+    JOB_WORKER_QUEUES: str = os.getenv("JOB_WORKER_QUEUES", "default:4,ingest:1,ai:8,audio:2")
+    JOB_TASK_MODULES: str = os.getenv("JOB_TASK_MODULES", "app.workers.tasks")
+    # Periodic tasks enqueued by the job workers, <task>:<interval seconds>
+    JOB_SCHEDULE: str = os.getenv("JOB_SCHEDULE", "purge_refresh_tokens:3600")
+    # A delivery idle this long (its worker died) is redelivered to another worker
+    JOB_VISIBILITY_TIMEOUT: float = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "60"))
+    JOB_TIMEOUT: float = float(os.getenv("JOB_TIMEOUT", "3600"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_BACKOFF: float = float(os.getenv("JOB_RETRY_BACKOFF", "5"))
+    JOB_RETRY_BACKOFF_MAX: float = float(os.getenv("JOB_RETRY_BACKOFF_MAX", "600"))
+    JOB_RESULT_TTL: int = int(os.getenv("JOB_RESULT_TTL", "86400"))
+    JOB_DEDUP_TTL: int = int(os.getenv("JOB_DEDUP_TTL", "86400"))
+    JOB_LOCAL_SIZE: int = int(os.getenv("JOB_LOCAL_SIZE", "10000"))
+
     # CORS settings
     BACKEND_CORS_ORIGINS: List[str] = []
     
@@ -0,0 +1,167 @@
+"""Password hashing with a dedicated process pool and admission control.
+
+bcrypt costs ~250 ms of CPU per call. Running it inside request handlers ties up
+Starlette's threadpool and, because of the GIL, slows down every other request
+in the worker. Hashing is pushed to a small process pool instead; when more than
+``PASSWORD_HASH_MAX_QUEUE`` calls are waiting we reject with 503 + Retry-After
+rather than letting login latency grow without bound.
+"""
+import asyncio
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram
+
+
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    # passlib is imported on first use; gunicorn.conf.py preloads it before forking,
+    # and pool workers get it from the forkserver preload below
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+    )
+
+
+HASH_BUCKETS = (0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0, 10.0)
+
+hash_queue_wait = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time a password hash/verify spent waiting for a pool worker",
+    labelnames=("op",),
+    buckets=HASH_BUCKETS,
+)
+hash_compute_time = Histogram(
+    "password_hash_compute_seconds",
+    "CPU time spent inside bcrypt in the pool worker",
+    labelnames=("op",),
+    buckets=HASH_BUCKETS,
+)
+hash_rejected = Counter(
+    "password_hash_rejected_total",
+    "Password hash/verify calls rejected because the queue was full",
+    labelnames=("op",),
+)
+hash_pending = Gauge(
+    "password_hash_pending",
+    "Password hash/verify calls queued or running",
+)
+
+
+def _truncate(password: str) -> str:
+    # bcrypt only uses first 72 bytes — truncate to avoid ValueError
+    password_bytes = password.encode('utf-8')
+    if len(password_bytes) > 72:
+        password = password_bytes[:72].decode('utf-8', errors='ignore')
+    return password
+
+
+def get_password_hash(password: str) -> str:
+    return get_pwd_context().hash(_truncate(password))
+
+
+def verify_password(plain: str, hashed: str) -> bool:
+    return get_pwd_context().verify(plain, hashed)
+
+
+# --- Pool worker entry points (must be module-level so they can be pickled) ---
+
+def _timed_hash(password: str):
+    started = time.perf_counter()
+    result = get_password_hash(password)
+    return result, time.perf_counter() - started
+
+
+def _timed_verify(plain: str, hashed: str):
+    started = time.perf_counter()
+    result = verify_password(plain, hashed)
+    return result, time.perf_counter() - started
+
+
+class PasswordHasher:
+    """Runs bcrypt in a process pool, bounded by ``workers + max_queue`` pending calls."""
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        # Running estimate of a single bcrypt call, used for Retry-After.
+        self._avg_compute = 0.25
+        hash_pending.set_function(lambda: self._pending)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created lazily so a pre-forking server builds the pool in each worker,
+        # not in the master process. By then the worker already runs threads
+        # (Starlette's threadpool, Redis/DB pools), and a plain fork() can copy a
+        # lock another thread holds into the child, which then deadlocks. Pool
+        # processes are started from a single-threaded forkserver instead.
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    context = multiprocessing.get_context("forkserver")
+                    context.set_forkserver_preload([__name__, "passlib.handlers.bcrypt"])
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._executor
+
+    def _admit(self, op: str):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                hash_rejected.inc(labels=(op,))
+                backlog = self._pending / self.workers * self._avg_compute
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Authentication is temporarily overloaded, please retry",
+                    headers={"Retry-After": str(max(1, math.ceil(backlog)))},
+                )
+            self._pending += 1
+
+    def _release(self, compute: float | None = None):
+        with self._lock:
+            self._pending -= 1
+            if compute is not None:
+                self._avg_compute = 0.9 * self._avg_compute + 0.1 * compute
+
+    async def _run(self, op: str, fn, *args):
+        self._admit(op)
+        submitted = time.perf_counter()
+        compute = None
+        try:
+            loop = asyncio.get_running_loop()
+            result, compute = await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._release(compute)
+        total = time.perf_counter() - submitted
+        hash_compute_time.observe(compute, labels=(op,))
+        hash_queue_wait.observe(max(0.0, total - compute), labels=(op,))
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", _timed_hash, password)
+
+    async def verify(self, plain: str, hashed: str | None) -> bool:
+        if not hashed:
+            return False
+        return await self._run("verify", _timed_verify, plain, hashed)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS or max(1, min(2, os.cpu_count() or 1) // settings.WEB_CONCURRENCY),
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
@@ -0,0 +1,175 @@
+"""Request, database and threadpool instrumentation exposed on ``/metrics``.
+
+``MetricsMiddleware`` is a plain ASGI middleware (no ``BaseHTTPMiddleware``
+task/stream overhead): per request it reads the clock twice and updates one
+histogram keyed by the matched route template, so cardinality stays bounded by
+the number of routes rather than by URLs.
+
+SQLAlchemy cursor events on both engines feed a per-request accumulator held in
+a context variable; it is shared by reference, so queries issued from the
+threadpool (sync sessions) and from the loop (async sessions) both count.
+"""
+import asyncio
+import logging
+import os
+import resource
+import time
+from contextvars import ContextVar
+
+from app.core.config import settings
+from app.core.metrics import Gauge, Histogram, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Request counts per route/status are this histogram's ``_count`` series; a
+# separate counter would add a second locked update to every request.
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by method, route template and status",
+    labelnames=("method", "route", "status"),
+)
+db_queries_per_request = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per HTTP request",
+    labelnames=("route",),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100),
+)
+db_time_per_request = Histogram(
+    "http_request_db_seconds",
+    "Time spent in SQL statements per HTTP request",
+    labelnames=("route",),
+)
+db_query_duration = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time",
+    labelnames=("engine",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+db_pool_checked_out = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool",
+    labelnames=("engine",),
+)
+db_pool_overflow = Gauge(
+    "db_pool_overflow",
+    "Connections open beyond pool_size",
+    labelnames=("engine",),
+)
+threadpool_busy = Gauge(
+    "threadpool_busy_threads",
+    "Worker threads busy running sync endpoints/dependencies",
+)
+threadpool_waiting = Gauge(
+    "threadpool_waiting_tasks",
+    "Calls queued for a free worker thread",
+)
+
+process_resident_memory = Gauge(
+    "process_resident_memory_bytes",
+    "Resident set size of this worker process",
+)
+
+UNMATCHED_ROUTE = "<unmatched>"
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _resident_memory() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        # No /proc: fall back to peak RSS (reported in KiB on Linux and BSD)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+process_resident_memory.set_function(_resident_memory)
+
+# [query count, seconds] for the current request, or None outside a request
+_request_db = ContextVar("request_db", default=None)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        db_stats = [0, 0.0]
+        token = _request_db.set(db_stats)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_db.reset(token)
+            # Set by FastAPI's router once a route matches
+            route = scope.get("route")
+            path = getattr(route, "path", UNMATCHED_ROUTE)
+            http_request_duration.observe(elapsed, labels=(scope["method"], path, status))
+            if db_stats[0]:
+                db_queries_per_request.observe(db_stats[0], labels=(path,))
+                db_time_per_request.observe(db_stats[1], labels=(path,))
+
+
+def instrument_engine(engine, name: str):
+    """Hook query timing and pool gauges onto a (sync) SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        db_query_duration.observe(elapsed, labels=(name,))
+        stats = _request_db.get()
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+
+    pool = engine.pool
+    # Only QueuePool-style pools track checkouts/overflow (not SQLite's)
+    if hasattr(pool, "checkedout") and hasattr(pool, "overflow"):
+        db_pool_checked_out.set_function(pool.checkedout, labels=(name,))
+        db_pool_overflow.set_function(lambda: max(0, pool.overflow()), labels=(name,))
+
+
+def instrument_threadpool():
+    """Expose AnyIO's default thread limiter (used by FastAPI for sync code). Call from the event loop."""
+    from anyio.to_thread import current_default_thread_limiter
+
+    limiter = current_default_thread_limiter()
+    threadpool_busy.set_function(lambda: limiter.borrowed_tokens)
+    threadpool_waiting.set_function(lambda: limiter.statistics().tasks_waiting)
+
+
+def _write_snapshot():
+    try:
+        write_snapshot(settings.METRICS_MULTIPROC_DIR)
+    except OSError as e:
+        logger.warning(f"Could not write metrics snapshot: {e}")
+
+
+async def flush_metrics():
+    """Keep this worker's snapshot in METRICS_MULTIPROC_DIR current for ``/metrics`` merging."""
+    if not settings.METRICS_MULTIPROC_DIR:
+        return
+    try:
+        while True:
+            await asyncio.to_thread(_write_snapshot)
+            await asyncio.sleep(settings.METRICS_FLUSH_INTERVAL)
+    finally:
+        # Final numbers for the archive once gunicorn reaps this worker
+        _write_snapshot()
@@ -0,0 +1,322 @@
+"""Lightweight in-process metrics (Prometheus-style counters, gauges and histograms).
+
+Metrics are kept per worker process. Label values are passed as a tuple so the
+hot path is a dict lookup plus an add under a lock.
+
+Under a pre-forking server a scrape reaches one random worker, so each worker
+also writes a snapshot of its registry to ``METRICS_MULTIPROC_DIR``
+(``write_snapshot``) and ``render_multiprocess`` merges every snapshot in the
+directory: counters and histograms are summed, gauges get a ``worker`` label
+(the pid). When a worker exits, ``mark_process_dead`` folds its counters and
+histograms into an archive file so totals never go backwards, and drops its
+gauges.
+"""
+import fcntl
+import json
+import os
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def collect(self):
+        return list(self._metrics.values())
+
+
+REGISTRY = Registry()
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def inc(self, amount: float = 1.0, labels: tuple = ()):
+        with self._lock:
+            self._values[labels] += amount
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self):
+        return list(self._values.items())
+
+
+class Gauge:
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = defaultdict(float)
+        self._functions = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def set(self, value: float, labels: tuple = ()):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, amount: float = 1.0, labels: tuple = ()):
+        with self._lock:
+            self._values[labels] += amount
+
+    def dec(self, amount: float = 1.0, labels: tuple = ()):
+        self.inc(-amount, labels)
+
+    def set_function(self, fn, labels: tuple = ()):
+        """Evaluate ``fn()`` lazily at collection time instead of storing a value."""
+        self._functions[labels] = fn
+
+    def value(self, labels: tuple = ()) -> float:
+        fn = self._functions.get(labels)
+        if fn is not None:
+            return float(fn())
+        return self._values.get(labels, 0.0)
+
+    def samples(self):
+        values = dict(self._values)
+        for labels, fn in self._functions.items():
+            values[labels] = float(fn())
+        return list(values.items())
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+        registry: Registry = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [bucket counts..., +Inf count, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def observe(self, value: float, labels: tuple = ()):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[idx] += 1
+            row[-1] += value
+
+    def count(self, labels: tuple = ()) -> int:
+        row = self._values.get(labels)
+        return sum(row[:-1]) if row else 0
+
+    def sum(self, labels: tuple = ()) -> float:
+        row = self._values.get(labels)
+        return row[-1] if row else 0.0
+
+    def samples(self):
+        """Return ``(labels, cumulative_bucket_counts, count, sum)`` per label set."""
+        out = []
+        with self._lock:
+            rows = [(labels, list(row)) for labels, row in self._values.items()]
+        for labels, row in rows:
+            cumulative, running = [], 0
+            for c in row[:-1]:
+                running += c
+                cumulative.append(running)
+            out.append((labels, cumulative, running, row[-1]))
+        return out
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render(registry=REGISTRY) -> str:
+    """Prometheus text exposition format (version 0.0.4) for every metric ``registry.collect()`` returns."""
+    lines = []
+    for metric in registry.collect():
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        if metric.type == "histogram":
+            for labels, cumulative, count, total in metric.samples():
+                bounds = [*metric.buckets, float("inf")]
+                for bound, running in zip(bounds, cumulative):
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f"{metric.name}_bucket{_format_labels(metric.labelnames, labels, le)} {running}")
+                lines.append(f"{metric.name}_count{_format_labels(metric.labelnames, labels)} {count}")
+                lines.append(f"{metric.name}_sum{_format_labels(metric.labelnames, labels)} {_format_value(total)}")
+        else:
+            for labels, value in metric.samples():
+                lines.append(f"{metric.name}{_format_labels(metric.labelnames, labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# --- multi-process aggregation ---
+
+ARCHIVE = "archive.json"
+
+
+def snapshot(registry: Registry = REGISTRY) -> list[dict]:
+    """Raw values of every registered metric, JSON-serializable."""
+    out = []
+    for metric in registry.collect():
+        entry = {"name": metric.name, "type": metric.type, "help": metric.documentation,
+                 "labelnames": list(metric.labelnames)}
+        if metric.type == "histogram":
+            with metric._lock:
+                entry["samples"] = [[list(labels), list(row)] for labels, row in metric._values.items()]
+            entry["buckets"] = list(metric.buckets)
+        else:
+            entry["samples"] = [[list(labels), value] for labels, value in metric.samples()]
+        out.append(entry)
+    return out
+
+
+def write_snapshot(directory: str, pid: int | None = None, registry: Registry = REGISTRY):
+    path = Path(directory) / f"{pid or os.getpid()}.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(snapshot(registry)))
+    os.replace(tmp, path)
+
+
+def _read(path: Path) -> list[dict]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return []
+
+
+class MergedMetric:
+    """One metric summed over worker snapshots, shaped like a registered metric for ``render``."""
+
+    def __init__(self, entry: dict):
+        self.name = entry["name"]
+        self.type = entry["type"]
+        self.documentation = entry["help"]
+        self.labelnames = tuple(entry["labelnames"])
+        self.buckets = tuple(entry.get("buckets", ()))
+        self._values = {}
+
+    def add(self, samples: list, worker: str | None = None):
+        for labels, value in samples:
+            labels = tuple(labels)
+            if self.type == "gauge":
+                # A sum of gauges is rarely meaningful: keep one series per worker
+                self._values[(*labels, worker)] = value
+            elif self.type == "histogram":
+                row = self._values.get(labels)
+                if row is None or len(row) != len(value):
+                    self._values[labels] = list(value)
+                else:
+                    self._values[labels] = [a + b for a, b in zip(row, value)]
+            else:
+                self._values[labels] = self._values.get(labels, 0.0) + value
+
+    def samples(self):
+        if self.type != "histogram":
+            return list(self._values.items())
+        out = []
+        for labels, row in self._values.items():
+            cumulative, running = [], 0
+            for c in row[:-1]:
+                running += c
+                cumulative.append(running)
+            out.append((labels, cumulative, running, row[-1]))
+        return out
+
+
+class _Merged:
+    def __init__(self):
+        self._metrics: dict[str, MergedMetric] = {}
+
+    def add(self, entries: list[dict], worker: str | None = None):
+        for entry in entries:
+            metric = self._metrics.get(entry["name"])
+            if metric is None:
+                metric = self._metrics[entry["name"]] = MergedMetric(entry)
+                if metric.type == "gauge":
+                    metric.labelnames = (*metric.labelnames, "worker")
+            metric.add(entry["samples"], worker)
+
+    def collect(self):
+        return list(self._metrics.values())
+
+
+def render_multiprocess(directory: str) -> str:
+    """Exposition of every worker's latest snapshot in ``directory``, merged."""
+    merged = _Merged()
+    root = Path(directory)
+    # Shared lock: never see a dead worker both in the archive and in its own file
+    with open(root / "archive.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_SH)
+        for path in sorted(root.glob("*.json")):
+            if path.name == ARCHIVE:
+                merged.add(_read(path))
+            else:
+                merged.add(_read(path), worker=path.stem)
+    return render(merged)
+
+
+def mark_process_dead(directory: str, pid: int):
+    """Fold an exited worker's counters and histograms into the archive and drop its snapshot."""
+    root = Path(directory)
+    path = root / f"{pid}.json"
+    if not path.exists():
+        return
+    with open(root / "archive.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        merged = _Merged()
+        merged.add(_read(root / ARCHIVE))
+        merged.add([entry for entry in _read(path) if entry["type"] != "gauge"])
+        entries = [
+            {"name": m.name, "type": m.type, "help": m.documentation, "labelnames": list(m.labelnames),
+             "buckets": list(m.buckets), "samples": [[list(labels), value] for labels, value in m._values.items()]}
+            for m in merged.collect()
+        ]
+        tmp = root / f"{ARCHIVE}.tmp"
+        tmp.write_text(json.dumps(entries))
+        os.replace(tmp, root / ARCHIVE)
+        path.unlink(missing_ok=True)
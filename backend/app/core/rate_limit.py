@@ -0,0 +1,261 @@
+"""Sliding-window rate limiting for abuse-prone endpoints (login, register).
+
+Each limit keeps one counter per fixed window. The request rate is estimated as
+the current window's count plus the previous window's count weighted by how much
+of it still overlaps the sliding window. The estimate is within a few percent of
+an exact log, and it costs two integers per key instead of one entry per request.
+
+With Redis, every limit of a policy (per IP and per normalized email) is checked
+and incremented by a single Lua script, so a check is one atomic round-trip that
+is shared by all workers. Without Redis the same arithmetic runs over an
+in-process LRU, so limits then apply per worker.
+
+Usage from a route::
+
+    @router.post("/login", dependencies=[Depends(rate_limit("login"))])
+
+Decorator dependencies are resolved before the endpoint's own parameters, so a
+rejected request never reaches the database or bcrypt.
+"""
+import hashlib
+import ipaddress
+import math
+import threading
+import time
+from functools import lru_cache
+from typing import NamedTuple
+
+from fastapi import HTTPException, Request
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.core.redis import get_async_redis, mark_unavailable
+
+rate_limit_decisions = Counter(
+    "rate_limit_decisions_total",
+    "Rate limiter decisions by policy and result (allowed, rejected)",
+    labelnames=("policy", "result"),
+)
+
+SCOPES = ("ip", "email")
+
+# KEYS: (current, previous) window counter per limit
+# ARGV: (limit, window_ms, elapsed_ms) per limit
+# Returns {allowed, current_1, previous_1, current_2, previous_2, ...}; counters
+# are only incremented when every limit allows the request.
+_SLIDING_WINDOW = """
+local n = #KEYS / 2
+local result = {1}
+local counts = redis.call('mget', unpack(KEYS))
+for i = 0, n - 1 do
+    local current = tonumber(counts[2 * i + 1] or '0')
+    local previous = tonumber(counts[2 * i + 2] or '0')
+    local limit = tonumber(ARGV[3 * i + 1])
+    local window = tonumber(ARGV[3 * i + 2])
+    local elapsed = tonumber(ARGV[3 * i + 3])
+    if previous * (window - elapsed) / window + current + 1 > limit then
+        result[1] = 0
+    end
+    result[2 * i + 2] = current
+    result[2 * i + 3] = previous
+end
+if result[1] == 1 then
+    for i = 0, n - 1 do
+        redis.call('incr', KEYS[2 * i + 1])
+        redis.call('pexpire', KEYS[2 * i + 1], 2 * tonumber(ARGV[3 * i + 2]))
+    end
+end
+return result
+"""
+_SLIDING_WINDOW_SHA = hashlib.sha1(_SLIDING_WINDOW.encode()).hexdigest()
+
+
+class Limit(NamedTuple):
+    scope: str
+    limit: int
+    window: int  # seconds
+
+
+def parse_policy(spec: str) -> tuple[Limit, ...]:
+    """``"ip:30/60,email:10/300"`` -> limits; an empty spec disables the policy."""
+    limits = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        scope, _, rate = part.partition(":")
+        count, _, window = rate.partition("/")
+        if scope not in SCOPES or not count.isdigit() or not window.isdigit() or int(window) <= 0:
+            raise ValueError(f"Invalid rate limit {part!r}; expected <ip|email>:<count>/<seconds>")
+        limits.append(Limit(scope, int(count), int(window)))
+    return tuple(limits)
+
+
+def _exceeds(limit: Limit, current: int, previous: int, elapsed: float) -> bool:
+    return previous * (limit.window - elapsed) / limit.window + current + 1 > limit.limit
+
+
+def retry_after(limit: Limit, current: int, previous: int, elapsed: float) -> float:
+    """Seconds until the sliding estimate leaves room for one more request."""
+    window = limit.window
+    if current + 1 > limit.limit:
+        # Only the current window's count, decaying through the next window, matters
+        decay = window * (1 - (limit.limit - 1) / current) if current else 0.0
+        return (window - elapsed) + decay
+    if previous:
+        return max(0.0, (window - elapsed) - (limit.limit - 1 - current) * window / previous)
+    return 0.0
+
+
+class _Check(NamedTuple):
+    limit: Limit
+    key: str  # current window counter
+    previous_key: str
+    elapsed: float  # seconds into the current window
+
+
+class LocalWindows:
+    """In-process counters for when Redis is unavailable (limits apply per worker)."""
+
+    def __init__(self, maxsize: int):
+        self._counts = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def hit(self, checks: list[_Check]) -> list[tuple[int, int]] | None:
+        """(current, previous) counts per check if any limit rejects, else ``None`` after counting."""
+        with self._lock:
+            counts = [(self._counts.get(c.key, 0), self._counts.get(c.previous_key, 0)) for c in checks]
+            if any(_exceeds(c.limit, *count, c.elapsed) for c, count in zip(checks, counts)):
+                return counts
+            for c, (current, _) in zip(checks, counts):
+                self._counts.set(c.key, current + 1, ttl=2 * c.limit.window)
+        return None
+
+
+class RateLimiter:
+    def __init__(self, prefix: str = "rl", local_size: int = 10000, redis_factory=get_async_redis):
+        self.prefix = prefix
+        self.local = LocalWindows(local_size)
+        self.redis_factory = redis_factory
+
+    def _checks(self, policy: str, limits: list[tuple[Limit, str]], now: float) -> list[_Check]:
+        checks = []
+        for limit, identity in limits:
+            index, elapsed = divmod(now, limit.window)
+            base = f"{self.prefix}:{policy}:{limit.scope}:{limit.window}:{identity}"
+            checks.append(_Check(limit, f"{base}:{int(index)}", f"{base}:{int(index) - 1}", elapsed))
+        return checks
+
+    async def hit(self, policy: str, limits: list[tuple[Limit, str]]) -> float | None:
+        """Count one request against ``limits``; seconds to wait if rejected, else ``None``."""
+        if not limits:
+            return None
+        checks = self._checks(policy, limits, time.time())
+        counts = await self._hit_redis(checks)
+        if counts is False:
+            counts = self.local.hit(checks)
+        if counts is None:
+            return None
+        return max(
+            (
+                retry_after(c.limit, current, previous, c.elapsed)
+                for c, (current, previous) in zip(checks, counts)
+                if _exceeds(c.limit, current, previous, c.elapsed)
+            ),
+            default=0.0,
+        )
+
+    async def _hit_redis(self, checks: list[_Check]):
+        """Like ``LocalWindows.hit``; ``False`` when Redis can't be used."""
+        r = self.redis_factory()
+        if r is None:
+            return False
+        keys = [key for c in checks for key in (c.key, c.previous_key)]
+        args = [value for c in checks for value in (c.limit.limit, c.limit.window * 1000, int(c.elapsed * 1000))]
+        try:
+            try:
+                result = await r.evalsha(_SLIDING_WINDOW_SHA, len(keys), *keys, *args)
+            except Exception as e:
+                # First use on this server (or after SCRIPT FLUSH): send the body once
+                if type(e).__name__ != "NoScriptError":
+                    raise
+                result = await r.eval(_SLIDING_WINDOW, len(keys), *keys, *args)
+        except Exception as e:
+            mark_unavailable(e)
+            return False
+        if result[0]:
+            return None
+        return [(int(result[i]), int(result[i + 1])) for i in range(1, len(result), 2)]
+
+
+@lru_cache(maxsize=4)
+def _trusted_networks(spec: str) -> tuple:
+    return tuple(ipaddress.ip_network(part.strip(), strict=False) for part in spec.split(",") if part.strip())
+
+
+@lru_cache(maxsize=1024)
+def address_in(host: str, spec: str) -> bool:
+    """Whether ``host`` is an IP address inside one of the comma-separated networks in ``spec``."""
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in _trusted_networks(spec))
+
+
+def client_ip(request: Request) -> str:
+    peer = request.client.host if request.client else "unknown"
+    # X-Real-IP is set by nginx from $remote_addr; a client reaching the published
+    # port directly could send anything, so only the configured proxies are believed
+    if address_in(peer, settings.RATE_LIMIT_TRUSTED_PROXIES):
+        real_ip = request.headers.get("x-real-ip")
+        if real_ip:
+            return real_ip.strip()
+    return peer
+
+
+def email_key(email: str) -> str:
+    """Normalized the same way as login/register; hashed so addresses aren't stored in Redis."""
+    normalized = email.lower().strip()
+    return hashlib.blake2b(normalized.encode(), digest_size=12).hexdigest()
+
+
+async def _request_email(request: Request) -> str | None:
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    email = body.get("email") if isinstance(body, dict) else None
+    return email_key(email) if isinstance(email, str) and email.strip() else None
+
+
+rate_limiter = RateLimiter(local_size=settings.RATE_LIMIT_LOCAL_SIZE)
+
+
+def rate_limit(policy: str):
+    """Dependency enforcing ``settings.RATE_LIMIT_<POLICY>``; raises 429 with ``Retry-After``."""
+    limits = parse_policy(getattr(settings, f"RATE_LIMIT_{policy.upper()}"))
+    needs_email = any(limit.scope == "email" for limit in limits)
+
+    async def dependency(request: Request):
+        if not settings.RATE_LIMIT_ENABLED or not limits:
+            return
+        identities = {"ip": client_ip(request)}
+        if needs_email:
+            identities["email"] = await _request_email(request)
+        wait = await rate_limiter.hit(
+            policy,
+            [(limit, identities[limit.scope]) for limit in limits if identities[limit.scope]],
+        )
+        if wait is None:
+            rate_limit_decisions.inc(labels=(policy, "allowed"))
+            return
+        rate_limit_decisions.inc(labels=(policy, "rejected"))
+        raise HTTPException(
+            status_code=429,
+            detail="Too many attempts, please try again later.",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+
+    return dependency
@@ -0,0 +1,73 @@
+"""Shared Redis client.
+
+Redis is optional: when ``REDIS_URL`` is empty or the server can't be reached,
+``get_redis()`` returns ``None`` and callers fall back to in-process state.
+"""
+import logging
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_async_client = None
+_retry_at = 0.0
+# After a connection failure, don't try again for this many seconds.
+RETRY_INTERVAL = 5.0
+
+
+def get_redis():
+    global _client, _retry_at
+    if not settings.REDIS_URL:
+        return None
+    if _client is not None:
+        return _client
+    if time.monotonic() < _retry_at:
+        return None
+    try:
+        import redis
+
+        client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            health_check_interval=30,
+        )
+        client.ping()
+        _client = client
+    except Exception as e:
+        logger.warning(f"Redis unavailable ({e}); using in-process fallback")
+        _retry_at = time.monotonic() + RETRY_INTERVAL
+        return None
+    return _client
+
+
+def mark_unavailable(error: Exception):
+    """Drop the client after a failed command so the next call reconnects (with backoff)."""
+    global _client, _async_client, _retry_at
+    logger.warning(f"Redis error ({error}); using in-process fallback")
+    _client = None
+    _async_client = None
+    _retry_at = time.monotonic() + RETRY_INTERVAL
+
+
+def get_async_redis():
+    """asyncio flavour of ``get_redis`` for use inside async handlers."""
+    global _async_client
+    if not settings.REDIS_URL or time.monotonic() < _retry_at:
+        return None
+    if _async_client is None:
+        try:
+            import redis.asyncio as aioredis
+
+            _async_client = aioredis.Redis.from_url(
+                settings.REDIS_URL,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                health_check_interval=30,
+            )
+        except Exception as e:
+            mark_unavailable(e)
+            return None
+    return _async_client
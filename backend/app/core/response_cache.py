@@ -0,0 +1,282 @@
+"""Response cache for read endpoints.
+
+Serialized JSON responses are stored with a TTL in Redis, or in an in-process
+LRU when Redis is unavailable. A cache miss is recomputed once:
+
+* within a worker, concurrent misses for the same key await a single future.
+  If the request computing it is cancelled, the waiters elect a new leader
+  (the compute function closes over its caller's DB session, so it can't
+  outlive that request);
+* across workers, the first one takes a short Redis lock (``SET NX PX``) and the
+  others poll for the value instead of all hitting the database.
+
+Keys are built from the request path and the query parameters the route
+declares, so unknown ones (cache busters like ``?_=<random>``) share an entry.
+
+Usage from a route::
+
+    @router.get("/lessons/{lesson_id}")
+    async def get_lesson(lesson_id: int, cache: CachedResponder = Depends(cache_response("lesson", ttl=300))):
+        return await cache.respond(lambda: load_lesson(lesson_id))
+"""
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+
+from fastapi import Depends, Request, Response
+
+from app.core.auth_cache import Principal
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram
+from app.core.redis import get_async_redis, mark_unavailable
+from app.core.serialization import dumps
+from app.core.security import get_current_principal
+
+logger = logging.getLogger(__name__)
+
+cache_requests = Counter(
+    "response_cache_requests_total",
+    "Response cache lookups by namespace and result (hit, miss, coalesced)",
+    labelnames=("namespace", "result"),
+)
+cache_compute_time = Histogram(
+    "response_cache_compute_seconds",
+    "Time spent recomputing a cache miss",
+    labelnames=("namespace",),
+)
+cache_lookup_time = Histogram(
+    "response_cache_lookup_seconds",
+    "Time spent reading the cache backend",
+    labelnames=("namespace",),
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+# Release the lock only if we still own it.
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def serialize(payload) -> bytes:
+    return dumps(payload)
+
+
+class CachedValue:
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes, etag: str):
+        self.body = body
+        self.etag = etag
+
+    @classmethod
+    def from_body(cls, body: bytes) -> "CachedValue":
+        return cls(body, f'"{hashlib.md5(body, usedforsecurity=False).hexdigest()}"')
+
+    def dump(self) -> bytes:
+        return self.etag.encode() + b"\n" + self.body
+
+    @classmethod
+    def load(cls, raw: bytes) -> "CachedValue":
+        etag, _, body = raw.partition(b"\n")
+        return cls(body, etag.decode())
+
+
+class ResponseCache:
+    def __init__(self, prefix: str = "rc", local_size: int = 1024, redis_factory=get_async_redis):
+        self.prefix = prefix
+        self.local = LRUCache(maxsize=local_size)
+        self._redis_factory = redis_factory
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def get(self, key: str) -> CachedValue | None:
+        r = self._redis_factory()
+        if r is None:
+            return self.local.get(key)
+        try:
+            raw = await r.get(self._key(key))
+        except Exception as e:
+            mark_unavailable(e)
+            return self.local.get(key)
+        return CachedValue.load(raw) if raw else None
+
+    async def set(self, key: str, value: CachedValue, ttl: int):
+        r = self._redis_factory()
+        if r is not None:
+            try:
+                await r.set(self._key(key), value.dump(), ex=ttl)
+                return
+            except Exception as e:
+                mark_unavailable(e)
+        self.local.set(key, value, ttl=ttl)
+
+    async def delete(self, key: str):
+        self.local.delete(key)
+        r = self._redis_factory()
+        if r is not None:
+            try:
+                await r.delete(self._key(key))
+            except Exception as e:
+                mark_unavailable(e)
+
+    async def _wait_for_peer(self, r, key: str) -> CachedValue | None:
+        """Another worker holds the recompute lock: poll for its result until the lock expires."""
+        deadline = time.monotonic() + settings.RESPONSE_CACHE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            value = await self.get(key)
+            if value is not None:
+                return value
+            try:
+                if not await r.exists(self._key(f"lock:{key}")):
+                    return None
+            except Exception as e:
+                mark_unavailable(e)
+                return None
+        return None
+
+    async def _compute(self, key: str, ttl: int, compute, namespace: str) -> CachedValue:
+        r = self._redis_factory()
+        lock_key, token = self._key(f"lock:{key}"), uuid.uuid4().hex
+        locked = False
+        if r is not None:
+            try:
+                locked = await r.set(lock_key, token, nx=True, px=int(settings.RESPONSE_CACHE_LOCK_TIMEOUT * 1000))
+            except Exception as e:
+                mark_unavailable(e)
+                r = None
+            if r is not None and not locked:
+                value = await self._wait_for_peer(r, key)
+                if value is not None:
+                    cache_requests.inc(labels=(namespace, "coalesced"))
+                    return value
+        try:
+            started = time.perf_counter()
+            payload = compute()
+            if asyncio.iscoroutine(payload):
+                payload = await payload
+            value = CachedValue.from_body(serialize(payload))
+            cache_compute_time.observe(time.perf_counter() - started, labels=(namespace,))
+            await self.set(key, value, ttl)
+            return value
+        finally:
+            if locked:
+                try:
+                    await r.eval(_RELEASE_LOCK, 1, lock_key, token)
+                except Exception as e:
+                    mark_unavailable(e)
+
+    async def get_or_compute(self, key: str, ttl: int, compute, namespace: str = "default") -> CachedValue:
+        """Return the cached value for ``key`` or compute it once, however many callers are waiting."""
+        started = time.perf_counter()
+        value = await self.get(key)
+        cache_lookup_time.observe(time.perf_counter() - started, labels=(namespace,))
+        if value is not None:
+            cache_requests.inc(labels=(namespace, "hit"))
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            cache_requests.inc(labels=(namespace, "coalesced"))
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # Our own request was cancelled, or only the leader's was
+                if asyncio.current_task().cancelling() or not inflight.cancelled():
+                    raise
+            # Start over: another waiter may already have taken over or finished
+            return await self.get_or_compute(key, ttl, compute, namespace)
+
+        cache_requests.inc(labels=(namespace, "miss"))
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._compute(key, ttl, compute, namespace)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Don't warn about an exception nobody else awaited
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+
+response_cache = ResponseCache(local_size=settings.RESPONSE_CACHE_LOCAL_SIZE)
+
+
+class CachedResponder:
+    """Per-request handle that builds the cache key and turns a hit into a response."""
+
+    def __init__(self, request: Request, namespace: str, ttl: int, key: str, cache: ResponseCache):
+        self.request = request
+        self.namespace = namespace
+        self.ttl = ttl
+        self.key = key
+        self.cache = cache
+
+    async def respond(self, compute, headers: dict | None = None) -> Response:
+        value = await self.cache.get_or_compute(self.key, self.ttl, compute, namespace=self.namespace)
+        headers = {"ETag": value.etag, **(headers or {})}
+        if_none_match = self.request.headers.get("if-none-match", "")
+        if value.etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        return Response(content=value.body, media_type="application/json", headers=headers)
+
+    async def invalidate(self):
+        await self.cache.delete(self.key)
+
+
+def _declared_query_params(dependant) -> set[str]:
+    names = {param.alias for param in dependant.query_params}
+    for sub in dependant.dependencies:
+        names |= _declared_query_params(sub)
+    return names
+
+
+def _query_params(request: Request) -> frozenset[str] | None:
+    route = request.scope.get("route")
+    dependant = getattr(route, "dependant", None)
+    if dependant is None:
+        return None
+    # Computed once per route and kept on it
+    names = getattr(route, "_cached_query_params", None)
+    if names is None:
+        names = frozenset(_declared_query_params(dependant))
+        route._cached_query_params = names
+    return names
+
+
+def _request_key(namespace: str, request: Request, user_id: int | None = None) -> str:
+    declared = _query_params(request)
+    query = "&".join(
+        f"{k}={v}" for k, v in sorted(request.query_params.multi_items()) if declared is None or k in declared
+    )
+    scope = f"u{user_id}" if user_id is not None else "shared"
+    return f"{namespace}:{scope}:{request.url.path}?{query}"
+
+
+def cache_response(namespace: str, ttl: int | None = None, per_user: bool = False, cache: ResponseCache = response_cache):
+    """Dependency factory yielding a ``CachedResponder`` keyed by path + query (+ user id if ``per_user``)."""
+    ttl = ttl or settings.RESPONSE_CACHE_TTL
+
+    if per_user:
+        async def per_user_responder(request: Request, principal: Principal = Depends(get_current_principal)):
+            return CachedResponder(request, namespace, ttl, _request_key(namespace, request, principal.id), cache)
+        return per_user_responder
+
+    async def shared_responder(request: Request):
+        return CachedResponder(request, namespace, ttl, _request_key(namespace, request), cache)
+    return shared_responder
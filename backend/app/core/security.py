@@ -1,46 +1,52 @@
 # Now import all other modules
 from datetime import datetime, timedelta
-from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 
-from passlib.context import CryptContext
-
 from app.core.config import settings
-from app.db.session import get_db
+from app.core.hashing import get_pwd_context, get_password_hash, verify_password
+from app.core.auth_cache import (
+    Principal,
+    UserSnapshot,
+    cache_claims,
+    cache_user_snapshot,
+    get_cached_claims,
+    get_user_snapshot,
+    stale_before,
+)
+from app.db.session import get_async_db
 from app.models.user import User
 
 logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-# Configure password hashing context
-pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    deprecated="auto",
+# Clock skew tolerated when checking token expiry
+JWT_LEEWAY = 60
+
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
 )
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+def decode_token(token: str) -> dict:
+    """Verify a JWT, reusing the cached claims when this exact token was seen before."""
+    claims = get_cached_claims(token, leeway=JWT_LEEWAY)
+    if claims is not None:
+        return claims
+    # Imported lazily to keep app import fast (see gunicorn.conf.py preload)
+    from jose import jwt, JWTError
     try:
         payload = jwt.decode(
             token,
             settings.JWT_SECRET_KEY,
             algorithms=["HS256"],
-            options={"leeway": 60}
+            options={"leeway": JWT_LEEWAY}
         )
-        user_id: str | None = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
     except JWTError as e:
         logger.error(f"JWT Error: {e}")
         raise HTTPException(
@@ -48,50 +54,78 @@ def get_current_user(
             detail=f"JWT Error: {str(e)}",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    # Validated token
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    if user is None:
-        logger.error(f"User ID {user_id} not found")
+    if payload.get("sub") is None:
+        raise credentials_exception
+    cache_claims(token, payload)
+    return payload
+
+async def get_token_claims(token: str = Depends(oauth2_scheme)) -> dict:
+    return decode_token(token)
+
+async def load_user_snapshot(user_id: int, db: AsyncSession) -> UserSnapshot:
+    snapshot = await get_user_snapshot(user_id)
+    if snapshot is None:
+        user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+        if user is None:
+            logger.error(f"User ID {user_id} not found")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail=f"User ID {user_id} not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        snapshot = UserSnapshot.from_user(user)
+        await cache_user_snapshot(snapshot)
+    if not snapshot.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"User ID {user_id} not found",
+            detail="Inactive user",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return user
+    return snapshot
 
-def get_password_hash(password: str) -> str:
-    # bcrypt only uses first 72 bytes — truncate to avoid ValueError
-    password_bytes = password.encode('utf-8')
-    if len(password_bytes) > 72:
-        password = password_bytes[:72].decode('utf-8', errors='ignore')
-    return pwd_context.hash(password)
+async def get_current_user(
+    claims: dict = Depends(get_token_claims),
+    db: AsyncSession = Depends(get_async_db),
+) -> UserSnapshot:
+    # Only touches the DB when the user snapshot isn't cached
+    return await load_user_snapshot(int(claims["sub"]), db)
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+async def get_current_principal(
+    claims: dict = Depends(get_token_claims),
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    """Authorize from token claims alone unless the user's role changed after the token was issued."""
+    user_id = int(claims["sub"])
+    role = claims.get("role")
+    issued_at = claims.get("iat")
+    marker = await stale_before(user_id)
+    if role is not None and (not marker or (issued_at is not None and issued_at > marker)):
+        return Principal(id=user_id, role=role, issued_at=issued_at)
+    snapshot = await load_user_snapshot(user_id, db)
+    return Principal(id=snapshot.id, role=snapshot.role, issued_at=issued_at)
 
 def create_access_token(user_id: int, role: str = "user", expires_delta: timedelta = None):
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=60)
+    """Short-lived JWT authorized from its claims alone; sessions are extended with refresh tokens."""
+    issued_at = datetime.utcnow()
+    expire = issued_at + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
 
     to_encode = {
         "sub": str(user_id),
         "role": role,
         "exp": expire,
-        "iat": datetime.utcnow()
+        "iat": issued_at
     }
+    from jose import jwt
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm="HS256")
     return encoded_jwt
 
 
 def require_role(required_role: str):
-    def checker(user: User = Depends(get_current_user)):
-        if user.role != required_role:
+    async def checker(principal: Principal = Depends(get_current_principal)):
+        if principal.role != required_role:
             raise HTTPException(
                 status_code=403,
                 detail="Insufficient permissions"
             )
-        return user
+        return principal
     return checker
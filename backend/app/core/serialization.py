@@ -0,0 +1,31 @@
+"""Fast JSON encoding for API responses.
+
+``dumps`` uses orjson, which natively handles datetimes, dataclasses (e.g.
+``UserSnapshot``) and UUIDs and is several times faster than
+``jsonable_encoder`` + ``json.dumps``. Pydantic models are dumped through their
+compiled serializers. ``FastJSONResponse`` is the app's default response class.
+"""
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(payload) -> bytes:
+    return orjson.dumps(payload, default=_default, option=OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,198 @@
+"""Read replica routing for read-only endpoints.
+
+``get_read_db`` (app/db/session.py) hands out a session on a replica picked
+round-robin among those that are up and within ``DB_REPLICA_MAX_LAG`` seconds of
+the primary, and on the primary otherwise. Each worker checks every replica
+every ``DB_REPLICA_CHECK_INTERVAL`` seconds: a connection plus, on Postgres, the
+replay lag (``pg_last_xact_replay_timestamp``). A replica whose connection
+fails during a request is taken out until its next successful check.
+
+Read-your-writes: a successful POST/PUT/PATCH/DELETE by an authenticated user
+pins that user's reads to the primary for ``DB_READ_YOUR_WRITES_SECONDS``, so
+they don't read a replica that hasn't replayed their write yet. The pin is
+stored in Redis so it holds on whichever worker serves the next request;
+without Redis it applies on the worker that handled the write.
+"""
+import asyncio
+import itertools
+import logging
+
+from sqlalchemy import text
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge
+from app.core.redis import get_async_redis, mark_unavailable
+
+logger = logging.getLogger(__name__)
+
+db_replica_up = Gauge(
+    "db_replica_up",
+    "1 if the replica passed its last health check",
+    labelnames=("replica",),
+)
+db_replica_lag = Gauge(
+    "db_replica_lag_seconds",
+    "Replication lag seen by the last health check",
+    labelnames=("replica",),
+)
+db_read_routes = Counter(
+    "db_read_routes_total",
+    "Read-only sessions by target (replica, primary_sticky, primary_fallback)",
+    labelnames=("target",),
+)
+
+# 0 on a caught-up standby (or a primary standing in for one)
+POSTGRES_LAG = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+SQLITE_LAG = text("SELECT 0")
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class Replica:
+    def __init__(self, name: str, engine, sessionmaker):
+        self.name = name
+        self.engine = engine
+        self.sessionmaker = sessionmaker
+        # Unknown until the first check; reads go to the primary meanwhile
+        self.up = False
+        self.lag = None
+
+    @property
+    def usable(self) -> bool:
+        return self.up and self.lag is not None and self.lag <= settings.DB_REPLICA_MAX_LAG
+
+    def mark_down(self, error: Exception):
+        if self.up:
+            logger.warning(f"Replica {self.name} down ({error}); reading from the primary")
+        self.up = False
+        db_replica_up.set(0, labels=(self.name,))
+
+
+class StickyWrites:
+    """Users who wrote recently, so their reads stay on the primary."""
+
+    def __init__(self, window: float, maxsize: int = 10000, prefix: str = "rw", redis_factory=get_async_redis):
+        self.window = window
+        self.prefix = prefix
+        self.local = LRUCache(maxsize=maxsize, ttl=window)
+        self.redis_factory = redis_factory
+
+    async def mark(self, user_id: int):
+        self.local.set(user_id, True)
+        r = self.redis_factory()
+        if r is None:
+            return
+        try:
+            await r.set(f"{self.prefix}:{user_id}", 1, px=int(self.window * 1000))
+        except Exception as e:
+            mark_unavailable(e)
+
+    async def active(self, user_id: int) -> bool:
+        if self.local.get(user_id):
+            return True
+        r = self.redis_factory()
+        if r is None:
+            return False
+        try:
+            return bool(await r.exists(f"{self.prefix}:{user_id}"))
+        except Exception as e:
+            mark_unavailable(e)
+            return False
+
+
+def request_user_id(headers) -> int | None:
+    """User id from a valid bearer token, or ``None`` (anonymous or invalid)."""
+    header = headers.get("authorization", "")
+    if not header.lower().startswith("bearer "):
+        return None
+    # Imported here: app.core.security imports app.db.session
+    from app.core.security import decode_token
+    try:
+        return int(decode_token(header[7:])["sub"])
+    except Exception:
+        return None
+
+
+class ReplicaRouter:
+    def __init__(self, replicas: list[Replica], sticky: StickyWrites):
+        self.replicas = replicas
+        self.sticky = sticky
+        self._turn = itertools.count()
+
+    def pick(self) -> Replica | None:
+        usable = [replica for replica in self.replicas if replica.usable]
+        if not usable:
+            return None
+        return usable[next(self._turn) % len(usable)]
+
+    async def route(self, headers) -> Replica | None:
+        """Replica for this request's reads, or ``None`` for the primary."""
+        if not self.replicas:
+            return None
+        user_id = request_user_id(headers)
+        if user_id is not None and await self.sticky.active(user_id):
+            db_read_routes.inc(labels=("primary_sticky",))
+            return None
+        replica = self.pick()
+        db_read_routes.inc(labels=("replica" if replica else "primary_fallback",))
+        return replica
+
+    async def check(self, replica: Replica):
+        query = SQLITE_LAG if replica.engine.dialect.name == "sqlite" else POSTGRES_LAG
+
+        async def measure():
+            async with replica.engine.connect() as conn:
+                return float(await conn.scalar(query) or 0)
+
+        try:
+            lag = await asyncio.wait_for(measure(), settings.DB_REPLICA_CHECK_TIMEOUT)
+        except Exception as e:
+            replica.mark_down(e)
+            return
+        if not replica.up:
+            logger.info(f"Replica {replica.name} up (lag {lag:.1f}s)")
+        if lag > settings.DB_REPLICA_MAX_LAG and (replica.lag or 0) <= settings.DB_REPLICA_MAX_LAG:
+            logger.warning(f"Replica {replica.name} is {lag:.1f}s behind; reading from the primary")
+        replica.up, replica.lag = True, lag
+        db_replica_up.set(1, labels=(replica.name,))
+        db_replica_lag.set(lag, labels=(replica.name,))
+
+    async def run(self):
+        """Health-check replicas forever (a startup task; returns at once without replicas)."""
+        while self.replicas:
+            await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+            await asyncio.sleep(settings.DB_REPLICA_CHECK_INTERVAL)
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+class ReadYourWritesMiddleware:
+    """Pins a user's reads to the primary after a successful write request."""
+
+    def __init__(self, app, sticky: StickyWrites):
+        self.app = app
+        self.sticky = sticky
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"] if k == b"authorization"}
+        user_id = request_user_id(headers)
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_marking(message):
+            # Before the response leaves, so the client's next read already sees the pin
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                await self.sticky.mark(user_id)
+            await send(message)
+
+        await self.app(scope, receive, send_marking)
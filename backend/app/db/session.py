@@ -1,8 +1,60 @@
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.replicas import Replica, ReplicaRouter, StickyWrites
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver (asyncpg / aiosqlite)."""
+    scheme, _, rest = url.partition("://")
+    driver = {
+        "postgresql": "postgresql+asyncpg",
+        "postgresql+psycopg2": "postgresql+asyncpg",
+        "postgres": "postgresql+asyncpg",
+        "sqlite": "sqlite+aiosqlite",
+    }.get(scheme, scheme)
+    return f"{driver}://{rest}"
+
+
+# Pools per worker process on the primary: the sync engine and the async engine
+ENGINES_PER_WORKER = 2
+# Pools per worker process on each replica: one async engine (replicas are
+# separate servers, each with its own DB_MAX_CONNECTIONS)
+REPLICA_ENGINES_PER_WORKER = 1
+
+
+def connection_budget(engines_per_worker: int = ENGINES_PER_WORKER) -> int:
+    """Max connections one engine in one process may open so all web and job worker
+    processes together stay under DB_MAX_CONNECTIONS."""
+    available = settings.DB_MAX_CONNECTIONS - settings.DB_RESERVED_CONNECTIONS
+    processes = max(1, settings.WEB_CONCURRENCY) + max(0, settings.JOB_WORKER_PROCESSES)
+    return max(1, available // (processes * engines_per_worker))
+
+
+def pool_options(url: str, engines_per_worker: int = ENGINES_PER_WORKER) -> dict:
+    # Pre-ping costs one network round-trip to the database per checkout
+    # but turns connections killed by a failover or server restart into a
+    # transparent reconnect instead of a failed request; pool_recycle handles
+    # the predictable case (server/proxy idle timeouts) up front. LIFO reuse of
+    # the most recently returned connection lets idle extras age out.
+    if url.startswith("sqlite"):
+        return {}
+    budget = connection_budget(engines_per_worker)
+    pool_size = min(settings.DB_POOL_SIZE, budget)
+    return {
+        "pool_size": pool_size,
+        "max_overflow": min(settings.DB_MAX_OVERFLOW, budget - pool_size),
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_use_lifo": True,
+    }
+
+
+engine = create_engine(settings.DATABASE_URL, **pool_options(settings.DATABASE_URL))
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -10,9 +62,52 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL))
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    # Attributes must stay readable after commit; lazy refresh isn't possible on the loop
+    expire_on_commit=False,
+)
+
+def _replica(index: int, url: str) -> Replica:
+    url = async_database_url(url.strip())
+    replica_engine = create_async_engine(url, **pool_options(url, REPLICA_ENGINES_PER_WORKER))
+    return Replica(
+        f"replica{index}",
+        replica_engine,
+        async_sessionmaker(replica_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False),
+    )
+
+
+replica_router = ReplicaRouter(
+    [_replica(i, url) for i, url in enumerate(settings.DATABASE_REPLICA_URLS.split(",")) if url.strip()],
+    StickyWrites(settings.DB_READ_YOUR_WRITES_SECONDS),
+)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_read_db(request: Request):
+    """Session for read-only endpoints: a healthy, caught-up replica unless this
+    user wrote within DB_READ_YOUR_WRITES_SECONDS; the primary otherwise."""
+    replica = await replica_router.route(request.headers)
+    async with (replica.sessionmaker if replica else AsyncSessionLocal)() as db:
+        try:
+            yield db
+        except DBAPIError as e:
+            if replica is not None and (e.connection_invalidated or isinstance(e, OperationalError)):
+                replica.mark_down(e)
+            raise
@@ -1,9 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.instrumentation import MetricsMiddleware, flush_metrics, instrument_engine, instrument_threadpool
+from app.core.serialization import FastJSONResponse
+from app.db.replicas import ReadYourWritesMiddleware
+from app.db.session import async_engine, engine, replica_router
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 app.add_middleware(
     SessionMiddleware,
@@ -18,11 +23,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(CompressionMiddleware)
+
+if replica_router.replicas:
+    app.add_middleware(ReadYourWritesMiddleware, sticky=replica_router.sticky)
+
+# Outermost, so latency includes the other middleware
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
 # Import routers AFTER app is created
-from app.api import auth, health, users, admin, feed
+from app.api import auth, health, users, admin, feed, content, quizzes, progress, reviews, live, jobs
 
 app.include_router(health.router)
 app.include_router(auth.router, prefix="/auth")
 app.include_router(users.router)
 app.include_router(feed.router)
 app.include_router(admin.router)
+app.include_router(content.router)
+app.include_router(quizzes.router)
+app.include_router(progress.router)
+app.include_router(reviews.router)
+app.include_router(live.router)
+app.include_router(jobs.router)
+
+
+@app.on_event("startup")
+async def start_background_flushers():
+    import asyncio
+    from app.services.live_service import live_hub
+    from app.services.oidc_service import oidc_client
+    from app.services.progress_service import progress_buffer
+    instrument_threadpool()
+    app.state.progress_flusher = asyncio.create_task(progress_buffer.run())
+    app.state.live_relay = asyncio.create_task(live_hub.run())
+    app.state.replica_monitor = asyncio.create_task(replica_router.run())
+    app.state.metrics_flusher = asyncio.create_task(flush_metrics())
+    # Not awaited: a slow identity provider mustn't delay startup
+    app.state.oidc_prefetch = asyncio.create_task(oidc_client.prefetch())
+
+
+@app.on_event("shutdown")
+async def shutdown_pools():
+    from app.core.hashing import password_hasher
+    from app.services.oidc_service import oidc_client
+    password_hasher.shutdown()
+    app.state.oidc_prefetch.cancel()
+    app.state.live_relay.cancel()
+    app.state.replica_monitor.cancel()
+    app.state.metrics_flusher.cancel()
+    app.state.progress_flusher.cancel()
+    for flusher in (app.state.progress_flusher, app.state.metrics_flusher):
+        try:
+            await flusher
+        except BaseException:
+            pass
+    await oidc_client.aclose()
+    await replica_router.dispose()
+    await async_engine.dispose()
@@ -1,3 +1,8 @@
 from .lesson import Lesson
 from .feed_item import FeedItem
 from .user_progress import UserProgress
+from .user_feed import UserFeedEntry
+from .ingestion_job import IngestionJob
+from .quiz import Quiz
+from .refresh_token import RefreshToken
+from .review_card import ReviewCard
@@ -1,12 +1,19 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Text
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Text, Index
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
 
 class FeedItem(Base):
     __tablename__ = "feed_items"
+    __table_args__ = (
+        # Keyset pagination walks the feed by (order, id)
+        Index("ix_feed_items_order_id", "order", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
     order = Column(Integer, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
     content_type = Column(String(50))
+
+    lesson = relationship("Lesson")
@@ -1,10 +1,43 @@
 from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy.orm import deferred, validates
 from app.db.base import Base
 
+# Feed cards show this much of the body (plus an ellipsis when cut)
+EXCERPT_CHARS = 280
+
+
+def make_excerpt(content: str, limit: int = EXCERPT_CHARS) -> str:
+    """Whitespace-collapsed start of ``content``, cut at a word boundary."""
+    flat = " ".join(content[: limit * 4].split())
+    if len(flat) <= limit:
+        return flat
+    head = flat[: limit + 1]
+    cut = head.rsplit(" ", 1)[0] if " " in head else flat[:limit]
+    return cut.rstrip(" ,.;:") + "…"
+
+
 class Lesson(Base):
     __tablename__ = "lessons"
 
     id = Column(Integer, primary_key=True, index=True)
+    # Stable id from the source catalog; the upsert key for bulk ingestion
+    external_id = Column(String(255), unique=True, index=True, nullable=True)
     title = Column(String(255), nullable=False)
-    content = Column(Text, nullable=False)
+    # Bodies can be megabytes: never loaded with the row, only when read
+    # explicitly (GET /lessons/{id}, or streamed from /lessons/{id}/body)
+    content = deferred(Column(Text, nullable=False))
+    # Precomputed at write time so list views never touch ``content``
+    excerpt = Column(String(EXCERPT_CHARS + 1), nullable=True)
     type = Column(String(50), nullable=False)  # text | quiz | audio
+
+    @validates("content")
+    def _sync_excerpt(self, key, content):
+        self.excerpt = make_excerpt(content) if content is not None else None
+        return content
+
+
+# Postgres-only search objects created by migration b7e5c2d9f413. They are not
+# mapped (SQLite can't build them for the benchmarks' create_all), so Alembic
+# autogenerate is told to leave them alone (see alembic/env.py).
+SEARCH_VECTOR_COLUMN = "search_vector"
+SEARCH_DB_OBJECTS = {SEARCH_VECTOR_COLUMN, "ix_lessons_search_vector", "ix_lessons_title_trgm"}
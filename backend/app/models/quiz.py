@@ -1,5 +1,21 @@
+from sqlalchemy import Column, Integer, ForeignKey, Float, JSON, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.base import Base
 
-from pydantic import BaseModel
+class Quiz(Base):
+    """A versioned quiz definition for a lesson.
 
-class Quiz(BaseModel):
-    pass
+    ``questions`` is a list of ``{"id": str, "prompt": str, "choices": [str], "answer": int | [int]}``.
+    Definitions are immutable: editing a quiz inserts a new version.
+    """
+    __tablename__ = "quizzes"
+    __table_args__ = (
+        UniqueConstraint("lesson_id", "version", name="uq_quizzes_lesson_version"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), nullable=False)
+    version = Column(Integer, nullable=False, default=1)
+    questions = Column(JSON, nullable=False)
+    pass_score = Column(Float, nullable=False, default=0.7)
+    created_at = Column(DateTime, server_default=func.now())
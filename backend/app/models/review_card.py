@@ -0,0 +1,20 @@
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer
+from app.db.base import Base
+
+class ReviewCard(Base):
+    """Spaced-repetition state of one lesson for one user (see app/services/review_service.py)."""
+    __tablename__ = "review_cards"
+    __table_args__ = (
+        # Due queue: "next N reviews" is one (user_id, due_at) range scan, already in due order
+        Index("ix_review_cards_user_due", "user_id", "due_at"),
+    )
+
+    # Also the upsert target of the batch scheduler
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), primary_key=True)
+    ease = Column(Float, nullable=False)
+    interval_days = Column(Float, nullable=False)
+    repetitions = Column(Integer, nullable=False, default=0)  # successful reviews in a row
+    lapses = Column(Integer, nullable=False, default=0)
+    due_at = Column(DateTime, nullable=False)
+    last_reviewed_at = Column(DateTime, nullable=True)
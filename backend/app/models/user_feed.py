@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, ForeignKey, Float
+from app.db.base import Base
+
+class UserFeedEntry(Base):
+    """Materialized next-N feed for a user, read with a single (user_id, position) range scan."""
+    __tablename__ = "user_feed"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), nullable=False)
+    score = Column(Float, nullable=False)
@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, Boolean, Index
 from app.db.base import Base
 
 class UserProgress(Base):
     __tablename__ = "user_progress"
+    __table_args__ = (
+        # Upsert target for the progress write-behind flush; also serves per-user reads
+        Index("uq_user_progress_user_lesson", "user_id", "lesson_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,3 +1,345 @@
+"""Async orchestration of external model calls.
 
-class AIOrchestrator:
+Per provider: one pooled (HTTP/2) ``httpx.AsyncClient``, a concurrency
+semaphore and a token-bucket rate limit. Identical requests share one upstream
+call while it is in flight, and deterministic responses (temperature 0 by
+default) are stored in a content-addressed disk cache keyed by
+``sha256(provider, model, normalized messages, params)`` with size-based LRU
+eviction.
+
+Providers speak the OpenAI-compatible ``POST /v1/chat/completions`` protocol
+and are configured through ``AI_PROVIDERS`` (JSON), e.g.::
+
+    {"openai": {"base_url": "https://api.openai.com", "api_key": "...",
+                "max_concurrency": 8, "rate_per_second": 5, "burst": 10,
+                "cost_per_1k_input": 0.00015, "cost_per_1k_output": 0.0006}}
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+ai_call_latency = Histogram(
+    "ai_call_latency_seconds",
+    "Upstream model call latency",
+    labelnames=("provider", "model"),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0),
+)
+ai_tokens = Counter(
+    "ai_tokens_total",
+    "Tokens billed by upstream providers",
+    labelnames=("provider", "model", "kind"),
+)
+ai_cost = Counter(
+    "ai_cost_usd_total",
+    "Estimated upstream spend in USD",
+    labelnames=("provider", "model"),
+)
+ai_requests = Counter(
+    "ai_requests_total",
+    "Orchestrator requests by outcome (upstream, cache_hit, coalesced, error)",
+    labelnames=("provider", "result"),
+)
+
+# Request parameters that don't change the model output
+NON_SEMANTIC_PARAMS = {"user", "stream", "timeout", "metadata"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ProviderError(Exception):
     pass
+
+
+@dataclass
+class ProviderConfig:
+    name: str
+    base_url: str
+    api_key: str = ""
+    max_concurrency: int = 8
+    rate_per_second: float = 10.0
+    burst: int = 10
+    cost_per_1k_input: float = 0.0
+    cost_per_1k_output: float = 0.0
+    http2: bool = True
+    timeout: float = 60.0
+
+
+@dataclass
+class AIResponse:
+    provider: str
+    model: str
+    text: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    latency: float = 0.0
+    cached: bool = False
+    raw: dict = field(default_factory=dict, repr=False)
+
+    def to_dict(self) -> dict:
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "text": self.text,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": self.cost_usd,
+            "raw": self.raw,
+        }
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens/second, up to ``burst`` stored."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DiskCache:
+    """Content-addressed response cache on disk, evicting least-recently-used entries past ``max_bytes``."""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._index: OrderedDict[str, int] | None = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        entries = []
+        if self.root.exists():
+            for path in self.root.glob("*/*.json"):
+                stat = path.stat()
+                entries.append((stat.st_mtime, path.stem, stat.st_size))
+        self._index = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._size = sum(self._index.values())
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            self._load_index()
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_bytes())
+            os.utime(path)
+            return data
+        except (OSError, ValueError):
+            with self._lock:
+                self._size -= self._index.pop(key, 0)
+            return None
+
+    def set(self, key: str, value: dict):
+        body = json.dumps(value, separators=(",", ":")).encode()
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(body)
+        os.replace(tmp, path)
+        with self._lock:
+            self._load_index()
+            self._size += len(body) - self._index.pop(key, 0)
+            self._index[key] = len(body)
+            while self._size > self.max_bytes and len(self._index) > 1:
+                old_key, old_size = self._index.popitem(last=False)
+                self._path(old_key).unlink(missing_ok=True)
+                self._size -= old_size
+
+
+def normalize_messages(messages: list[dict]) -> list[dict]:
+    """Whitespace-insensitive form of the conversation used for cache keys."""
+    return [
+        {"role": m["role"], "content": " ".join(str(m["content"]).split())}
+        for m in messages
+    ]
+
+
+def cache_key(provider: str, model: str, messages: list[dict], params: dict) -> str:
+    semantic = {k: v for k, v in params.items() if k not in NON_SEMANTIC_PARAMS}
+    canonical = json.dumps(
+        {"provider": provider, "model": model, "messages": normalize_messages(messages), "params": semantic},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class Provider:
+    def __init__(self, config: ProviderConfig):
+        self.config = config
+        self.semaphore = asyncio.Semaphore(config.max_concurrency)
+        self.bucket = TokenBucket(config.rate_per_second, config.burst)
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            headers = {"Authorization": f"Bearer {self.config.api_key}"} if self.config.api_key else {}
+            self._client = httpx.AsyncClient(
+                base_url=self.config.base_url,
+                headers=headers,
+                http2=self.config.http2,
+                timeout=self.config.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.config.max_concurrency,
+                    max_keepalive_connections=self.config.max_concurrency,
+                ),
+            )
+        return self._client
+
+    async def call(self, model: str, messages: list[dict], params: dict) -> AIResponse:
+        payload = {"model": model, "messages": messages, **params}
+        async with self.semaphore:
+            for attempt in range(3):
+                await self.bucket.acquire()
+                started = time.perf_counter()
+                try:
+                    resp = await self.client.post("/v1/chat/completions", json=payload)
+                except httpx.TransportError as e:
+                    if attempt == 2:
+                        raise ProviderError(f"{self.config.name}: {e}") from e
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+                    continue
+                latency = time.perf_counter() - started
+                if resp.status_code in RETRY_STATUSES and attempt < 2:
+                    retry_after = resp.headers.get("retry-after")
+                    await asyncio.sleep(float(retry_after) if retry_after else 0.5 * 2 ** attempt)
+                    continue
+                if resp.status_code >= 400:
+                    raise ProviderError(f"{self.config.name}: HTTP {resp.status_code}: {resp.text[:200]}")
+                return self._parse(model, resp.json(), latency)
+        raise ProviderError(f"{self.config.name}: retries exhausted")
+
+    def _parse(self, model: str, data: dict, latency: float) -> AIResponse:
+        usage = data.get("usage") or {}
+        input_tokens = usage.get("prompt_tokens", 0)
+        output_tokens = usage.get("completion_tokens", 0)
+        cost = (
+            input_tokens / 1000 * self.config.cost_per_1k_input
+            + output_tokens / 1000 * self.config.cost_per_1k_output
+        )
+        return AIResponse(
+            provider=self.config.name,
+            model=model,
+            text=data["choices"][0]["message"]["content"],
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cost_usd=cost,
+            latency=latency,
+            raw=data,
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class AIOrchestrator:
+    def __init__(self, providers: list[ProviderConfig], cache: DiskCache | None = None):
+        self.providers = {p.name: Provider(p) for p in providers}
+        self.cache = cache
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    @classmethod
+    def from_settings(cls) -> "AIOrchestrator":
+        configs = json.loads(settings.AI_PROVIDERS or "{}")
+        return cls(
+            [ProviderConfig(name=name, **cfg) for name, cfg in configs.items()],
+            cache=DiskCache(settings.AI_CACHE_DIR, settings.AI_CACHE_MAX_BYTES) if settings.AI_CACHE_DIR else None,
+        )
+
+    async def complete(
+        self,
+        provider: str,
+        model: str,
+        messages: list[dict],
+        cache: bool | None = None,
+        **params,
+    ) -> AIResponse:
+        """Run a chat completion through the provider's limits, dedup and cache.
+
+        ``cache`` defaults to True for deterministic requests (temperature 0 or unset).
+        """
+        if provider not in self.providers:
+            raise ProviderError(f"Unknown provider {provider!r}")
+        if cache is None:
+            cache = params.get("temperature", 0) == 0
+        key = cache_key(provider, model, messages, params)
+
+        if cache and self.cache is not None:
+            hit = await asyncio.to_thread(self.cache.get, key)
+            if hit is not None:
+                ai_requests.inc(labels=(provider, "cache_hit"))
+                return AIResponse(**hit, cached=True)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            ai_requests.inc(labels=(provider, "coalesced"))
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self.providers[provider].call(model, messages, params)
+            future.set_result(response)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            ai_requests.inc(labels=(provider, "error"))
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        ai_requests.inc(labels=(provider, "upstream"))
+        ai_call_latency.observe(response.latency, labels=(provider, model))
+        ai_tokens.inc(response.input_tokens, labels=(provider, model, "input"))
+        ai_tokens.inc(response.output_tokens, labels=(provider, model, "output"))
+        ai_cost.inc(response.cost_usd, labels=(provider, model))
+        if cache and self.cache is not None:
+            await asyncio.to_thread(self.cache.set, key, response.to_dict())
+        return response
+
+    async def close(self):
+        for provider in self.providers.values():
+            await provider.close()
+
+
+ai_orchestrator = AIOrchestrator.from_settings()
@@ -1,3 +1,238 @@
+"""Audio lesson delivery.
 
-class AudioService:
+Originals live behind an ``AudioStorage`` interface (local filesystem here; an
+object-store implementation only has to materialize files into a local path).
+Lower-bitrate variants for commuters on mobile data are transcoded once with
+ffmpeg into an on-disk cache bounded by ``AUDIO_CACHE_MAX_BYTES`` and evicted
+least-recently-used first. Transcodes run on the job queue (``transcode_audio``);
+requests only ever read what is already cached.
+"""
+import fcntl
+import logging
+import mmap
+import os
+import shutil
+import subprocess
+import tempfile
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+class AudioNotFound(Exception):
     pass
+
+
+class AudioStorage(ABC):
+    """Where original lesson audio lives."""
+
+    @abstractmethod
+    def local_path(self, key: str) -> Path:
+        """Return a local file path for ``key``, fetching it first if the backend is remote."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+
+class LocalAudioStorage(AudioStorage):
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise AudioNotFound(key)
+        return path
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def local_path(self, key: str) -> Path:
+        path = self._path(key)
+        if not path.is_file():
+            raise AudioNotFound(key)
+        return path
+
+
+class TranscodeCache:
+    """On-disk LRU of transcoded variants; recency is tracked through file mtimes."""
+
+    def __init__(self, root: str, max_bytes: int, ffmpeg: str = "ffmpeg"):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.ffmpeg = ffmpeg
+
+    @staticmethod
+    def _fresh(target: Path, source: Path) -> bool:
+        return target.is_file() and target.stat().st_mtime_ns >= source.stat().st_mtime_ns
+
+    @contextmanager
+    def _locked(self, name: str):
+        # flock on a per-variant file: one transcode per variant across threads
+        # and worker processes
+        locks = self.root / ".locks"
+        locks.mkdir(parents=True, exist_ok=True)
+        with open(locks / f"{name}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def cached(self, source: Path, lesson_id: int, bitrate: int) -> Path | None:
+        """Return the variant if it is already built from the current ``source``."""
+        target = self.root / f"{lesson_id}_{bitrate}k.mp3"
+        if not self._fresh(target, source):
+            return None
+        os.utime(target)  # mark as recently used
+        return target
+
+    def get(self, source: Path, lesson_id: int, bitrate: int) -> Path:
+        """Return the variant, transcoding it first if needed (blocks for the whole ffmpeg run)."""
+        target = self.cached(source, lesson_id, bitrate)
+        if target is not None:
+            return target
+        name = f"{lesson_id}_{bitrate}k.mp3"
+        target = self.root / name
+        with self._locked(name):
+            if self._fresh(target, source):
+                return target
+            fd, tmp = tempfile.mkstemp(dir=self.root, prefix=f".{name}.", suffix=".part")
+            os.close(fd)
+            try:
+                subprocess.run(
+                    [self.ffmpeg, "-nostdin", "-loglevel", "error", "-y", "-i", str(source),
+                     "-vn", "-ac", "1", "-b:a", f"{bitrate}k", "-f", "mp3", tmp],
+                    check=True,
+                )
+                os.replace(tmp, target)
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+        self.evict()
+        return target
+
+    def evict(self):
+        files = [p for p in self.root.glob("*.mp3") if p.is_file()]
+        total = sum(p.stat().st_size for p in files)
+        if total <= self.max_bytes:
+            return
+        for path in sorted(files, key=lambda p: p.stat().st_mtime):
+            if total <= self.max_bytes:
+                break
+            size = path.stat().st_size
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Parse a single ``bytes=`` range into inclusive ``(start, end)``.
+
+    Returns ``None`` for no/unsupported ranges (serve the whole file) and raises
+    ``ValueError`` when the range can't be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_s, _, end_s = header[6:].strip().partition("-")
+    if start_s == "":
+        if not end_s.isdigit():
+            return None
+        length = int(end_s)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - length), size - 1
+    if not start_s.isdigit() or (end_s and not end_s.isdigit()):
+        return None
+    start = int(start_s)
+    end = min(int(end_s), size - 1) if end_s else size - 1
+    if start >= size or start > end:
+        raise ValueError("range not satisfiable")
+    return start, end
+
+
+def iter_file_range(path: Path, start: int, end: int):
+    """Yield ``[start, end]`` of ``path`` from a read-only memory map."""
+    if end < start:
+        return
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                pos = start
+                while pos <= end:
+                    chunk_end = min(pos + CHUNK_SIZE, end + 1)
+                    yield bytes(view[pos:chunk_end])
+                    pos = chunk_end
+            finally:
+                view.release()
+
+
+def etag_for(path: Path) -> str:
+    stat = path.stat()
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+class AudioService:
+    def __init__(self, storage: AudioStorage, cache: TranscodeCache, bitrates: list[int]):
+        self.storage = storage
+        self.cache = cache
+        self.bitrates = bitrates
+        self.can_transcode = shutil.which(cache.ffmpeg) is not None
+        if not self.can_transcode:
+            logger.warning("ffmpeg not found; audio variants disabled, serving originals only")
+
+    @staticmethod
+    def key_for(lesson_id: int) -> str:
+        return f"{lesson_id}.mp3"
+
+    def _source(self, lesson_id: int, bitrate: int | None) -> Path:
+        source = self.storage.local_path(self.key_for(lesson_id))
+        if bitrate is not None and bitrate not in self.bitrates:
+            raise ValueError(f"Unsupported bitrate {bitrate}; expected one of {self.bitrates}")
+        return source
+
+    def resolve(self, lesson_id: int, bitrate: int | None = None) -> Path:
+        """Return the local file to serve for a lesson, transcoding the variant if needed."""
+        source = self._source(lesson_id, bitrate)
+        if bitrate is None or not self.can_transcode:
+            return source
+        return self.cache.get(source, lesson_id, bitrate)
+
+    def resolve_cached(self, lesson_id: int, bitrate: int | None = None) -> tuple[Path, bool]:
+        """Like ``resolve`` but never transcodes.
+
+        Returns ``(path, True)`` when ``path`` is what was asked for, or
+        ``(original, False)`` when the variant still has to be built.
+        """
+        source = self._source(lesson_id, bitrate)
+        if bitrate is None or not self.can_transcode:
+            return source, True
+        variant = self.cache.cached(source, lesson_id, bitrate)
+        if variant is None:
+            return source, False
+        return variant, True
+
+    def accel_path(self, path: Path) -> str | None:
+        """Internal nginx location for ``path`` when X-Accel-Redirect delivery is enabled."""
+        prefix = settings.AUDIO_X_ACCEL_PREFIX.rstrip("/")
+        if not prefix:
+            return None
+        for name, root in (("originals", getattr(self.storage, "root", None)), ("variants", self.cache.root)):
+            if root is None:
+                continue
+            try:
+                return f"{prefix}/{name}/{path.resolve().relative_to(Path(root).resolve())}"
+            except ValueError:
+                continue
+        return None
+
+
+audio_service = AudioService(
+    storage=LocalAudioStorage(settings.AUDIO_STORAGE_DIR),
+    cache=TranscodeCache(settings.AUDIO_CACHE_DIR, settings.AUDIO_CACHE_MAX_BYTES, settings.FFMPEG_BIN),
+    bitrates=[int(b) for b in settings.AUDIO_BITRATES.split(",") if b.strip()],
+)
@@ -1,3 +1,87 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.redis import get_async_redis, mark_unavailable
+from app.models.feed_item import FeedItem
+from app.models.lesson import Lesson
+from app.models.user_feed import UserFeedEntry
+from app.services.job_queue import job_queue
+from app.services.personalization_service import ORDER_DECAY
+
 
 class FeedService:
-    pass
+    """Request-path reads of the per-user materialized feed (read-only: safe on a replica)."""
+
+    def __init__(self, local_size: int = 100_000, redis_factory=get_async_redis):
+        # Users whose feed build was requested within USER_FEED_CATALOG_TTL: a feed
+        # that is empty after its build (nothing left to recommend) stays empty
+        # until the catalog or the user's progress changes, and progress changes
+        # rebuild it anyway
+        self._requested = LRUCache(maxsize=local_size, ttl=settings.USER_FEED_CATALOG_TTL)
+        self.redis_factory = redis_factory
+
+    @staticmethod
+    def user_feed_query(user_id: int, offset: int = 0, limit: int = 20):
+        # Single range read on the (user_id, position) primary key
+        return (
+            select(UserFeedEntry.position, UserFeedEntry.score, Lesson.id, Lesson.title, Lesson.type)
+            .join(Lesson, Lesson.id == UserFeedEntry.lesson_id)
+            .where(
+                UserFeedEntry.user_id == user_id,
+                UserFeedEntry.position >= offset,
+                UserFeedEntry.position < offset + limit,
+            )
+            .order_by(UserFeedEntry.position)
+        )
+
+    async def read_user_feed(self, db: AsyncSession, user_id: int, offset: int = 0, limit: int = 20) -> list:
+        return (await db.execute(self.user_feed_query(user_id, offset, limit))).all()
+
+    @staticmethod
+    def fallback_query(limit: int = 20):
+        # Head of the global feed (ix_feed_items_order_id range scan)
+        return (
+            select(FeedItem.order, Lesson.id, Lesson.title, Lesson.type)
+            .join(Lesson, Lesson.id == FeedItem.lesson_id)
+            .order_by(FeedItem.order, FeedItem.id)
+            .limit(limit)
+        )
+
+    async def read_fallback_feed(self, db: AsyncSession, limit: int = 20) -> list:
+        """The global order scored as for a user with no progress yet, shaped like ``user_feed_query`` rows."""
+        rows, seen = [], set()
+        for order, lesson_id, title, lesson_type in await db.execute(self.fallback_query(limit)):
+            if lesson_id not in seen:
+                seen.add(lesson_id)
+                rows.append((len(rows), 1.0 / (1.0 + order / ORDER_DECAY), lesson_id, title, lesson_type))
+        return rows
+
+    async def request_materialization(self, user_id: int):
+        """Queue one background build of the user's feed per USER_FEED_CATALOG_TTL, across all workers."""
+        if self._requested.get(user_id):
+            return
+        self._requested.set(user_id, True)
+        r = self.redis_factory()
+        if r is not None:
+            try:
+                if not await r.set(f"user-feed:requested:{user_id}", 1, nx=True, ex=settings.USER_FEED_CATALOG_TTL):
+                    return
+            except Exception as e:
+                mark_unavailable(e)
+        # The job worker writes on the primary
+        await job_queue.enqueue("materialize_user_feed", {"user_id": user_id}, dedup_key=f"user-feed:{user_id}")
+
+    async def get_user_feed(self, db: AsyncSession, user_id: int, offset: int = 0, limit: int = 20) -> list:
+        rows = await self.read_user_feed(db, user_id, offset, limit)
+        if not rows and offset == 0:
+            # First visit (or nothing left to recommend): build it in the background,
+            # at most once per USER_FEED_CATALOG_TTL, and serve the unpersonalized
+            # head of the feed meanwhile
+            await self.request_materialization(user_id)
+            rows = await self.read_fallback_feed(db, limit)
+        return rows
+
+
+feed_service = FeedService()
@@ -1,3 +1,218 @@
+"""Bulk lesson ingestion.
+
+Large JSONL/CSV catalogs are streamed row by row (never loaded whole),
+validated with Pydantic a batch at a time and written with one multi-row
+``INSERT ... ON CONFLICT (external_id) DO UPDATE`` per batch, followed by a
+multi-row insert of ``FeedItem`` rows for lessons that are new.
+
+Every batch commits together with the job's ``rows_committed`` counter, so an
+interrupted job resumes from the last committed batch by skipping that many
+source rows.
+"""
+import csv
+import json
+import logging
+import sys
+import time
+from itertools import islice
+from typing import Iterator, Literal
+
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.feed_item import FeedItem
+from app.models.ingestion_job import IngestionJob
+from app.models.lesson import Lesson, make_excerpt
+from app.services.live_service import FEED_CHANNEL, live_hub
+from app.services.personalization_service import personalization_service
+from app.services.similarity_service import lesson_index
+
+logger = logging.getLogger(__name__)
+
+# Lesson bodies can be far larger than csv's 128 KiB default field limit
+csv.field_size_limit(sys.maxsize)
+
+
+class LessonRow(BaseModel):
+    external_id: str = Field(min_length=1, max_length=255)
+    title: str = Field(min_length=1, max_length=255)
+    content: str
+    type: Literal["text", "quiz", "audio"]
+    order: int | None = None
+
+
+_rows_adapter = TypeAdapter(list[LessonRow])
+
+
+def read_jsonl(path: str) -> Iterator[dict]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Counted as a rejected row by validation
+                yield {}
+
+
+def read_csv(path: str) -> Iterator[dict]:
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            if row.get("order") == "":
+                row["order"] = None
+            yield row
+
+
+READERS = {"jsonl": read_jsonl, "csv": read_csv}
+
+
+def _upsert_statement(db: Session, rows: list[dict]):
+    """Multi-row INSERT ... ON CONFLICT (external_id) DO UPDATE for the session's dialect."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Bulk upsert not supported on {dialect}")
+    stmt = insert(Lesson).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[Lesson.external_id],
+        set_={
+            "title": stmt.excluded.title,
+            "content": stmt.excluded.content,
+            "excerpt": stmt.excluded.excerpt,
+            "type": stmt.excluded.type,
+        },
+    ).returning(Lesson.id, Lesson.external_id)
+
 
 class IngestionService:
-    pass
+    def __init__(self, batch_size: int | None = None):
+        self.batch_size = batch_size or settings.INGEST_BATCH_SIZE
+
+    @staticmethod
+    def validate_batch(raw_rows: list[dict]) -> tuple[list[LessonRow], int]:
+        """Validate a whole batch at once; on failure re-check row by row to drop only bad rows."""
+        try:
+            return _rows_adapter.validate_python(raw_rows), 0
+        except ValidationError:
+            pass
+        valid, rejected = [], 0
+        for raw in raw_rows:
+            try:
+                valid.append(LessonRow.model_validate(raw))
+            except ValidationError as e:
+                rejected += 1
+                logger.warning(f"Rejected lesson row {raw.get('external_id')!r}: {e.errors()[0]['msg']}")
+        return valid, rejected
+
+    def write_batch(
+        self, db: Session, rows: list[LessonRow], next_order: int
+    ) -> tuple[int, list[int], list[tuple[int, LessonRow]]]:
+        """
+        Upsert lessons and add feed items for new ones. Returns the next free feed
+        order, the new lesson ids and every written ``(lesson_id, row)``.
+        """
+        # Last occurrence wins when a batch repeats an external_id (ON CONFLICT can't touch a row twice)
+        by_external_id = {row.external_id: row for row in rows}
+        existing = set(db.scalars(
+            select(Lesson.external_id).where(Lesson.external_id.in_(by_external_id))
+        ))
+        returned = db.execute(_upsert_statement(db, [
+            {
+                "external_id": r.external_id,
+                "title": r.title,
+                "content": r.content,
+                "excerpt": make_excerpt(r.content),
+                "type": r.type,
+            }
+            for r in by_external_id.values()
+        ])).all()
+
+        feed_rows = []
+        for lesson_id, external_id in returned:
+            if external_id in existing:
+                continue
+            row = by_external_id[external_id]
+            order = row.order if row.order is not None else next_order
+            next_order = max(next_order, order + 1)
+            feed_rows.append({"lesson_id": lesson_id, "order": order, "content_type": row.type})
+        if feed_rows:
+            db.execute(FeedItem.__table__.insert(), feed_rows)
+        upserted = [(lesson_id, by_external_id[external_id]) for lesson_id, external_id in returned]
+        return next_order, [r["lesson_id"] for r in feed_rows], upserted
+
+    @staticmethod
+    def index_batch(upserted: list[tuple[int, LessonRow]]):
+        """Embed committed lessons into the similar-lessons index; a failure doesn't fail the ingestion."""
+        try:
+            lesson_index.upsert([(lesson_id, row.title, row.content) for lesson_id, row in upserted])
+        except Exception as e:
+            logger.error(f"Similar-lessons index update failed ({e}); run the rebuild_lesson_index job")
+
+    def create_job(self, db: Session, source: str, fmt: str) -> IngestionJob:
+        if fmt not in READERS:
+            raise ValueError(f"Unsupported format {fmt!r}; expected one of {sorted(READERS)}")
+        job = IngestionJob(source=source, format=fmt, status="pending", rows_committed=0, rows_rejected=0)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def run(self, db: Session, job: IngestionJob, progress=None) -> IngestionJob:
+        """Ingest ``job.source`` starting after ``job.rows_committed`` rows.
+
+        ``progress`` is an optional callback ``(rows_committed, rows_per_second)``.
+        """
+        job.status = "running"
+        job.error = None
+        db.commit()
+
+        rows = READERS[job.format](job.source)
+        # Resume: skip rows committed by a previous run of this job
+        rows = islice(rows, job.rows_committed, None)
+        next_order = (db.scalar(select(func.max(FeedItem.order))) or 0) + 1
+        started, done_this_run = time.perf_counter(), 0
+        try:
+            while True:
+                raw_batch = list(islice(rows, self.batch_size))
+                if not raw_batch:
+                    break
+                valid, rejected = self.validate_batch(raw_batch)
+                new_lessons, upserted = [], []
+                if valid:
+                    next_order, new_lessons, upserted = self.write_batch(db, valid, next_order)
+                job.rows_committed += len(raw_batch)
+                job.rows_rejected += rejected
+                db.commit()
+                if new_lessons:
+                    # After the commit, so clients that refetch see the new items
+                    live_hub.publish_nowait(FEED_CHANNEL, {"type": "feed", "lesson_ids": new_lessons})
+                self.index_batch(upserted)
+
+                done_this_run += len(raw_batch)
+                rate = done_this_run / (time.perf_counter() - started)
+                logger.info(f"Ingestion job {job.id}: {job.rows_committed} rows committed ({rate:.0f} rows/s)")
+                if progress is not None:
+                    progress(job.rows_committed, rate)
+        except Exception as e:
+            db.rollback()
+            job.status = "failed"
+            job.error = str(e)
+            db.commit()
+            logger.error(f"Ingestion job {job.id} failed at row {job.rows_committed}: {e}")
+            raise
+
+        job.status = "done"
+        db.commit()
+        # New lessons change the personalization catalog
+        personalization_service.invalidate_catalog()
+        return job
+
+
+ingestion_service = IngestionService()
@@ -0,0 +1,436 @@
+"""Background jobs on Redis Streams.
+
+Tasks are plain functions registered with ``@task(queue=...)`` in
+``app/workers/tasks.py`` (or any module listed in ``JOB_TASK_MODULES``); sync
+functions run in the worker's threadpool, coroutines on its event loop. The API
+enqueues by task name and clients poll ``GET /jobs/{id}``.
+
+Redis layout (``jobs:`` prefix):
+
+* ``stream:<queue>``  one entry per delivery, read through the ``workers``
+  consumer group. An entry stays pending until the worker acknowledges it, and
+  entries idle for longer than ``JOB_VISIBILITY_TIMEOUT`` are claimed by another
+  worker. Workers refresh the idle time of jobs they are still running, so only
+  jobs of dead workers are redelivered.
+* ``job:<id>``        hash with status, attempts, kwargs, result and error; kept
+  for ``JOB_RESULT_TTL`` after the job finishes.
+* ``delayed:<queue>`` sorted set of jobs waiting out their retry backoff
+  (``JOB_RETRY_BACKOFF`` doubling per attempt, capped at ``JOB_RETRY_BACKOFF_MAX``).
+* ``dedup:<key>``     id of the queued or running job holding a deduplication
+  key; enqueueing with the same key returns that job instead of a new one.
+
+Without Redis, jobs run inside the enqueueing process (as ``BackgroundTasks``
+did) with the same retry policy, and their status is only visible there.
+"""
+import asyncio
+import hashlib
+import importlib
+import inspect
+import logging
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable
+
+import orjson
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram
+from app.core.redis import get_async_redis, mark_unavailable
+from app.core.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+jobs_total = Counter(
+    "jobs_total",
+    "Jobs by queue, task and result (enqueued, deduplicated, succeeded, retried, failed)",
+    labelnames=("queue", "task", "result"),
+)
+job_duration = Histogram(
+    "job_duration_seconds",
+    "Job run time per attempt",
+    labelnames=("queue", "task"),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 1800.0),
+)
+
+GROUP = "workers"
+TERMINAL = ("succeeded", "failed")
+
+# KEYS: job hash, stream[, dedup key]
+# ARGV: job id, dedup ttl, field/value pairs of the job hash
+# Returns the id of the job that holds the dedup key, or ours when it was queued.
+_ENQUEUE = """
+if KEYS[3] then
+    local existing = redis.call('get', KEYS[3])
+    if existing then
+        return existing
+    end
+    redis.call('set', KEYS[3], ARGV[1], 'EX', ARGV[2])
+end
+redis.call('hset', KEYS[1], unpack(ARGV, 3))
+redis.call('xadd', KEYS[2], '*', 'id', ARGV[1])
+return ARGV[1]
+"""
+# KEYS: delayed set, stream; ARGV: now (ms), max jobs to move
+_PROMOTE = """
+local due = redis.call('zrangebyscore', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, id in ipairs(due) do
+    redis.call('xadd', KEYS[2], '*', 'id', id)
+    redis.call('zrem', KEYS[1], id)
+end
+return #due
+"""
+_SHAS = {script: hashlib.sha1(script.encode()).hexdigest() for script in (_ENQUEUE, _PROMOTE)}
+
+
+class UnknownTask(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    fn: Callable
+    queue: str
+    max_attempts: int
+    timeout: float
+
+
+TASKS: dict[str, Task] = {}
+
+
+def task(queue: str = "default", max_attempts: int | None = None, timeout: float | None = None,
+         name: str | None = None):
+    """Register a function as a job; it stays directly callable."""
+    def register(fn):
+        t = Task(
+            name=name or fn.__name__,
+            fn=fn,
+            queue=queue,
+            max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+            timeout=timeout or settings.JOB_TIMEOUT,
+        )
+        TASKS[t.name] = t
+        return fn
+    return register
+
+
+def load_tasks():
+    for module in settings.JOB_TASK_MODULES.split(","):
+        if module.strip():
+            importlib.import_module(module.strip())
+
+
+def get_task(name: str) -> Task:
+    if name not in TASKS:
+        load_tasks()
+    try:
+        return TASKS[name]
+    except KeyError:
+        raise UnknownTask(name)
+
+
+def parse_queues(spec: str) -> dict[str, int]:
+    """``"default:4,ai:8"`` -> ``{"default": 4, "ai": 8}`` (queue -> concurrent jobs)."""
+    queues = {}
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        queue, _, count = part.partition(":")
+        if not queue or not count.isdigit() or int(count) <= 0:
+            raise ValueError(f"Invalid queue {part!r}; expected <name>:<concurrency>")
+        queues[queue] = int(count)
+    return queues
+
+
+def parse_schedule(spec: str) -> dict[str, float]:
+    """``"purge_refresh_tokens:3600"`` -> ``{"purge_refresh_tokens": 3600.0}`` (task -> interval seconds)."""
+    schedule = {}
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, interval = part.partition(":")
+        try:
+            seconds = float(interval)
+        except ValueError:
+            seconds = 0.0
+        if not name or seconds <= 0:
+            raise ValueError(f"Invalid schedule entry {part!r}; expected <task>:<seconds>")
+        schedule[name] = seconds
+    return schedule
+
+
+def backoff(attempts: int) -> float:
+    """Seconds before retry number ``attempts``, with jitter so failures don't retry in lockstep."""
+    delay = min(settings.JOB_RETRY_BACKOFF_MAX, settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1))
+    return delay * (0.5 + random.random() / 2)
+
+
+async def execute(t: Task, kwargs: dict):
+    if inspect.iscoroutinefunction(t.fn):
+        call = t.fn(**kwargs)
+    else:
+        call = asyncio.to_thread(t.fn, **kwargs)
+    # A sync task that overruns keeps its thread; the job is retried or failed regardless
+    return await asyncio.wait_for(call, t.timeout)
+
+
+def describe(error: Exception) -> str:
+    return f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+
+
+def _encode_result(result) -> str:
+    try:
+        return dumps(result).decode()
+    except TypeError:
+        return dumps(repr(result)).decode()
+
+
+def _decode(record: dict) -> dict:
+    """Job hash (str -> str) to the API shape."""
+    def number(field, cast=float):
+        value = record.get(field)
+        return cast(value) if value not in (None, "") else None
+
+    return {
+        "id": record["id"],
+        "task": record["task"],
+        "queue": record["queue"],
+        "status": record["status"],
+        "attempts": number("attempts", int) or 0,
+        "max_attempts": number("max_attempts", int),
+        "user_id": number("user_id", int),
+        "kwargs": orjson.loads(record.get("kwargs") or "{}"),
+        "result": orjson.loads(record["result"]) if record.get("result") else None,
+        "error": record.get("error") or None,
+        "enqueued_at": number("enqueued_at"),
+        "started_at": number("started_at"),
+        "finished_at": number("finished_at"),
+    }
+
+
+class LocalJobs:
+    """In-process fallback: runs jobs on this process's loop and keeps status in an LRU."""
+
+    def __init__(self, maxsize: int):
+        self.records = LRUCache(maxsize=maxsize, ttl=settings.JOB_RESULT_TTL)
+        self.dedup = LRUCache(maxsize=maxsize, ttl=settings.JOB_DEDUP_TTL)
+        self._tasks = set()
+
+    def enqueue(self, t: Task, record: dict) -> tuple[dict, bool]:
+        key = record.get("dedup")
+        if key:
+            existing = self.records.get(self.dedup.get(key))
+            if existing is not None and existing["status"] not in TERMINAL:
+                return existing, True
+            self.dedup.set(key, record["id"])
+        self.records.set(record["id"], record)
+        run = asyncio.get_running_loop().create_task(self._run(t, record))
+        self._tasks.add(run)
+        run.add_done_callback(self._tasks.discard)
+        return record, False
+
+    async def _run(self, t: Task, record: dict):
+        kwargs = orjson.loads(record["kwargs"])
+        while True:
+            record.update(status="running", attempts=str(int(record["attempts"]) + 1), started_at=str(time.time()))
+            attempts = int(record["attempts"])
+            started = time.perf_counter()
+            try:
+                result = await execute(t, kwargs)
+            except Exception as e:
+                job_duration.observe(time.perf_counter() - started, labels=(t.queue, t.name))
+                record["error"] = describe(e)
+                if attempts < int(record["max_attempts"]):
+                    jobs_total.inc(labels=(t.queue, t.name, "retried"))
+                    record["status"] = "retrying"
+                    await asyncio.sleep(backoff(attempts))
+                    continue
+                jobs_total.inc(labels=(t.queue, t.name, "failed"))
+                record.update(status="failed", finished_at=str(time.time()))
+                break
+            job_duration.observe(time.perf_counter() - started, labels=(t.queue, t.name))
+            jobs_total.inc(labels=(t.queue, t.name, "succeeded"))
+            record.update(status="succeeded", result=_encode_result(result), error="", finished_at=str(time.time()))
+            break
+        if record.get("dedup"):
+            self.dedup.delete(record["dedup"])
+
+    def get(self, job_id: str) -> dict | None:
+        return self.records.get(job_id)
+
+
+class JobQueue:
+    def __init__(self, prefix: str = "jobs", local_size: int = 10000, redis_factory=get_async_redis):
+        self.prefix = prefix
+        self.local = LocalJobs(local_size)
+        self.redis_factory = redis_factory
+
+    def stream_key(self, queue: str) -> str:
+        return f"{self.prefix}:stream:{queue}"
+
+    def job_key(self, job_id: str) -> str:
+        return f"{self.prefix}:job:{job_id}"
+
+    def delayed_key(self, queue: str) -> str:
+        return f"{self.prefix}:delayed:{queue}"
+
+    def dedup_key(self, key: str) -> str:
+        return f"{self.prefix}:dedup:{key}"
+
+    @staticmethod
+    async def _script(r, script: str, keys: list, args: list):
+        try:
+            return await r.evalsha(_SHAS[script], len(keys), *keys, *args)
+        except Exception as e:
+            # First use on this server (or after SCRIPT FLUSH): send the body once
+            if type(e).__name__ != "NoScriptError":
+                raise
+            return await r.eval(script, len(keys), *keys, *args)
+
+    # --- producer side ---
+
+    async def enqueue(self, name: str, kwargs: dict | None = None, dedup_key: str | None = None,
+                      user_id: int | None = None) -> tuple[dict, bool]:
+        """Queue a job; returns ``(job, deduplicated)``. Raises ``UnknownTask``."""
+        t = get_task(name)
+        record = {
+            "id": uuid.uuid4().hex,
+            "task": t.name,
+            "queue": t.queue,
+            "status": "queued",
+            "attempts": "0",
+            "max_attempts": str(t.max_attempts),
+            "user_id": "" if user_id is None else str(user_id),
+            "kwargs": dumps(kwargs or {}).decode(),
+            "dedup": dedup_key or "",
+            "enqueued_at": str(time.time()),
+        }
+        r = self.redis_factory()
+        if r is not None:
+            keys = [self.job_key(record["id"]), self.stream_key(t.queue)]
+            if dedup_key:
+                keys.append(self.dedup_key(dedup_key))
+            args = [record["id"], int(settings.JOB_DEDUP_TTL), *(x for item in record.items() for x in item)]
+            try:
+                holder = (await self._script(r, _ENQUEUE, keys, args)).decode()
+                deduplicated = holder != record["id"]
+                job = _decode(record)
+                if deduplicated:
+                    job = await self.get(holder) or {**job, "id": holder}
+            except Exception as e:
+                mark_unavailable(e)
+            else:
+                jobs_total.inc(labels=(t.queue, t.name, "deduplicated" if deduplicated else "enqueued"))
+                return job, deduplicated
+        record, deduplicated = self.local.enqueue(t, record)
+        jobs_total.inc(labels=(t.queue, t.name, "deduplicated" if deduplicated else "enqueued"))
+        return _decode(record), deduplicated
+
+    async def get(self, job_id: str) -> dict | None:
+        r = self.redis_factory()
+        if r is not None:
+            try:
+                record = await r.hgetall(self.job_key(job_id))
+            except Exception as e:
+                mark_unavailable(e)
+            else:
+                if record:
+                    return _decode({k.decode(): v.decode() for k, v in record.items()})
+        record = self.local.get(job_id)
+        return _decode(record) if record is not None else None
+
+    # --- worker side (``r`` is the worker's own client) ---
+
+    async def ensure_group(self, r, queue: str):
+        try:
+            await r.xgroup_create(self.stream_key(queue), GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def claim(self, r, queue: str, consumer: str, block_ms: int) -> list[tuple[str, str]]:
+        """Wait up to ``block_ms`` for one new delivery; ``[(entry_id, job_id)]``."""
+        response = await r.xreadgroup(GROUP, consumer, {self.stream_key(queue): ">"}, count=1, block=block_ms)
+        return [
+            (entry_id.decode(), fields[b"id"].decode())
+            for _, entries in response or ()
+            for entry_id, fields in entries
+        ]
+
+    async def reclaim(self, r, queue: str, consumer: str) -> list[tuple[str, str]]:
+        """Take over one delivery left idle past the visibility timeout by a dead worker."""
+        stream = self.stream_key(queue)
+        response = await r.xautoclaim(
+            stream, GROUP, consumer, min_idle_time=int(settings.JOB_VISIBILITY_TIMEOUT * 1000),
+            start_id="0-0", count=1,
+        )
+        claimed = []
+        for entry_id, fields in response[1]:
+            if not fields:
+                # Entry deleted while pending (Redis < 7 reports these inline)
+                await r.xack(stream, GROUP, entry_id)
+                continue
+            claimed.append((entry_id.decode(), fields[b"id"].decode()))
+        return claimed
+
+    async def touch(self, r, queue: str, consumer: str, entry_id: str):
+        """Reset the delivery's idle time so it isn't reclaimed while still running."""
+        await r.xclaim(self.stream_key(queue), GROUP, consumer, min_idle_time=0, message_ids=[entry_id], justid=True)
+
+    async def promote(self, r, queue: str, limit: int = 100) -> int:
+        """Move jobs whose retry backoff has elapsed back onto the stream."""
+        return await self._script(
+            r, _PROMOTE, [self.delayed_key(queue), self.stream_key(queue)], [int(time.time() * 1000), limit]
+        )
+
+    async def start(self, r, queue: str, entry_id: str, job_id: str) -> dict | None:
+        """Mark a delivered job running; ``None`` (after acking) when its record is gone."""
+        key = self.job_key(job_id)
+        record = {k.decode(): v.decode() for k, v in (await r.hgetall(key)).items()}
+        async with r.pipeline(transaction=True) as pipe:
+            if record:
+                pipe.hincrby(key, "attempts", 1)
+                pipe.hset(key, mapping={"status": "running", "started_at": time.time()})
+            else:
+                self._ack(pipe, queue, entry_id)
+            results = await pipe.execute()
+        if not record:
+            return None
+        record.update(status="running", attempts=str(results[0]))
+        return record
+
+    def _ack(self, pipe, queue: str, entry_id: str):
+        pipe.xack(self.stream_key(queue), GROUP, entry_id)
+        pipe.xdel(self.stream_key(queue), entry_id)
+
+    async def finish(self, r, queue: str, entry_id: str, record: dict, result=None, error: str | None = None):
+        """Record the outcome and acknowledge the delivery; failures are retried until ``max_attempts``."""
+        key = self.job_key(record["id"])
+        attempts = int(record["attempts"])
+        async with r.pipeline(transaction=True) as pipe:
+            if error is None:
+                outcome = "succeeded"
+                pipe.hset(key, mapping={"status": outcome, "result": _encode_result(result), "error": "",
+                                        "finished_at": time.time()})
+            elif attempts < int(record["max_attempts"]):
+                outcome = "retried"
+                pipe.hset(key, mapping={"status": "retrying", "error": error})
+                pipe.zadd(self.delayed_key(queue), {record["id"]: int((time.time() + backoff(attempts)) * 1000)})
+            else:
+                outcome = "failed"
+                pipe.hset(key, mapping={"status": outcome, "error": error, "finished_at": time.time()})
+            if outcome != "retried":
+                pipe.expire(key, int(settings.JOB_RESULT_TTL))
+                if record.get("dedup"):
+                    pipe.delete(self.dedup_key(record["dedup"]))
+            self._ack(pipe, queue, entry_id)
+            await pipe.execute()
+        jobs_total.inc(labels=(queue, record["task"], outcome))
+
+
+job_queue = JobQueue(local_size=settings.JOB_LOCAL_SIZE)
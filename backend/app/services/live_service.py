@@ -0,0 +1,233 @@
+"""Push channel for feed and progress updates (SSE and WebSocket).
+
+Events are published to Redis channels (``live:feed`` for everyone,
+``live:user:<id>`` per user). Each worker holds a single pattern subscription to
+``live:*`` and fans messages out to its own connections, so a client sees an
+event whichever worker published it and whichever worker it is connected to.
+Without Redis, events are delivered to the publishing worker's connections only.
+
+Each connection has a bounded send queue holding at most one pending message per
+event type. A new event merges into the pending message of its type (feed lesson
+ids and per-lesson progress are unioned), so a slow client gets fewer, larger
+messages instead of an unbounded backlog. When a merged message would exceed
+``LIVE_QUEUE_MAX_ITEMS`` it is dropped and the client is sent ``resync``, which
+means it should refetch over REST.
+
+Memory budget: an idle connection holds a ``Connection`` (slots, an
+``asyncio.Event``, an empty dict) plus the server's protocol and transport
+objects. ``benchmarks/soak_live.py`` opens ``LIVE_MAX_CONNECTIONS`` (10k) idle
+connections against one worker and fails if RSS grows by more than 64 KiB per
+connection, i.e. about 640 MB of headroom per worker at 10k connections.
+"""
+import asyncio
+
+import orjson
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge
+from app.core.redis import get_async_redis, get_redis, mark_unavailable
+from app.core.serialization import dumps
+
+live_connections = Gauge(
+    "live_connections",
+    "Open push connections by transport",
+    labelnames=("transport",),
+)
+live_messages = Counter(
+    "live_messages_total",
+    "Push messages by result (queued, coalesced, overflow)",
+    labelnames=("result",),
+)
+
+CHANNEL_PREFIX = "live:"
+FEED_CHANNEL = "live:feed"
+RESYNC = {"type": "resync"}
+RETRY_INTERVAL = 5.0
+
+
+def user_channel(user_id: int) -> str:
+    return f"{CHANNEL_PREFIX}user:{user_id}"
+
+
+def _merge_feed(old: dict, new: dict) -> dict:
+    return {"type": "feed", "lesson_ids": list(dict.fromkeys(old["lesson_ids"] + new["lesson_ids"]))}
+
+
+def _merge_progress(old: dict, new: dict) -> dict:
+    items = dict(old["items"])
+    for lesson_id, completed in new["items"]:
+        items[lesson_id] = items.get(lesson_id, False) or completed
+    return {"type": "progress", "items": [[lesson_id, completed] for lesson_id, completed in items.items()]}
+
+
+# type -> (merge, number of items in a message)
+COALESCE = {
+    "feed": (_merge_feed, lambda message: len(message["lesson_ids"])),
+    "progress": (_merge_progress, lambda message: len(message["items"])),
+}
+
+
+class Connection:
+    """One client's pending messages, at most one per event type."""
+    __slots__ = ("user_id", "transport", "pending", "overflowed", "closed", "_wakeup")
+
+    def __init__(self, user_id: int, transport: str):
+        self.user_id = user_id
+        self.transport = transport
+        self.pending = {}
+        self.overflowed = False
+        self.closed = False
+        self._wakeup = asyncio.Event()
+
+    def push(self, message: dict, max_items: int):
+        kind = message.get("type")
+        old = self.pending.get(kind)
+        if kind in COALESCE:
+            merge, size = COALESCE[kind]
+            if old is not None:
+                message = merge(old, message)
+            if size(message) > max_items:
+                self.pending.pop(kind, None)
+                self.overflowed = True
+                live_messages.inc(labels=("overflow",))
+                self._wakeup.set()
+                return
+        live_messages.inc(labels=("coalesced" if old is not None else "queued",))
+        self.pending[kind] = message
+        self._wakeup.set()
+
+    def close(self):
+        self.closed = True
+        self._wakeup.set()
+
+    async def next(self, timeout: float) -> list[dict]:
+        """Wait up to ``timeout`` for messages; an empty list means send a heartbeat."""
+        if not self.pending and not self.overflowed and not self.closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._wakeup.clear()
+        batch = [RESYNC] if self.overflowed else []
+        batch.extend(self.pending.values())
+        self.pending = {}
+        self.overflowed = False
+        return batch
+
+
+class LiveHub:
+    def __init__(self, max_connections: int | None = None, max_items: int | None = None,
+                 redis_factory=get_async_redis):
+        self.max_connections = max_connections or settings.LIVE_MAX_CONNECTIONS
+        self.max_items = max_items or settings.LIVE_QUEUE_MAX_ITEMS
+        self.redis_factory = redis_factory
+        self._by_user: dict[int, set[Connection]] = {}
+        self._count = 0
+        # True while this worker's pattern subscription is up, so publishing
+        # through Redis also reaches local connections
+        self._subscribed = False
+        self._tasks = set()
+        # The worker's event loop, so threadpool code can publish through it
+        self._loop = None
+
+    @property
+    def full(self) -> bool:
+        return self._count >= self.max_connections
+
+    def connect(self, user_id: int, transport: str) -> Connection | None:
+        """Register a connection; ``None`` when the worker is at ``LIVE_MAX_CONNECTIONS``."""
+        if self.full:
+            return None
+        conn = Connection(user_id, transport)
+        self._by_user.setdefault(user_id, set()).add(conn)
+        self._count += 1
+        live_connections.inc(labels=(transport,))
+        return conn
+
+    def disconnect(self, conn: Connection):
+        conns = self._by_user.get(conn.user_id)
+        if conns is None or conn not in conns:
+            return
+        conns.discard(conn)
+        if not conns:
+            del self._by_user[conn.user_id]
+        self._count -= 1
+        live_connections.dec(labels=(conn.transport,))
+        conn.close()
+
+    def deliver(self, channel: str, message: dict):
+        """Fan a message out to this worker's connections."""
+        if channel == FEED_CHANNEL:
+            targets = [conn for conns in self._by_user.values() for conn in conns]
+        elif channel.startswith(f"{CHANNEL_PREFIX}user:"):
+            targets = self._by_user.get(int(channel.rsplit(":", 1)[1]), ())
+        else:
+            return
+        for conn in targets:
+            conn.push(message, self.max_items)
+
+    async def publish(self, channel: str, message: dict):
+        r = self.redis_factory()
+        if r is not None:
+            try:
+                await r.publish(channel, dumps(message))
+            except Exception as e:
+                mark_unavailable(e)
+                r = None
+        # With the subscription up, our own message comes back through Redis
+        if r is None or not self._subscribed:
+            self.deliver(channel, message)
+
+    def publish_nowait(self, channel: str, message: dict):
+        """Publish from sync code: on the loop, from the threadpool, or directly from scripts."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            task = loop.create_task(self.publish(channel, message))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return
+        if self._loop is not None and self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.publish(channel, message), self._loop)
+            return
+        # No hub in this process (e.g. the ingestion CLI): other processes only, via Redis
+        r = get_redis()
+        if r is None:
+            return
+        try:
+            r.publish(channel, dumps(message))
+        except Exception as e:
+            mark_unavailable(e)
+
+    async def run(self):
+        """Relay ``live:*`` from Redis to local connections; reconnects with backoff."""
+        self._loop = asyncio.get_running_loop()
+        while True:
+            r = self.redis_factory()
+            if r is None:
+                await asyncio.sleep(RETRY_INTERVAL)
+                continue
+            pubsub = r.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                self._subscribed = True
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self.deliver(message["channel"].decode(), orjson.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                mark_unavailable(e)
+                await asyncio.sleep(RETRY_INTERVAL)
+            finally:
+                self._subscribed = False
+                try:
+                    await pubsub.reset()
+                except Exception:
+                    pass
+
+
+live_hub = LiveHub()
@@ -0,0 +1,325 @@
+"""OpenID Connect sign-in (Google, Microsoft) without blocking the event loop.
+
+* Discovery documents and JWKS are fetched with one pooled ``httpx.AsyncClient``
+  shared by all providers, prefetched at startup and cached per process for
+  ``OIDC_METADATA_TTL`` / ``OIDC_JWKS_TTL`` seconds. After expiry the cached copy
+  keeps being served if a refresh fails, so a provider outage doesn't break
+  logins for users whose keys are known. An ID token signed with an unknown
+  ``kid`` (key rotation) triggers at most one JWKS refetch per
+  ``OIDC_JWKS_MIN_REFRESH`` seconds.
+* The callback exchanges the code at the token endpoint and verifies the ID
+  token locally (signature, issuer, audience, expiry, nonce); the userinfo
+  endpoint is never called.
+* ``state`` is an HMAC-signed, expiring blob carrying the nonce and the hash of
+  a random browser binding. The binding goes to the browser in a short-lived
+  cookie that the callback must present (login CSRF protection: an attacker's
+  callback URL is bound to the attacker's browser, not the victim's).
+* An email only counts as verified when the provider says so: Google's
+  ``email_verified``, or Microsoft's ``email_verified`` / ``xms_edov`` optional
+  claims. Microsoft's ``email`` and ``preferred_username`` are otherwise
+  editable by tenant users, and ``preferred_username`` is never trusted.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+oidc_fetches = Counter(
+    "oidc_fetches_total",
+    "Discovery/JWKS fetches by provider, document and result (ok, error)",
+    labelnames=("provider", "document", "result"),
+)
+
+STATE_TTL = 600
+# Accepted ID token signature algorithms (both providers use RS256)
+ID_TOKEN_ALGORITHMS = ["RS256"]
+
+
+class OIDCError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class OIDCProvider:
+    name: str
+    discovery_url: str
+    client_id: str
+    client_secret: str
+    scope: str = "openid email profile"
+    # Claim holding the stable account id stored on the user row
+    subject_claim: str = "sub"
+
+
+@dataclass(frozen=True)
+class OIDCIdentity:
+    provider: str
+    subject: str
+    email: str | None
+    email_verified: bool
+    claims: dict
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _unb64(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _binding_hash(binding: str) -> str:
+    return _b64(hashlib.sha256(binding.encode()).digest())
+
+
+def make_state(provider: str, nonce: str, binding: str, secret: str | None = None) -> str:
+    payload = _b64(json.dumps({
+        "p": provider, "n": nonce, "b": _binding_hash(binding), "e": int(time.time()) + STATE_TTL,
+    }).encode())
+    sig = hmac.new((secret or settings.JWT_SECRET_KEY).encode(), payload.encode(), hashlib.sha256).digest()
+    return f"{payload}.{_b64(sig)}"
+
+
+def read_state(state: str, provider: str, binding: str | None, secret: str | None = None) -> str:
+    """Return the nonce carried by a valid ``state`` issued to this browser; raises ``OIDCError`` otherwise."""
+    payload, _, sig = state.partition(".")
+    expected = hmac.new((secret or settings.JWT_SECRET_KEY).encode(), payload.encode(), hashlib.sha256).digest()
+    try:
+        valid = hmac.compare_digest(_unb64(sig), expected)
+        data = json.loads(_unb64(payload)) if valid else None
+    except ValueError:
+        data = None
+    if not data or data.get("p") != provider or data.get("e", 0) < time.time():
+        raise OIDCError("invalid state")
+    if not binding or not hmac.compare_digest(str(data.get("b", "")), _binding_hash(binding)):
+        raise OIDCError("state was not issued to this browser")
+    return data["n"]
+
+
+def _claim_true(claims: dict, name: str) -> bool:
+    return claims.get(name) in (True, "true", "True", 1, "1")
+
+
+class _Cached:
+    __slots__ = ("value", "fetched_at")
+
+    def __init__(self, value, fetched_at: float):
+        self.value = value
+        self.fetched_at = fetched_at
+
+
+class OIDCClient:
+    def __init__(self, providers: list[OIDCProvider], http: httpx.AsyncClient | None = None):
+        self.providers = {p.name: p for p in providers}
+        self._http = http
+        self._metadata: dict[str, _Cached] = {}
+        self._jwks: dict[str, _Cached] = {}
+        self._locks: dict[tuple[str, str], asyncio.Lock] = {}
+
+    @classmethod
+    def from_settings(cls) -> "OIDCClient":
+        providers = []
+        if settings.GOOGLE_CLIENT_ID:
+            providers.append(OIDCProvider(
+                name="google",
+                discovery_url=settings.GOOGLE_DISCOVERY_URL,
+                client_id=settings.GOOGLE_CLIENT_ID,
+                client_secret=settings.GOOGLE_CLIENT_SECRET,
+            ))
+        if settings.MICROSOFT_CLIENT_ID:
+            providers.append(OIDCProvider(
+                name="microsoft",
+                discovery_url=settings.MICROSOFT_DISCOVERY_URL,
+                client_id=settings.MICROSOFT_CLIENT_ID,
+                client_secret=settings.MICROSOFT_CLIENT_SECRET,
+                # oid is the account's id across apps; sub is pairwise per app
+                subject_claim="oid",
+            ))
+        return cls(providers)
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=settings.OIDC_HTTP_TIMEOUT,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                http2=True,
+            )
+        return self._http
+
+    def provider(self, name: str) -> OIDCProvider:
+        try:
+            return self.providers[name]
+        except KeyError:
+            raise OIDCError(f"{name} sign-in is not configured")
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def prefetch(self):
+        """Warm discovery and JWKS for every provider (called at startup; failures are logged)."""
+        async def warm(name: str):
+            try:
+                await self.jwks(name)
+            except Exception as e:
+                logger.warning(f"OIDC prefetch for {name} failed: {e}")
+
+        await asyncio.gather(*(warm(name) for name in self.providers))
+
+    async def _cached(self, cache: dict, name: str, document: str, ttl: float, fetch, force: bool = False):
+        entry = cache.get(name)
+        if entry is not None and not force and time.monotonic() - entry.fetched_at < ttl:
+            return entry.value
+        lock = self._locks.setdefault((name, document), asyncio.Lock())
+        async with lock:
+            # Another caller may have refreshed it while we waited
+            entry = cache.get(name)
+            if entry is not None and time.monotonic() - entry.fetched_at < (
+                settings.OIDC_JWKS_MIN_REFRESH if force else ttl
+            ):
+                return entry.value
+            try:
+                value = await fetch()
+            except (httpx.HTTPError, ValueError) as e:
+                oidc_fetches.inc(labels=(name, document, "error"))
+                if entry is None:
+                    raise OIDCError(f"Could not fetch {name} {document}: {e}")
+                logger.warning(f"Refreshing {name} {document} failed ({e}); serving cached copy")
+                return entry.value
+            oidc_fetches.inc(labels=(name, document, "ok"))
+            cache[name] = _Cached(value, time.monotonic())
+            return value
+
+    async def _get_json(self, url: str) -> dict:
+        response = await self.http.get(url)
+        response.raise_for_status()
+        return response.json()
+
+    async def metadata(self, name: str) -> dict:
+        provider = self.provider(name)
+        return await self._cached(
+            self._metadata, name, "discovery", settings.OIDC_METADATA_TTL,
+            lambda: self._get_json(provider.discovery_url),
+        )
+
+    async def jwks(self, name: str, force: bool = False) -> dict:
+        metadata = await self.metadata(name)
+
+        async def fetch():
+            keys = (await self._get_json(metadata["jwks_uri"]))["keys"]
+            return {key.get("kid"): key for key in keys}
+
+        return await self._cached(self._jwks, name, "jwks", settings.OIDC_JWKS_TTL, fetch, force=force)
+
+    async def authorization_url(self, name: str, redirect_uri: str) -> tuple[str, str]:
+        """Return the provider's authorization URL and the browser binding to store in the state cookie."""
+        provider = self.provider(name)
+        metadata = await self.metadata(name)
+        nonce = secrets.token_urlsafe(16)
+        binding = secrets.token_urlsafe(32)
+        query = urlencode({
+            "response_type": "code",
+            "client_id": provider.client_id,
+            "redirect_uri": redirect_uri,
+            "scope": provider.scope,
+            "state": make_state(name, nonce, binding),
+            "nonce": nonce,
+        })
+        return f"{metadata['authorization_endpoint']}?{query}", binding
+
+    async def exchange_code(self, name: str, code: str, redirect_uri: str) -> dict:
+        provider = self.provider(name)
+        metadata = await self.metadata(name)
+        try:
+            response = await self.http.post(metadata["token_endpoint"], data={
+                "grant_type": "authorization_code",
+                "code": code,
+                "redirect_uri": redirect_uri,
+                "client_id": provider.client_id,
+                "client_secret": provider.client_secret,
+            })
+        except httpx.HTTPError as e:
+            raise OIDCError(f"Token endpoint unreachable: {e}")
+        if response.status_code != 200:
+            raise OIDCError(f"Token exchange failed ({response.status_code}): {response.text[:200]}")
+        return response.json()
+
+    async def verify_id_token(self, name: str, id_token: str, nonce: str, access_token: str | None = None) -> dict:
+        """Verify signature and claims against the cached JWKS; raises ``OIDCError``."""
+        from jose import JWTError, jwt
+
+        provider = self.provider(name)
+        metadata = await self.metadata(name)
+        try:
+            kid = jwt.get_unverified_header(id_token).get("kid")
+            unverified = jwt.get_unverified_claims(id_token)
+        except JWTError as e:
+            raise OIDCError(f"Malformed ID token: {e}")
+        keys = await self.jwks(name)
+        if kid not in keys:
+            # Provider rotated its keys since we cached them
+            keys = await self.jwks(name, force=True)
+        key = keys.get(kid)
+        if key is None:
+            raise OIDCError("ID token signed with an unknown key")
+
+        # Multi-tenant Microsoft metadata advertises ".../{tenantid}/v2.0"
+        issuer = metadata["issuer"].replace("{tenantid}", str(unverified.get("tid", "")))
+        try:
+            claims = jwt.decode(
+                id_token,
+                key,
+                algorithms=ID_TOKEN_ALGORITHMS,
+                audience=provider.client_id,
+                issuer=issuer,
+                access_token=access_token,
+                options={"leeway": 60},
+            )
+        except JWTError as e:
+            raise OIDCError(f"Invalid ID token: {e}")
+        if not hmac.compare_digest(str(claims.get("nonce", "")), nonce):
+            raise OIDCError("ID token nonce mismatch")
+        return claims
+
+    async def complete(self, name: str, code: str | None, state: str | None, redirect_uri: str,
+                       binding: str | None) -> OIDCIdentity:
+        """Callback handling: check state against this browser's binding, exchange the code, verify the ID token."""
+        if not code or not state:
+            raise OIDCError("Missing code or state")
+        nonce = read_state(state, name, binding)
+        tokens = await self.exchange_code(name, code, redirect_uri)
+        if "id_token" not in tokens:
+            raise OIDCError("Provider returned no ID token")
+        claims = await self.verify_id_token(name, tokens["id_token"], nonce, tokens.get("access_token"))
+        provider = self.provider(name)
+        subject = claims.get(provider.subject_claim) or claims["sub"]
+        email = claims.get("email")
+        # Both claims are optional on Microsoft; without them the email may be user-set
+        verified = _claim_true(claims, "email_verified") or (name == "microsoft" and _claim_true(claims, "xms_edov"))
+        if not email and name == "microsoft":
+            # Sign-in name (often a UPN): usable as the new account's email, never as a verified one
+            email, verified = claims.get("preferred_username"), False
+        return OIDCIdentity(
+            provider=name,
+            subject=str(subject),
+            email=email.lower().strip() if email else None,
+            email_verified=verified,
+            claims=claims,
+        )
+
+
+oidc_client = OIDCClient.from_settings()
@@ -1,3 +1,186 @@
+"""Per-user feed materialization.
+
+Each active user's next-N lessons are ranked ahead of time and stored in
+``user_feed`` so the request path is a single ``(user_id, position)`` range
+read. Ranking combines the global feed order with the user's lesson-type
+preference, learned from the types of lessons they have completed:
+
+    score = type_weight[type] / (1 + order / ORDER_DECAY)
+
+``type_weight`` is a Laplace-smoothed share of completed lessons per type, so
+new users get the plain global order. Because the score is monotone in
+``order`` within a type, the top N overall is always contained in the first N
+uncompleted lessons of each type, which keeps a rebuild O(N + completed).
+"""
+import heapq
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.feed_item import FeedItem
+from app.models.lesson import Lesson
+from app.models.user import User
+from app.models.user_feed import UserFeedEntry
+from app.models.user_progress import UserProgress
+
+LESSON_TYPES = ("text", "quiz", "audio")
+# Global position at which a lesson's score has halved.
+ORDER_DECAY = 50.0
+
+
+class LessonCatalog:
+    """In-memory feed catalog: per lesson type, ``(order, lesson_id)`` in feed order."""
+
+    def __init__(self, by_type: dict[str, list[tuple[int, int]]]):
+        self.by_type = by_type
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def load(cls, db: Session) -> "LessonCatalog":
+        rows = db.execute(
+            select(FeedItem.order, FeedItem.lesson_id, Lesson.type)
+            .join(Lesson, Lesson.id == FeedItem.lesson_id)
+            .order_by(FeedItem.order.asc(), FeedItem.id.asc())
+        )
+        by_type = defaultdict(list)
+        seen = set()
+        for order, lesson_id, lesson_type in rows:
+            # A lesson can appear in the feed more than once; keep its first slot.
+            if lesson_id in seen:
+                continue
+            seen.add(lesson_id)
+            by_type[lesson_type].append((order, lesson_id))
+        return cls(dict(by_type))
+
 
 class PersonalizationService:
-    pass
+    def __init__(self, feed_size: int | None = None, chunk_size: int | None = None):
+        self.feed_size = feed_size or settings.USER_FEED_SIZE
+        self.chunk_size = chunk_size or settings.USER_FEED_REBUILD_CHUNK
+        self._catalog = None
+        self._lock = threading.Lock()
+
+    # --- catalog ---
+
+    def catalog(self, db: Session) -> LessonCatalog:
+        catalog = self._catalog
+        if self._fresh(catalog):
+            return catalog
+        with self._lock:
+            # Threads that queued on the lock use the catalog the first one loaded
+            catalog = self._catalog
+            if not self._fresh(catalog):
+                catalog = LessonCatalog.load(db)
+                self._catalog = catalog
+        return catalog
+
+    @staticmethod
+    def _fresh(catalog: LessonCatalog | None) -> bool:
+        return catalog is not None and time.monotonic() - catalog.loaded_at <= settings.USER_FEED_CATALOG_TTL
+
+    def invalidate_catalog(self):
+        """Call after lessons or feed items change so the next rebuild reloads them."""
+        self._catalog = None
+
+    # --- ranking ---
+
+    @staticmethod
+    def type_weights(type_counts: dict[str, int]) -> dict[str, float]:
+        types = set(LESSON_TYPES) | set(type_counts)
+        total = sum(type_counts.values()) + len(types)
+        return {t: (type_counts.get(t, 0) + 1) * len(types) / total for t in types}
+
+    def rank(self, catalog: LessonCatalog, completed: set[int], type_counts: dict[str, int]) -> list[tuple[float, int]]:
+        """Return the user's top ``feed_size`` ``(score, lesson_id)`` pairs, best first."""
+        weights = self.type_weights(type_counts)
+        candidates = []
+        for lesson_type, lessons in catalog.by_type.items():
+            weight = weights.get(lesson_type, 1.0)
+            taken = 0
+            for order, lesson_id in lessons:
+                if lesson_id in completed:
+                    continue
+                candidates.append((weight / (1.0 + order / ORDER_DECAY), -order, lesson_id))
+                taken += 1
+                if taken >= self.feed_size:
+                    break
+        top = heapq.nlargest(self.feed_size, candidates)
+        return [(score, lesson_id) for score, _, lesson_id in top]
+
+    # --- loading progress ---
+
+    @staticmethod
+    def _load_progress(db: Session, user_ids: list[int]):
+        completed = defaultdict(set)
+        type_counts = defaultdict(lambda: defaultdict(int))
+        rows = db.execute(
+            select(UserProgress.user_id, UserProgress.lesson_id, Lesson.type)
+            .join(Lesson, Lesson.id == UserProgress.lesson_id)
+            .where(UserProgress.user_id.in_(user_ids), UserProgress.completed.is_(True))
+        )
+        for user_id, lesson_id, lesson_type in rows:
+            completed[user_id].add(lesson_id)
+            type_counts[user_id][lesson_type] += 1
+        return completed, type_counts
+
+    # --- writes ---
+
+    def rebuild_users(self, db: Session, user_ids: list[int], commit: bool = True) -> int:
+        """Re-materialize the feed for ``user_ids`` with one DELETE and one multi-row INSERT."""
+        if not user_ids:
+            return 0
+        catalog = self.catalog(db)
+        completed, type_counts = self._load_progress(db, user_ids)
+        rows = []
+        for user_id in user_ids:
+            ranked = self.rank(catalog, completed.get(user_id, set()), type_counts.get(user_id, {}))
+            rows.extend(
+                {"user_id": user_id, "position": position, "lesson_id": lesson_id, "score": score}
+                for position, (score, lesson_id) in enumerate(ranked)
+            )
+        db.execute(delete(UserFeedEntry).where(UserFeedEntry.user_id.in_(user_ids)))
+        if rows:
+            db.execute(insert(UserFeedEntry), rows)
+        if commit:
+            db.commit()
+        return len(rows)
+
+    def on_progress_changed(self, db: Session, user_id: int, commit: bool = True):
+        """Incrementally refresh one user's feed after their progress changed."""
+        self.rebuild_users(db, [user_id], commit=commit)
+
+    def rebuild_all(self, db: Session, progress=None) -> dict:
+        """Rebuild every active user's feed in chunks of ``chunk_size`` users.
+
+        ``progress`` is an optional callback ``(users_done, rows_written)``.
+        """
+        self.invalidate_catalog()
+        started = time.perf_counter()
+        users_done = rows_written = 0
+        last_id = 0
+        while True:
+            user_ids = list(db.scalars(
+                select(User.id)
+                .where(User.is_active.is_(True), User.id > last_id)
+                .order_by(User.id)
+                .limit(self.chunk_size)
+            ))
+            if not user_ids:
+                break
+            rows_written += self.rebuild_users(db, user_ids)
+            users_done += len(user_ids)
+            last_id = user_ids[-1]
+            if progress is not None:
+                progress(users_done, rows_written)
+        return {
+            "users": users_done,
+            "rows": rows_written,
+            "seconds": time.perf_counter() - started,
+        }
+
+
+personalization_service = PersonalizationService()
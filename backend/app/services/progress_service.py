@@ -0,0 +1,406 @@
+"""Write-behind buffering of ``UserProgress`` updates.
+
+Completions are coalesced per ``(user_id, lesson_id)`` and written with one
+multi-row ``INSERT ... ON CONFLICT (user_id, lesson_id) DO UPDATE`` every
+``PROGRESS_FLUSH_INTERVAL`` seconds (or as soon as ``PROGRESS_FLUSH_MAX_PENDING``
+pairs are waiting) instead of one commit per event. Completion is sticky: once a
+lesson is completed, a later failed attempt does not reset it.
+
+``PROGRESS_DURABILITY`` picks where accepted events wait, i.e. what a crash can
+lose:
+
+* ``memory`` - in this worker; up to one flush interval of events. Only this
+  worker sees them before the flush.
+* ``redis``  - in a shared Redis hash; survives worker crashes/restarts and is
+  flushed by whichever worker gets there first. Falls back to ``memory`` while
+  Redis is unreachable. A per-user overlay hash mirrors the events for reads and
+  is cleared entry by entry once they are committed (a parked batch stays
+  visible).
+* ``sync``   - nothing buffered; callers flush before acknowledging.
+
+Reads go through ``pending_for`` to overlay buffered writes on committed rows.
+With ``redis`` or ``sync`` a user sees their own writes from any worker. With
+``memory`` they are only seen by requests served by the worker that buffered
+them, so another worker serves stale progress until the next flush. Use
+``redis`` (or ``sync``) when running more than one worker.
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram
+from app.core.redis import get_async_redis, get_redis, mark_unavailable
+from app.db.session import SessionLocal
+from app.models.lesson import Lesson
+from app.models.user import User
+from app.models.user_progress import UserProgress
+from app.services.live_service import live_hub, user_channel
+from app.services.personalization_service import personalization_service
+from app.services.review_service import review_scheduler
+
+logger = logging.getLogger(__name__)
+
+progress_events = Counter(
+    "progress_events_total",
+    "Progress events accepted into the write-behind buffer",
+)
+progress_flush_rows = Histogram(
+    "progress_flush_rows",
+    "Coalesced (user, lesson) rows written per flush",
+    buckets=(1, 10, 50, 100, 500, 1000, 5000, 10000),
+)
+progress_events_parked = Counter(
+    "progress_events_parked_total",
+    "Progress events set aside after PROGRESS_FLUSH_MAX_ATTEMPTS failed flushes",
+)
+
+DURABILITY_MODES = ("memory", "redis", "sync")
+# Rows per upsert statement (3 bind params each, well under Postgres' 65535 limit)
+UPSERT_CHUNK = 5000
+
+PENDING_KEY = "progress:pending"
+FLUSHING_PREFIX = "progress:flushing:"
+# Batches that kept failing, kept for inspection/replay
+PARKED_PREFIX = "progress:parked:"
+PARKED_TTL = 7 * 24 * 3600
+# The overlay is cleared on commit; the TTL only collects overlays of batches
+# that were lost (it outlives a parked batch)
+OVERLAY_TTL = PARKED_TTL
+USER_KEY = "progress:user:{}"
+# A flushing key this old belongs to a worker that died mid-flush
+ORPHAN_AGE = 300
+
+# Merge a claimed batch back into the pending hash without un-completing anything
+_MERGE_BACK = """
+local entries = redis.call('hgetall', KEYS[1])
+for i = 1, #entries, 2 do
+    if entries[i + 1] == '1' then
+        redis.call('hset', KEYS[2], entries[i], '1')
+    else
+        redis.call('hsetnx', KEYS[2], entries[i], '0')
+    end
+end
+return redis.call('del', KEYS[1])
+"""
+# Drop a committed batch and the overlay entries it covered; an entry that changed
+# since the claim (a newer event not yet flushed) is kept
+_CLEAR_COMMITTED = """
+local entries = redis.call('hgetall', KEYS[1])
+for i = 1, #entries, 2 do
+    local user, lesson = string.match(entries[i], '^(%d+):(%d+)$')
+    local overlay = ARGV[1] .. user
+    if redis.call('hget', overlay, lesson) == entries[i + 1] then
+        redis.call('hdel', overlay, lesson)
+    end
+end
+return redis.call('del', KEYS[1])
+"""
+
+Pending = dict[tuple[int, int], bool]
+
+
+def _upsert_statement(db: Session, rows: list[dict]):
+    """Multi-row INSERT ... ON CONFLICT (user_id, lesson_id) DO UPDATE, keeping completion sticky."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Bulk upsert not supported on {dialect}")
+    stmt = insert(UserProgress).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[UserProgress.user_id, UserProgress.lesson_id],
+        set_={"completed": UserProgress.completed | stmt.excluded.completed},
+    )
+
+
+class ProgressBuffer:
+    def __init__(self, max_pending: int | None = None, durability: str | None = None):
+        self.max_pending = max_pending or settings.PROGRESS_FLUSH_MAX_PENDING
+        self.durability = durability or settings.PROGRESS_DURABILITY
+        if self.durability not in DURABILITY_MODES:
+            raise ValueError(f"PROGRESS_DURABILITY must be one of {DURABILITY_MODES}")
+        # user_id -> {lesson_id: completed}, so a user's own pending writes are one lookup away
+        self._pending: dict[int, dict[int, bool]] = {}
+        self._size = 0
+        # Drained but not yet committed, still visible to reads
+        self._flushing: dict[int, dict[int, bool]] = {}
+        self._redis_added = 0
+        self._lock = threading.Lock()
+        # One flush at a time (the flush loop and sync-mode requests may race)
+        self._flush_lock = threading.Lock()
+        self._flush_needed = threading.Event()
+        # Consecutive flushes of the current batch that failed on the batch itself
+        self._failures = 0
+
+    # --- accepting events ---
+
+    async def add(self, user_id: int, lesson_id: int, completed: bool):
+        await self.add_many(user_id, [(lesson_id, completed)])
+
+    async def add_many(self, user_id: int, events: list[tuple[int, bool]]):
+        # Push to the user's other open sessions (other tabs/devices)
+        live_hub.publish_nowait(user_channel(user_id), {"type": "progress", "items": [list(e) for e in events]})
+        if self.durability == "redis" and await self._add_redis(user_id, events):
+            progress_events.inc(len(events))
+            with self._lock:
+                self._redis_added += len(events)
+                size = self._redis_added
+            if size >= self.max_pending:
+                self._flush_needed.set()
+            return
+        with self._lock:
+            lessons = self._pending.setdefault(user_id, {})
+            for lesson_id, completed in events:
+                if lesson_id not in lessons:
+                    self._size += 1
+                lessons[lesson_id] = lessons.get(lesson_id, False) or completed
+            size = self._size
+        progress_events.inc(len(events))
+        if size >= self.max_pending:
+            self._flush_needed.set()
+
+    async def _add_redis(self, user_id: int, events: list[tuple[int, bool]]) -> bool:
+        r = get_async_redis()
+        if r is None:
+            return False
+        user_key = USER_KEY.format(user_id)
+        try:
+            pipe = r.pipeline(transaction=False)
+            for lesson_id, completed in events:
+                field = f"{user_id}:{lesson_id}"
+                if completed:
+                    pipe.hset(PENDING_KEY, field, "1")
+                    pipe.hset(user_key, lesson_id, "1")
+                else:
+                    pipe.hsetnx(PENDING_KEY, field, "0")
+                    pipe.hsetnx(user_key, lesson_id, "0")
+            # Overlay for read-your-writes, cleared by the flush that commits these events
+            pipe.expire(user_key, OVERLAY_TTL)
+            await pipe.execute()
+        except Exception as e:
+            mark_unavailable(e)
+            return False
+        return True
+
+    # --- reading ---
+
+    async def pending_for(self, user_id: int) -> dict[int, bool]:
+        """Buffered (not yet committed) progress of one user, ``{lesson_id: completed}``."""
+        with self._lock:
+            merged = dict(self._flushing.get(user_id, {}))
+            for lesson_id, completed in self._pending.get(user_id, {}).items():
+                merged[lesson_id] = merged.get(lesson_id, False) or completed
+        if self.durability == "redis":
+            r = get_async_redis()
+            if r is not None:
+                try:
+                    shared = await r.hgetall(USER_KEY.format(user_id))
+                except Exception as e:
+                    mark_unavailable(e)
+                    shared = {}
+                for lesson_id, completed in shared.items():
+                    lesson_id = int(lesson_id)
+                    merged[lesson_id] = merged.get(lesson_id, False) or completed == b"1"
+        return merged
+
+    @staticmethod
+    def overlay(rows: dict[int, bool], pending: dict[int, bool]) -> dict[int, bool]:
+        merged = dict(rows)
+        for lesson_id, completed in pending.items():
+            merged[lesson_id] = merged.get(lesson_id, False) or completed
+        return merged
+
+    # --- flushing ---
+
+    def _drain(self) -> Pending:
+        with self._lock:
+            by_user, self._pending, self._size = self._pending, {}, 0
+            for user_id, lessons in by_user.items():
+                flushing = self._flushing.setdefault(user_id, {})
+                for lesson_id, completed in lessons.items():
+                    flushing[lesson_id] = flushing.get(lesson_id, False) or completed
+        self._flush_needed.clear()
+        return {
+            (user_id, lesson_id): completed
+            for user_id, lessons in by_user.items()
+            for lesson_id, completed in lessons.items()
+        }
+
+    def _restore(self, pending: Pending):
+        with self._lock:
+            for (user_id, lesson_id), completed in pending.items():
+                lessons = self._pending.setdefault(user_id, {})
+                if lesson_id not in lessons:
+                    self._size += 1
+                lessons[lesson_id] = lessons.get(lesson_id, False) or completed
+
+    def _claim_redis(self) -> tuple[str | None, Pending]:
+        """Atomically take the shared pending hash; returns the claimed key and its entries."""
+        r = get_redis()
+        if r is None:
+            return None, {}
+        claimed = f"{FLUSHING_PREFIX}{int(time.time())}:{uuid.uuid4().hex}"
+        try:
+            if not r.exists(PENDING_KEY):
+                return None, {}
+            r.rename(PENDING_KEY, claimed)
+            raw = r.hgetall(claimed)
+        except Exception as e:
+            # RENAME fails if another worker claimed it first
+            if "no such key" not in str(e).lower():
+                mark_unavailable(e)
+            return None, {}
+        pending = {}
+        for field, completed in raw.items():
+            user_id, _, lesson_id = field.decode().partition(":")
+            pending[(int(user_id), int(lesson_id))] = completed == b"1"
+        return claimed, pending
+
+    def _release_redis(self, claimed: str, committed: bool):
+        r = get_redis()
+        if r is None:
+            # Left in place; recover_orphans() merges it back later
+            return
+        try:
+            if committed:
+                r.eval(_CLEAR_COMMITTED, 1, claimed, USER_KEY.format(""))
+            else:
+                r.eval(_MERGE_BACK, 2, claimed, PENDING_KEY)
+        except Exception as e:
+            mark_unavailable(e)
+
+    def recover_orphans(self):
+        """Return batches claimed by workers that died mid-flush to the pending hash."""
+        r = get_redis()
+        if r is None:
+            return
+        cutoff = time.time() - ORPHAN_AGE
+        try:
+            for key in r.scan_iter(match=f"{FLUSHING_PREFIX}*", count=100):
+                claimed_at = int(key.decode()[len(FLUSHING_PREFIX):].partition(":")[0])
+                if claimed_at < cutoff:
+                    logger.warning(f"Recovering orphaned progress batch {key.decode()}")
+                    r.eval(_MERGE_BACK, 2, key, PENDING_KEY)
+        except Exception as e:
+            mark_unavailable(e)
+
+    @staticmethod
+    def write(db: Session, pending: Pending) -> list[dict]:
+        """Upsert coalesced updates and return the rows written; rows for deleted users or lessons are dropped instead of failing the batch."""
+        user_ids = {user_id for user_id, _ in pending}
+        lesson_ids = {lesson_id for _, lesson_id in pending}
+        known_users = set(db.scalars(select(User.id).where(User.id.in_(user_ids))))
+        known_lessons = set(db.scalars(select(Lesson.id).where(Lesson.id.in_(lesson_ids))))
+        rows = [
+            {"user_id": user_id, "lesson_id": lesson_id, "completed": completed}
+            for (user_id, lesson_id), completed in pending.items()
+            if user_id in known_users and lesson_id in known_lessons
+        ]
+        if len(rows) < len(pending):
+            logger.warning(f"Dropped {len(pending) - len(rows)} progress events for unknown users/lessons")
+        for start in range(0, len(rows), UPSERT_CHUNK):
+            db.execute(_upsert_statement(db, rows[start:start + UPSERT_CHUNK]))
+        return rows
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> int:
+        with self._lock:
+            self._redis_added = 0
+        local = self._drain()
+        claimed, shared = self._claim_redis() if self.durability == "redis" else (None, {})
+        pending = dict(shared)
+        for key, completed in local.items():
+            pending[key] = pending.get(key, False) or completed
+        if not pending:
+            return 0
+        db = SessionLocal()
+        try:
+            rows = self.write(db, pending)
+            # Completed lessons enter the spaced-repetition queue
+            review_scheduler.enroll(db, [(row["user_id"], row["lesson_id"]) for row in rows if row["completed"]])
+            # Completions change the personalized feed; only users write() kept, since an
+            # unknown one would fail the user_feed foreign key and the whole batch with it
+            personalization_service.rebuild_users(db, sorted({row["user_id"] for row in rows}), commit=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            if self._should_park(e):
+                self._park(claimed, pending, local)
+            else:
+                self._restore(local)
+                if claimed:
+                    self._release_redis(claimed, committed=False)
+            raise
+        finally:
+            with self._lock:
+                self._flushing = {}
+            db.close()
+        self._failures = 0
+        if claimed:
+            self._release_redis(claimed, committed=True)
+        progress_flush_rows.observe(len(pending))
+        return len(pending)
+
+    def _should_park(self, error: Exception) -> bool:
+        # Lost connections and timeouts are retried for as long as they last; any
+        # other error is likely caused by the batch and would repeat forever
+        if isinstance(error, (OperationalError, InterfaceError)):
+            return False
+        self._failures += 1
+        return self._failures >= settings.PROGRESS_FLUSH_MAX_ATTEMPTS
+
+    def _park(self, claimed: str | None, pending: Pending, local: Pending):
+        """Set aside a batch that failed PROGRESS_FLUSH_MAX_ATTEMPTS flushes in a row so later ones can commit."""
+        self._failures = 0
+        progress_events_parked.inc(len(pending))
+        r = get_redis() if claimed else None
+        if r is not None:
+            parked = PARKED_PREFIX + claimed[len(FLUSHING_PREFIX):]
+            try:
+                r.rename(claimed, parked)
+                r.expire(parked, PARKED_TTL)
+                logger.error(f"Set aside progress batch {claimed} as {parked} after repeated flush failures")
+                pending = local
+            except Exception as e:
+                mark_unavailable(e)
+        if pending:
+            events = [[user_id, lesson_id, completed] for (user_id, lesson_id), completed in sorted(pending.items())]
+            logger.error(f"Dropped {len(pending)} progress events after repeated flush failures: {events}")
+
+    async def settle(self):
+        """In ``sync`` durability, commit buffered events before the caller acknowledges them."""
+        if self.durability == "sync":
+            await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+    async def run(self, interval: float | None = None):
+        """Flush loop, started once per worker at application startup."""
+        interval = interval or settings.PROGRESS_FLUSH_INTERVAL
+        loop = asyncio.get_running_loop()
+        if self.durability == "redis":
+            await loop.run_in_executor(None, self.recover_orphans)
+        try:
+            while True:
+                await loop.run_in_executor(None, self._flush_needed.wait, interval)
+                try:
+                    await loop.run_in_executor(None, self.flush)
+                except Exception as e:
+                    logger.error(f"Progress flush failed, will retry: {e}")
+        except asyncio.CancelledError:
+            # Final flush on shutdown
+            await loop.run_in_executor(None, self.flush)
+            raise
+
+
+progress_buffer = ProgressBuffer()
@@ -1,3 +1,134 @@
+"""Quiz grading.
 
-class QuizService:
+Quiz definitions are compiled once into an immutable ``CompiledQuiz`` (question
+ids plus frozensets of correct choices) and cached per ``(lesson_id, version)``.
+Grading a submission is then pure CPU with no DB access; results are handed to
+the progress write-behind buffer instead of being committed per answer.
+"""
+from dataclasses import dataclass
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.models.quiz import Quiz
+from app.services.progress_service import progress_buffer
+
+
+class QuizNotFound(Exception):
     pass
+
+
+@dataclass(frozen=True, slots=True)
+class GradeResult:
+    lesson_id: int
+    version: int
+    correct: int
+    total: int
+    score: float
+    passed: bool
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledQuiz:
+    lesson_id: int
+    version: int
+    pass_score: float
+    # ((question_id, frozenset(correct choice indexes)), ...)
+    answer_key: tuple
+    # Question prompts/choices without answers, safe to send to clients
+    public: tuple
+
+    @classmethod
+    def compile(cls, quiz: Quiz) -> "CompiledQuiz":
+        key, public = [], []
+        for q in quiz.questions:
+            answer = q["answer"]
+            correct = frozenset(answer if isinstance(answer, list) else [answer])
+            key.append((str(q["id"]), correct))
+            public.append({
+                "id": str(q["id"]),
+                "prompt": q["prompt"],
+                "choices": list(q["choices"]),
+                "multiple": len(correct) > 1,
+            })
+        return cls(quiz.lesson_id, quiz.version, quiz.pass_score, tuple(key), tuple(public))
+
+    def grade(self, answers: dict) -> GradeResult:
+        correct = 0
+        for question_id, expected in self.answer_key:
+            given = answers.get(question_id)
+            if given is None:
+                continue
+            if isinstance(given, int):
+                if len(expected) == 1 and given in expected:
+                    correct += 1
+            elif frozenset(given) == expected:
+                correct += 1
+        total = len(self.answer_key)
+        score = correct / total if total else 0.0
+        return GradeResult(self.lesson_id, self.version, correct, total, score, score >= self.pass_score)
+
+
+class QuizService:
+    def __init__(self):
+        self._compiled = LRUCache(maxsize=settings.QUIZ_CACHE_SIZE)
+        # lesson_id -> latest version, for submissions that don't name one
+        self._latest = LRUCache(maxsize=settings.QUIZ_CACHE_SIZE, ttl=settings.QUIZ_LATEST_VERSION_TTL)
+
+    def cached(self, lesson_id: int, version: int | None = None) -> CompiledQuiz | None:
+        """Hot path: in-memory lookup only."""
+        if version is None:
+            version = self._latest.get(lesson_id)
+            if version is None:
+                return None
+        return self._compiled.get((lesson_id, version))
+
+    async def get(self, db: AsyncSession, lesson_id: int, version: int | None = None) -> CompiledQuiz:
+        compiled = self.cached(lesson_id, version)
+        if compiled is not None:
+            return compiled
+        query = select(Quiz).where(Quiz.lesson_id == lesson_id)
+        if version is None:
+            query = query.order_by(Quiz.version.desc()).limit(1)
+        else:
+            query = query.where(Quiz.version == version)
+        quiz = (await db.execute(query)).scalar_one_or_none()
+        if quiz is None:
+            raise QuizNotFound(lesson_id)
+        compiled = CompiledQuiz.compile(quiz)
+        self._compiled.set((lesson_id, compiled.version), compiled)
+        if version is None:
+            self._latest.set(lesson_id, compiled.version)
+        return compiled
+
+    async def create_version(self, db: AsyncSession, lesson_id: int, questions: list, pass_score: float) -> CompiledQuiz:
+        latest = await db.scalar(select(func.max(Quiz.version)).where(Quiz.lesson_id == lesson_id))
+        quiz = Quiz(lesson_id=lesson_id, version=(latest or 0) + 1, questions=questions, pass_score=pass_score)
+        db.add(quiz)
+        await db.commit()
+        compiled = CompiledQuiz.compile(quiz)
+        self._compiled.set((lesson_id, compiled.version), compiled)
+        self._latest.set(lesson_id, compiled.version)
+        return compiled
+
+    async def grade(self, user_id: int, compiled: CompiledQuiz, answers: dict) -> GradeResult:
+        result = compiled.grade(answers)
+        await progress_buffer.add(user_id, compiled.lesson_id, result.passed)
+        return result
+
+    async def grade_batch(self, db: AsyncSession, user_id: int, submissions: list) -> list[GradeResult]:
+        """Grade ``(lesson_id, version, answers)`` tuples; only cache misses touch the DB."""
+        # Resolve every quiz first so an unknown quiz rejects the batch before anything is recorded
+        compiled = [
+            self.cached(lesson_id, version) or await self.get(db, lesson_id, version)
+            for lesson_id, version, _ in submissions
+        ]
+        results = [quiz.grade(answers) for quiz, (_, _, answers) in zip(compiled, submissions)]
+        # One buffer write (one Redis round-trip) for the whole batch
+        await progress_buffer.add_many(user_id, [(result.lesson_id, result.passed) for result in results])
+        return results
+
+
+quiz_service = QuizService()
@@ -0,0 +1,195 @@
+"""Spaced-repetition scheduling of lesson reviews (SM-2).
+
+Every (user, lesson) under review has a ``ReviewCard``: an ease factor, the
+current interval and ``due_at``. Completing a lesson enrolls it, first due
+``REVIEW_FIRST_INTERVAL_DAYS`` later. Reviews are graded 0-5 (SM-2's scale,
+3 and up means recalled):
+
+* recalled: repetitions + 1; the interval becomes 1 day, 6 days, then the
+  previous interval times the ease
+* forgotten: repetitions back to 0, one more lapse, interval 1 day
+* ease += 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02), never below 1.3
+
+Results are applied in batches instead of a read-modify-write per review: the
+cards a batch touches are read with one query per ``UPSERT_CHUNK`` pairs, the
+new schedules are computed with NumPy array operations, and they are written
+back with multi-row ``INSERT ... ON CONFLICT (user_id, lesson_id) DO UPDATE``.
+Reviews of one card depend on each other, so the batch is grouped by card and
+applied in rounds: round ``k`` updates every card's ``k``-th review at once,
+which makes the number of array passes the largest number of reviews of a
+single card in the batch (usually one), not the number of reviews.
+
+``due_query`` reads the due queue as a range scan on ``ix_review_cards_user_due``
+that stops after ``limit`` rows, so its cost depends on neither the size of the
+table nor the size of the user's backlog.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.lesson import Lesson
+from app.models.review_card import ReviewCard
+from app.models.user import User
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+PASSING_GRADE = 3
+MAX_GRADE = 5
+# Rows per statement (8 bind params each; under SQLite's 32766 and Postgres' 65535)
+UPSERT_CHUNK = 2000
+
+# ease, interval_days, repetitions, lapses
+State = tuple[float, float, int, int]
+NEW_CARD: State = (DEFAULT_EASE, 0.0, 0, 0)
+STATE_COLUMNS = ("ease", "interval_days", "repetitions", "lapses", "due_at", "last_reviewed_at")
+
+
+def sm2_batch(ease: np.ndarray, interval: np.ndarray, repetitions: np.ndarray, lapses: np.ndarray,
+              grades: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Schedule after one review per card, element-wise over equal-length arrays."""
+    passed = grades >= PASSING_GRADE
+    repetitions = np.where(passed, repetitions + 1, 0)
+    interval = np.where(
+        passed,
+        np.select([repetitions == 1, repetitions == 2], [1.0, 6.0], interval * ease),
+        1.0,
+    )
+    lapses = np.where(passed, lapses, lapses + 1)
+    miss = MAX_GRADE - grades
+    ease = np.maximum(MIN_EASE, ease + 0.1 - miss * (0.08 + miss * 0.02))
+    return ease, interval, repetitions, lapses
+
+
+def sm2(state: State, grade: int) -> State:
+    """Schedule after one review graded ``grade`` (0-5)."""
+    ease, interval, repetitions, lapses = sm2_batch(*(np.array([value]) for value in state), np.array([grade]))
+    return float(ease[0]), float(interval[0]), int(repetitions[0]), int(lapses[0])
+
+
+def _upsert_statement(db: Session, rows: list[dict], update: bool):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Bulk upsert not supported on {dialect}")
+    stmt = insert(ReviewCard).values(rows)
+    keys = [ReviewCard.user_id, ReviewCard.lesson_id]
+    if not update:
+        return stmt.on_conflict_do_nothing(index_elements=keys)
+    return stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={column: stmt.excluded[column] for column in STATE_COLUMNS},
+    )
+
+
+class ReviewScheduler:
+    @staticmethod
+    def due_query(user_id: int, now: datetime, limit: int = 20):
+        # Range scan on ix_review_cards_user_due in index order: no sort, stops after ``limit``
+        return (
+            select(
+                ReviewCard.lesson_id, ReviewCard.due_at, ReviewCard.interval_days, ReviewCard.repetitions,
+                Lesson.title, Lesson.type, Lesson.excerpt,
+            )
+            .join(Lesson, Lesson.id == ReviewCard.lesson_id)
+            .where(ReviewCard.user_id == user_id, ReviewCard.due_at <= now)
+            .order_by(ReviewCard.due_at)
+            .limit(limit)
+        )
+
+    async def due(self, db: AsyncSession, user_id: int, limit: int = 20) -> list:
+        return (await db.execute(self.due_query(user_id, datetime.utcnow(), limit))).all()
+
+    @staticmethod
+    def enroll(db: Session, pairs: list[tuple[int, int]], now: datetime | None = None):
+        """Schedule the first review of newly completed ``(user_id, lesson_id)`` pairs; cards that exist are left alone."""
+        now = now or datetime.utcnow()
+        first = settings.REVIEW_FIRST_INTERVAL_DAYS
+        rows = [
+            {
+                "user_id": user_id, "lesson_id": lesson_id, "ease": DEFAULT_EASE, "interval_days": first,
+                "repetitions": 0, "lapses": 0, "due_at": now + timedelta(days=first), "last_reviewed_at": None,
+            }
+            for user_id, lesson_id in pairs
+        ]
+        for start in range(0, len(rows), UPSERT_CHUNK):
+            db.execute(_upsert_statement(db, rows[start:start + UPSERT_CHUNK], update=False))
+
+    @staticmethod
+    def apply(db: Session, results: list[tuple[int, int, int, datetime]]) -> dict[tuple[int, int], dict]:
+        """
+        Apply graded reviews ``(user_id, lesson_id, grade, reviewed_at)`` and return the
+        new cards keyed by ``(user_id, lesson_id)``. Several reviews of one card apply in
+        ``reviewed_at`` order; reviews of unknown users or lessons are skipped. The
+        caller commits.
+        """
+        pairs = sorted({(user_id, lesson_id) for user_id, lesson_id, _, _ in results})
+        known_users = set(db.scalars(select(User.id).where(User.id.in_({u for u, _ in pairs}))))
+        known_lessons = set(db.scalars(select(Lesson.id).where(Lesson.id.in_({l for _, l in pairs}))))
+        states: dict[tuple[int, int], State] = {}
+        for start in range(0, len(pairs), UPSERT_CHUNK):
+            chunk = pairs[start:start + UPSERT_CHUNK]
+            for user_id, lesson_id, *state in db.execute(
+                select(
+                    ReviewCard.user_id, ReviewCard.lesson_id,
+                    ReviewCard.ease, ReviewCard.interval_days, ReviewCard.repetitions, ReviewCard.lapses,
+                ).where(tuple_(ReviewCard.user_id, ReviewCard.lesson_id).in_(chunk))
+            ):
+                states[(user_id, lesson_id)] = tuple(state)
+
+        results = [r for r in results if r[0] in known_users and r[1] in known_lessons]
+        if not results:
+            return {}
+        keys = list(dict.fromkeys((user_id, lesson_id) for user_id, lesson_id, _, _ in results))
+        index = {key: i for i, key in enumerate(keys)}
+        card = np.fromiter((index[(r[0], r[1])] for r in results), dtype=np.int64, count=len(results))
+        grades = np.fromiter((r[2] for r in results), dtype=np.int64, count=len(results))
+        reviewed = np.array([r[3] for r in results], dtype="datetime64[us]")
+
+        # Group by card, each card's reviews in time order (lexsort is stable, so
+        # reviews with equal timestamps keep their submission order)
+        order = np.lexsort((reviewed, card))
+        card, grades, reviewed = card[order], grades[order], reviewed[order]
+        starts = np.flatnonzero(np.r_[True, card[1:] != card[:-1]])
+        counts = np.diff(np.r_[starts, len(card)])
+        rank = np.arange(len(card)) - np.repeat(starts, counts)
+
+        initial = [states.get(key, NEW_CARD) for key in keys]
+        ease = np.array([state[0] for state in initial], dtype=np.float64)
+        interval = np.array([state[1] for state in initial], dtype=np.float64)
+        repetitions = np.array([state[2] for state in initial], dtype=np.int64)
+        lapses = np.array([state[3] for state in initial], dtype=np.int64)
+        for k in range(counts.max()):
+            at = rank == k
+            c = card[at]
+            ease[c], interval[c], repetitions[c], lapses[c] = sm2_batch(
+                ease[c], interval[c], repetitions[c], lapses[c], grades[at],
+            )
+
+        # Card ids are positions in ``keys``, so per-card arrays line up with it; each
+        # card's schedule counts from its last review
+        last_reviewed = reviewed[starts + counts - 1]
+        due = last_reviewed + np.round(interval * 86_400_000_000).astype("timedelta64[us]")
+        cards = {
+            key: {
+                "user_id": key[0], "lesson_id": key[1], "ease": e, "interval_days": i,
+                "repetitions": n, "lapses": lapsed, "due_at": due_at, "last_reviewed_at": last_at,
+            }
+            for key, e, i, n, lapsed, due_at, last_at in zip(
+                keys, ease.tolist(), interval.tolist(), repetitions.tolist(), lapses.tolist(),
+                due.tolist(), last_reviewed.tolist(),
+            )
+        }
+        rows = list(cards.values())
+        for start in range(0, len(rows), UPSERT_CHUNK):
+            db.execute(_upsert_statement(db, rows[start:start + UPSERT_CHUNK], update=True))
+        return cards
+
+
+review_scheduler = ReviewScheduler()
@@ -0,0 +1,116 @@
+"""Lesson search (Postgres full-text + trigram).
+
+A query matches lessons whose ``search_vector`` (title weighted above content)
+matches the terms, with the last term treated as a prefix so results appear
+while typing, or whose title is trigram-similar to the query, which catches
+typos. Both predicates are served by GIN indexes.
+
+Ranking is ``ts_rank_cd`` plus a title-similarity bonus. To keep latency flat for
+very broad queries only the first ``SEARCH_MAX_CANDIDATES`` matches are ranked.
+Pages are keyset-paginated on ``(rank DESC, id)``, and snippets are built with
+``ts_headline`` for the returned page only.
+"""
+import re
+
+from sqlalchemy import Float, and_, func, literal_column, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.lesson import SEARCH_VECTOR_COLUMN, Lesson
+
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+SEARCH_VECTOR = literal_column(f"lessons.{SEARCH_VECTOR_COLUMN}")
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=20, MinWords=8, FragmentDelimiter= … "
+TITLE_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, HighlightAll=true"
+# Only this much of the body is scanned for snippets
+SNIPPET_SOURCE_CHARS = 20000
+# Relative weight of title trigram similarity in the rank
+TITLE_SIMILARITY_WEIGHT = 0.5
+MAX_TERMS = 8
+
+
+def to_tsquery_text(query: str) -> str | None:
+    """``"intro to pyth"`` -> ``"intro & to & pyth:*"``; ``None`` if no searchable terms."""
+    terms = re.findall(r"\w+", query.lower())[:MAX_TERMS]
+    if not terms:
+        return None
+    if query != query.rstrip():
+        # A trailing space means the last word is finished
+        return " & ".join(terms)
+    return " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+
+
+class SearchService:
+    def __init__(self, max_candidates: int | None = None):
+        self.max_candidates = max_candidates or settings.SEARCH_MAX_CANDIDATES
+
+    def search_query(self, query: str, limit: int, after: tuple[float, int] | None = None):
+        tsquery_text = to_tsquery_text(query)
+        if tsquery_text is None:
+            return None
+        tsquery = func.to_tsquery(SEARCH_CONFIG, tsquery_text)
+        text = query.strip()
+
+        candidates = (
+            select(Lesson.id)
+            .where(or_(SEARCH_VECTOR.op("@@")(tsquery), Lesson.title.op("%")(text)))
+            .limit(self.max_candidates)
+            .subquery("candidates")
+        )
+        rank = (
+            func.ts_rank_cd(SEARCH_VECTOR, tsquery)
+            + func.similarity(Lesson.title, text) * TITLE_SIMILARITY_WEIGHT
+        ).cast(Float).label("rank")
+        ranked = (
+            select(Lesson.id, rank)
+            .join(candidates, candidates.c.id == Lesson.id)
+            .subquery("ranked")
+        )
+        page = select(ranked.c.id, ranked.c.rank)
+        if after is not None:
+            after_rank, after_id = after
+            page = page.where(or_(
+                ranked.c.rank < after_rank,
+                and_(ranked.c.rank == after_rank, ranked.c.id > after_id),
+            ))
+        page = page.order_by(ranked.c.rank.desc(), ranked.c.id).limit(limit + 1).subquery("page")
+
+        return (
+            select(
+                Lesson.id,
+                Lesson.title,
+                Lesson.type,
+                page.c.rank,
+                func.ts_headline(SEARCH_CONFIG, Lesson.title, tsquery, TITLE_HEADLINE_OPTIONS).label("title_highlight"),
+                func.ts_headline(
+                    SEARCH_CONFIG, func.left(Lesson.content, SNIPPET_SOURCE_CHARS), tsquery, HEADLINE_OPTIONS
+                ).label("snippet"),
+            )
+            .join(page, page.c.id == Lesson.id)
+            .order_by(page.c.rank.desc(), page.c.id)
+        )
+
+    async def search(self, db: AsyncSession, query: str, limit: int, after: tuple[float, int] | None = None) -> dict:
+        """Return ``{"items": [...], "next_key": (rank, id) | None}``."""
+        stmt = self.search_query(query, limit, after)
+        if stmt is None:
+            return {"items": [], "next_key": None}
+        rows = (await db.execute(stmt)).all()
+        next_key = (rows[limit - 1].rank, rows[limit - 1].id) if len(rows) > limit else None
+        return {
+            "items": [
+                {
+                    "id": row.id,
+                    "title": row.title,
+                    "type": row.type,
+                    "rank": row.rank,
+                    "title_highlight": row.title_highlight,
+                    "snippet": row.snippet,
+                }
+                for row in rows[:limit]
+            ],
+            "next_key": next_key,
+        }
+
+
+search_service = SearchService()
@@ -0,0 +1,387 @@
+"""Similar-lesson recommendations from a memory-mapped embedding index.
+
+Files in ``VECTOR_INDEX_DIR``:
+
+* ``meta.json`` - dimension, dtype, generation, row count and IVF list count;
+  replaced atomically, so readers see either the old or the new index
+* ``vectors-<gen>.npy`` - ``(capacity, dim)`` unit-length lesson embeddings in
+  ``EMBEDDING_DTYPE``; float32 rows are scored in place, float16 halves the
+  files but every scored row is converted first
+* ``ids-<gen>.npy`` - lesson id of each row, -1 for a removed row
+* ``lists-<gen>.npy`` / ``centroids-<gen>.npy`` - IVF partition of each row and
+  the partition centroids (catalogs of ``VECTOR_IVF_MIN_ROWS`` or more). The
+  build stores rows grouped by partition, so probing one is a contiguous read;
+  rows added later are appended after them
+
+Every worker maps the files read-only, so the page cache holds one copy
+however many workers there are. Writers (ingestion and the
+``rebuild_lesson_index`` task) serialize on an flock: new rows are written past
+the published count and then published; removals mark rows -1 in place, which
+readers see at once through the shared mapping. A full generation is copied
+into one of twice the capacity.
+
+Search is exact below ``VECTOR_IVF_MIN_ROWS``: matrix-vector products over all
+rows in ``SCORE_CHUNK`` slices with an argpartition for the top k. Above it,
+``build`` trains spherical k-means partitions; a query scores the centroids and
+then only the rows of its ``VECTOR_IVF_NPROBE`` nearest partitions. Rows added
+later join their nearest existing partition, so rebuild once the catalog has
+grown a lot.
+
+Embeddings come from ``HashingEncoder``: signed feature hashing of word
+unigrams and bigrams with sublinear term frequency. It is deterministic and
+needs no model or network, so tests and benchmarks are reproducible; any object
+with ``dim`` and ``encode(texts) -> (n, dim) float32`` can replace it.
+"""
+import fcntl
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from numpy.lib.format import open_memmap
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.lesson import Lesson
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"\w+")
+# Bodies can be megabytes; their start says what the lesson is about
+EMBED_CHARS = 4000
+TITLE_WEIGHT = 2
+META = "meta.json"
+MIN_CAPACITY = 1024
+SCORE_CHUNK = 65536
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+
+
+def lesson_text(title: str, content: str | None) -> str:
+    return " ".join([title] * TITLE_WEIGHT + [(content or "")[:EMBED_CHARS]])
+
+
+class HashingEncoder:
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            tokens = TOKEN.findall(text.lower())
+            grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            if not grams:
+                continue
+            hashes = np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint32, count=len(grams))
+            signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+            np.add.at(out[i], (hashes % self.dim).astype(np.intp), signs)
+        out = np.sign(out) * np.log1p(np.abs(out))
+        # Unit length: a dot product is the cosine similarity
+        return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+
+
+def assign_lists(vectors, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid of each row (both unit length, so the largest dot product)."""
+    out = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), SCORE_CHUNK):
+        chunk = np.asarray(vectors[start:start + SCORE_CHUNK], dtype=np.float32)
+        out[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return out
+
+
+def train_ivf(vectors, nlist: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """Spherical k-means centroids, trained on a sample of ``vectors``."""
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(len(vectors), size=min(len(vectors), nlist * KMEANS_SAMPLE_PER_LIST), replace=False)
+    sample = np.asarray(vectors[np.sort(picked)], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)]
+    for _ in range(iterations):
+        assigned = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assigned, sample)
+        # Re-seed partitions that lost all their rows
+        empty = ~sums.any(axis=1)
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+class Snapshot:
+    """One worker's read-only view of a published generation."""
+
+    def __init__(self, root: Path, meta: dict):
+        gen = meta["generation"]
+        self.count = meta["count"]
+        self.vectors = np.load(root / f"vectors-{gen}.npy", mmap_mode="r")
+        self.ids = np.load(root / f"ids-{gen}.npy", mmap_mode="r")
+        # Lesson id -> row by binary search over a sorted copy
+        ids = np.array(self.ids[:self.count])
+        self.by_id = np.argsort(ids, kind="stable")
+        self.sorted_ids = ids[self.by_id]
+        self.centroids = None
+        if meta["lists"]:
+            nlist, head = meta["lists"], meta["sorted"]
+            self.centroids = np.load(root / f"centroids-{gen}.npy")
+            lists = np.load(root / f"lists-{gen}.npy", mmap_mode="r")
+            # The first ``head`` rows are stored grouped by partition: partition p
+            # is the contiguous block offsets[p]:offsets[p + 1]
+            self.offsets = np.searchsorted(lists[:head], np.arange(nlist + 1))
+            # Rows added since the build follow, unsorted
+            tail = np.array(lists[head:self.count])
+            order = np.argsort(tail, kind="stable")
+            self.tail_rows = head + order
+            self.tail_offsets = np.searchsorted(tail[order], np.arange(nlist + 1))
+
+    def row_of(self, lesson_id: int) -> int | None:
+        pos = int(np.searchsorted(self.sorted_ids, lesson_id))
+        if pos == len(self.sorted_ids) or self.sorted_ids[pos] != lesson_id:
+            return None
+        row = int(self.by_id[pos])
+        # Removed (or replaced) since this snapshot was taken
+        return row if self.ids[row] == lesson_id else None
+
+    def candidate_parts(self, query: np.ndarray, nprobe: int) -> list:
+        """Row slices/arrays to score: everything, or the ``nprobe`` partitions nearest ``query``."""
+        if self.centroids is None or nprobe >= len(self.centroids):
+            return [slice(start, min(start + SCORE_CHUNK, self.count)) for start in range(0, self.count, SCORE_CHUNK)]
+        probes = np.argpartition(self.centroids @ query, -nprobe)[-nprobe:]
+        parts = [slice(self.offsets[p], self.offsets[p + 1]) for p in probes]
+        tail = np.concatenate([self.tail_rows[self.tail_offsets[p]:self.tail_offsets[p + 1]] for p in probes])
+        if len(tail):
+            parts.append(np.sort(tail))
+        return parts
+
+    def search(self, query: np.ndarray, k: int, exclude: int = -1, nprobe: int = 1) -> list[tuple[int, float]]:
+        kept_scores, kept_ids = [], []
+        for part in self.candidate_parts(query, nprobe):
+            ids = np.asarray(self.ids[part])
+            # A view of the mapping for float32 slices; float16 rows are converted here
+            scores = np.asarray(self.vectors[part], dtype=np.float32) @ query
+            scores[(ids < 0) | (ids == exclude)] = -np.inf
+            if len(scores) > k:
+                top = np.argpartition(scores, -k)[-k:]
+                scores, ids = scores[top], ids[top]
+            kept_scores.append(scores)
+            kept_ids.append(ids)
+        if not kept_scores:
+            return []
+        scores, ids = np.concatenate(kept_scores), np.concatenate(kept_ids)
+        best = np.argsort(-scores, kind="stable")[:k]
+        return [(int(ids[i]), float(scores[i])) for i in best if scores[i] > -np.inf]
+
+
+class LessonIndex:
+    def __init__(self, root: str | None = None, dim: int | None = None, dtype: str | None = None, encoder=None):
+        self.root = Path(root or settings.VECTOR_INDEX_DIR)
+        self.dim = dim or settings.EMBEDDING_DIM
+        self.dtype = np.dtype(dtype or settings.EMBEDDING_DTYPE)
+        self.encoder = encoder or HashingEncoder(self.dim)
+        self._snapshot = None
+        self._stamp = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _path(self, kind: str, gen: int) -> Path:
+        return self.root / f"{kind}-{gen}.npy"
+
+    def _read_meta(self) -> dict | None:
+        try:
+            meta = json.loads((self.root / META).read_text())
+        except FileNotFoundError:
+            return None
+        if meta["dim"] != self.dim or meta["dtype"] != self.dtype.name:
+            logger.warning(
+                f"Lesson index in {self.root} is {meta['dim']}-d {meta['dtype']}, expected "
+                f"{self.dim}-d {self.dtype.name}; ignored until rebuilt"
+            )
+            return None
+        return meta
+
+    # --- reading ---
+
+    def snapshot(self) -> Snapshot | None:
+        """Current generation, re-checked at most every VECTOR_INDEX_RELOAD_INTERVAL seconds."""
+        now = time.monotonic()
+        if now - self._checked_at < settings.VECTOR_INDEX_RELOAD_INTERVAL:
+            return self._snapshot
+        with self._lock:
+            if now - self._checked_at < settings.VECTOR_INDEX_RELOAD_INTERVAL:
+                return self._snapshot
+            self._checked_at = now
+            try:
+                stat = (self.root / META).stat()
+            except FileNotFoundError:
+                self._snapshot = self._stamp = None
+                return None
+            stamp = (stat.st_ino, stat.st_mtime_ns)
+            if stamp != self._stamp:
+                meta = self._read_meta()
+                try:
+                    self._snapshot = Snapshot(self.root, meta) if meta and meta["count"] else None
+                    self._stamp = stamp
+                except FileNotFoundError:
+                    # Superseded by a newer generation while loading; picked up next check
+                    pass
+        return self._snapshot
+
+    def similar(self, lesson_id: int, k: int = 10) -> list[tuple[int, float]]:
+        """Up to ``k`` ``(lesson_id, cosine similarity)`` pairs, best first; empty if the lesson isn't indexed."""
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return []
+        row = snapshot.row_of(lesson_id)
+        if row is None:
+            return []
+        query = np.asarray(snapshot.vectors[row], dtype=np.float32)
+        return snapshot.search(query, k, exclude=lesson_id, nprobe=settings.VECTOR_IVF_NPROBE)
+
+    # --- writing ---
+
+    @contextmanager
+    def _writing(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / "index.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield self._read_meta()
+
+    def _publish(self, meta: dict):
+        tmp = self.root / f"{META}.tmp"
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, self.root / META)
+
+    def _drop_generation(self, gen: int):
+        # Workers still mapping these files keep reading them until they reload
+        for kind in ("vectors", "ids", "lists", "centroids"):
+            self._path(kind, gen).unlink(missing_ok=True)
+
+    def _allocate(self, gen: int, capacity: int, lists: bool):
+        vectors = open_memmap(self._path("vectors", gen), mode="w+", dtype=self.dtype, shape=(capacity, self.dim))
+        ids = open_memmap(self._path("ids", gen), mode="w+", dtype=np.int32, shape=(capacity,))
+        ids[:] = -1
+        assigned = open_memmap(self._path("lists", gen), mode="w+", dtype=np.int32, shape=(capacity,)) if lists else None
+        return vectors, ids, assigned
+
+    def _open(self, meta: dict):
+        gen = meta["generation"]
+        vectors = open_memmap(self._path("vectors", gen), mode="r+")
+        ids = open_memmap(self._path("ids", gen), mode="r+")
+        assigned = open_memmap(self._path("lists", gen), mode="r+") if meta["lists"] else None
+        return vectors, ids, assigned
+
+    def build(self, db: Session, batch_size: int = 1000) -> dict:
+        """Embed every lesson into a new generation (retraining IVF partitions for large catalogs)."""
+        started = time.perf_counter()
+        expected = db.scalar(select(func.count()).select_from(Lesson))
+        with self._writing() as old:
+            gen = (old["generation"] if old else 0) + 1
+            capacity = max(MIN_CAPACITY, expected + expected // 4)
+            vectors, ids, _ = self._allocate(gen, capacity, lists=False)
+            count = 0
+            rows = db.execute(
+                select(Lesson.id, Lesson.title, func.substr(Lesson.content, 1, EMBED_CHARS))
+                .order_by(Lesson.id)
+                .execution_options(yield_per=batch_size)
+            )
+            for batch in rows.partitions():
+                if count + len(batch) > capacity:
+                    # Lessons added since the count; keep going in a bigger file
+                    capacity *= 2
+                    vectors, ids, _ = self._copy(gen, vectors, ids, None, count, capacity)
+                vectors[count:count + len(batch)] = self.encoder.encode([lesson_text(t, c) for _, t, c in batch])
+                ids[count:count + len(batch)] = [lesson_id for lesson_id, _, _ in batch]
+                count += len(batch)
+
+            nlist = 0
+            if count >= settings.VECTOR_IVF_MIN_ROWS:
+                nlist = settings.VECTOR_IVF_LISTS or int(np.sqrt(count))
+                centroids = train_ivf(vectors[:count], nlist)
+                np.save(self._path("centroids", gen), centroids)
+                assigned = assign_lists(vectors[:count], centroids)
+                # Rewrite the rows grouped by partition, so a probe scores one contiguous block
+                order = np.argsort(assigned, kind="stable")
+                vectors, ids, assigned = self._copy(gen, vectors, ids, assigned, count, capacity, order)
+                assigned.flush()
+            vectors.flush()
+            ids.flush()
+            self._publish({
+                "dim": self.dim, "dtype": self.dtype.name, "generation": gen,
+                "count": count, "capacity": capacity, "lists": nlist, "sorted": count if nlist else 0,
+            })
+            if old:
+                self._drop_generation(old["generation"])
+        return {"lessons": count, "lists": nlist, "seconds": round(time.perf_counter() - started, 2)}
+
+    def _copy(self, gen: int, vectors, ids, assigned, count: int, capacity: int, order: np.ndarray | None = None):
+        """Copy the first ``count`` rows (permuted by ``order`` if given) into ``capacity``-row files for generation ``gen``."""
+        staging = f"{gen}-staging"
+        new_vectors, new_ids, new_assigned = self._allocate(staging, capacity, lists=assigned is not None)
+        for start in range(0, count, SCORE_CHUNK):
+            stop = min(start + SCORE_CHUNK, count)
+            rows = slice(start, stop) if order is None else order[start:stop]
+            new_vectors[start:stop] = vectors[rows]
+            new_ids[start:stop] = ids[rows]
+            if assigned is not None:
+                new_assigned[start:stop] = assigned[rows]
+        for kind in ("vectors", "ids", "lists"):
+            path = self._path(kind, staging)
+            if path.exists():
+                os.replace(path, self._path(kind, gen))
+        return new_vectors, new_ids, new_assigned
+
+    def upsert(self, lessons: list[tuple[int, str, str | None]]):
+        """(Re-)embed ``(lesson_id, title, content)`` after ingestion; a lesson's previous row is removed."""
+        if not lessons:
+            return
+        embedded = self.encoder.encode([lesson_text(title, content) for _, title, content in lessons])
+        new_ids = np.array([lesson_id for lesson_id, _, _ in lessons], dtype=np.int32)
+        with self._writing() as meta:
+            if meta is None:
+                meta = {
+                    "dim": self.dim, "dtype": self.dtype.name, "generation": 1,
+                    "count": 0, "capacity": MIN_CAPACITY, "lists": 0, "sorted": 0,
+                }
+                vectors, ids, assigned = self._allocate(1, MIN_CAPACITY, lists=False)
+            else:
+                vectors, ids, assigned = self._open(meta)
+            count = meta["count"]
+            ids[:count][np.isin(ids[:count], new_ids)] = -1
+
+            old_gen = None
+            if count + len(lessons) > meta["capacity"]:
+                old_gen, meta["generation"] = meta["generation"], meta["generation"] + 1
+                meta["capacity"] = max(2 * meta["capacity"], count + len(lessons))
+                vectors, ids, assigned = self._copy(meta["generation"], vectors, ids, assigned, count, meta["capacity"])
+                if meta["lists"]:
+                    np.save(self._path("centroids", meta["generation"]), np.load(self._path("centroids", old_gen)))
+            vectors[count:count + len(lessons)] = embedded
+            ids[count:count + len(lessons)] = new_ids
+            if assigned is not None:
+                centroids = np.load(self._path("centroids", meta["generation"]))
+                assigned[count:count + len(lessons)] = assign_lists(embedded, centroids)
+                assigned.flush()
+            vectors.flush()
+            ids.flush()
+            meta["count"] = count + len(lessons)
+            self._publish(meta)
+            if old_gen is not None:
+                self._drop_generation(old_gen)
+
+    def remove(self, lesson_ids: list[int]):
+        """Drop lessons from results; their rows are reclaimed by the next ``build``."""
+        with self._writing() as meta:
+            if meta is None or not lesson_ids:
+                return
+            _, ids, _ = self._open(meta)
+            count = meta["count"]
+            ids[:count][np.isin(ids[:count], lesson_ids)] = -1
+            ids.flush()
+
+
+lesson_index = LessonIndex()
@@ -0,0 +1,295 @@
+"""Access/refresh token pairs.
+
+Access tokens are short-lived JWTs (``ACCESS_TOKEN_EXPIRE_MINUTES``) that are
+authorized from their claims alone, so the request hot path never consults the
+database or a revocation list; revoking a session takes effect within one
+access-token lifetime.
+
+Refresh tokens are opaque ``<family>.<secret>`` strings. Only their SHA-256 is
+stored (unique index, so a lookup is one index probe). Every refresh rotates:
+the presented token is marked used and a new one in the same family is issued.
+A used token presented again means it was copied, so the whole family is
+revoked (reuse detection) and both holders have to log in again. The exception
+is a repeat within ``REFRESH_REUSE_GRACE_SECONDS`` of the rotation, typically
+two tabs refreshing at once: it gets the same successor pair (or a
+``RefreshInProgress`` while the first exchange is still committing).
+
+Revoked families are also recorded in Redis, or an in-process LRU without it,
+with a TTL equal to the family's remaining lifetime, so replays of revoked
+tokens are refused before touching the database.
+
+Browser redirects (OAuth sign-in) never carry tokens: ``stash`` holds a new
+pair behind a random one-time code for ``LOGIN_CODE_TTL`` seconds and the
+frontend trades the code for the pair with ``redeem`` over a POST. Codes live in
+Redis, or in the issuing process without it (then the POST must reach the same
+worker).
+"""
+import hashlib
+import secrets
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+
+import orjson
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.core.redis import get_async_redis, mark_unavailable
+from app.core.security import create_access_token
+from app.core.serialization import dumps
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+
+refresh_results = Counter(
+    "auth_refresh_total",
+    "Refresh token exchanges by result (rotated, raced, in_progress, invalid, revoked, reused)",
+    labelnames=("result",),
+)
+
+_REVOKED_KEY = "auth:revoked:{}"
+_LOGIN_CODE_KEY = "auth:code:{}"
+_SUCCESSOR_KEY = "auth:rotated:{}"
+LOGIN_CODE_TTL = 60
+
+
+class InvalidRefreshToken(Exception):
+    pass
+
+
+class RefreshInProgress(Exception):
+    """A concurrent exchange of the same token hasn't published its result yet."""
+
+
+@dataclass(frozen=True, slots=True)
+class TokenPair:
+    access_token: str
+    refresh_token: str
+    expires_in: int  # access token lifetime, seconds
+    user_id: int
+    role: str
+
+
+def hash_token(raw: str) -> str:
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def family_of(raw: str) -> str | None:
+    family, sep, secret = raw.partition(".")
+    if not sep or len(family) != 32 or not secret:
+        return None
+    return family
+
+
+class TokenService:
+    def __init__(self, local_size: int = 10000, redis_factory=get_async_redis):
+        self._revoked = LRUCache(maxsize=local_size)
+        self._codes = LRUCache(maxsize=local_size, ttl=LOGIN_CODE_TTL)
+        self._successors = LRUCache(maxsize=local_size, ttl=settings.REFRESH_REUSE_GRACE_SECONDS)
+        self.redis_factory = redis_factory
+
+    @property
+    def refresh_lifetime(self) -> timedelta:
+        return timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+
+    def _add_refresh_token(self, db, user_id: int, family: str, now: datetime) -> str:
+        raw = f"{family}.{secrets.token_urlsafe(32)}"
+        db.add(RefreshToken(
+            user_id=user_id,
+            token_hash=hash_token(raw),
+            family=family,
+            expires_at=now + self.refresh_lifetime,
+        ))
+        return raw
+
+    def _pair(self, user_id: int, role: str, refresh_token: str) -> TokenPair:
+        return TokenPair(
+            access_token=create_access_token(user_id=user_id, role=role),
+            refresh_token=refresh_token,
+            expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+            user_id=user_id,
+            role=role,
+        )
+
+    async def issue(self, db: AsyncSession, user_id: int, role: str) -> TokenPair:
+        """Start a new refresh family (a login) and commit it."""
+        raw = self._add_refresh_token(db, user_id, uuid.uuid4().hex, datetime.utcnow())
+        await db.commit()
+        return self._pair(user_id, role, raw)
+
+    async def rotate(self, db: AsyncSession, raw: str) -> TokenPair:
+        """Exchange a refresh token for a new pair; raises ``InvalidRefreshToken`` or ``RefreshInProgress``."""
+        family = family_of(raw)
+        if family is None:
+            refresh_results.inc(labels=("invalid",))
+            raise InvalidRefreshToken("malformed")
+        if await self.is_revoked(family):
+            refresh_results.inc(labels=("revoked",))
+            raise InvalidRefreshToken("revoked")
+
+        now = datetime.utcnow()
+        row = (await db.execute(
+            select(
+                RefreshToken.id,
+                RefreshToken.user_id,
+                RefreshToken.expires_at,
+                RefreshToken.used_at,
+                RefreshToken.revoked_at,
+                User.role,
+                User.is_active,
+            )
+            .join(User, User.id == RefreshToken.user_id)
+            .where(RefreshToken.token_hash == hash_token(raw))
+        )).one_or_none()
+        if row is None or row.revoked_at is not None or row.expires_at <= now or not row.is_active:
+            refresh_results.inc(labels=("invalid",))
+            raise InvalidRefreshToken("invalid")
+
+        # Conditional update instead of SELECT ... FOR UPDATE: of two concurrent
+        # exchanges of the same token exactly one claims it
+        claimed = row.used_at is None and (await db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.id == row.id, RefreshToken.used_at.is_(None))
+            .values(used_at=now)
+        )).rowcount == 1
+        if not claimed:
+            # used_at is None here when the other exchange committed after our SELECT
+            grace = timedelta(seconds=settings.REFRESH_REUSE_GRACE_SECONDS)
+            if row.used_at is None or now - row.used_at <= grace:
+                await db.rollback()
+                successor = await self._successor(raw)
+                if successor is None:
+                    refresh_results.inc(labels=("in_progress",))
+                    raise RefreshInProgress()
+                refresh_results.inc(labels=("raced",))
+                return successor
+            await self.revoke_family(db, family)
+            refresh_results.inc(labels=("reused",))
+            raise InvalidRefreshToken("reused")
+
+        new_raw = self._add_refresh_token(db, row.user_id, family, now)
+        await db.commit()
+        refresh_results.inc(labels=("rotated",))
+        # Role comes from the row, so a refresh picks up role changes
+        tokens = self._pair(row.user_id, row.role, new_raw)
+        await self._remember_successor(raw, tokens)
+        return tokens
+
+    async def _remember_successor(self, raw: str, tokens: TokenPair):
+        ttl = settings.REFRESH_REUSE_GRACE_SECONDS
+        if ttl <= 0:
+            return
+        key = hash_token(raw)
+        self._successors.set(key, tokens)
+        r = self.redis_factory()
+        if r is None:
+            return
+        try:
+            await r.set(_SUCCESSOR_KEY.format(key), dumps(asdict(tokens)), px=int(ttl * 1000))
+        except Exception as e:
+            mark_unavailable(e)
+
+    async def _successor(self, raw: str) -> TokenPair | None:
+        key = hash_token(raw)
+        tokens = self._successors.get(key)
+        if tokens is not None:
+            return tokens
+        r = self.redis_factory()
+        if r is None:
+            return None
+        try:
+            cached = await r.get(_SUCCESSOR_KEY.format(key))
+        except Exception as e:
+            mark_unavailable(e)
+            return None
+        return TokenPair(**orjson.loads(cached)) if cached else None
+
+    async def revoke(self, db: AsyncSession, raw: str):
+        """Log out: revoke the family of ``raw`` (unknown tokens are ignored)."""
+        family = family_of(raw)
+        if family is None:
+            return
+        owned = (await db.execute(
+            select(RefreshToken.id).where(RefreshToken.token_hash == hash_token(raw))
+        )).first()
+        if owned is not None:
+            await self.revoke_family(db, family)
+
+    async def revoke_family(self, db: AsyncSession, family: str):
+        now = datetime.utcnow()
+        await db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family == family, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=now)
+        )
+        expires_at = (await db.execute(
+            select(func.max(RefreshToken.expires_at)).where(RefreshToken.family == family)
+        )).scalar()
+        await db.commit()
+        if expires_at is not None and expires_at > now:
+            await self._remember_revoked(family, (expires_at - now).total_seconds())
+
+    async def _remember_revoked(self, family: str, ttl: float):
+        self._revoked.set(family, True, ttl=ttl)
+        r = self.redis_factory()
+        if r is None:
+            return
+        try:
+            await r.set(_REVOKED_KEY.format(family), 1, px=int(ttl * 1000))
+        except Exception as e:
+            mark_unavailable(e)
+
+    async def is_revoked(self, family: str) -> bool:
+        if self._revoked.get(family):
+            return True
+        r = self.redis_factory()
+        if r is None:
+            return False
+        try:
+            return bool(await r.exists(_REVOKED_KEY.format(family)))
+        except Exception as e:
+            mark_unavailable(e)
+            return False
+
+    async def stash(self, tokens: TokenPair) -> str:
+        """Hold ``tokens`` behind a one-time code that ``redeem`` exchanges within LOGIN_CODE_TTL seconds."""
+        code = secrets.token_urlsafe(32)
+        key = hash_token(code)
+        r = self.redis_factory()
+        if r is not None:
+            try:
+                await r.set(_LOGIN_CODE_KEY.format(key), dumps(asdict(tokens)), ex=LOGIN_CODE_TTL)
+                return code
+            except Exception as e:
+                mark_unavailable(e)
+        self._codes.set(key, tokens)
+        return code
+
+    async def redeem(self, code: str) -> TokenPair | None:
+        """Return the pair stashed under ``code`` and forget it; ``None`` if unknown, used or expired."""
+        key = hash_token(code)
+        tokens = self._codes.get(key)
+        if tokens is not None:
+            self._codes.delete(key)
+            return tokens
+        r = self.redis_factory()
+        if r is None:
+            return None
+        try:
+            raw = await r.getdel(_LOGIN_CODE_KEY.format(key))
+        except Exception as e:
+            mark_unavailable(e)
+            return None
+        return TokenPair(**orjson.loads(raw)) if raw else None
+
+    def purge_expired(self, db: Session) -> int:
+        """Delete expired refresh tokens (used and revoked ones are kept until then for reuse detection)."""
+        deleted = db.execute(delete(RefreshToken).where(RefreshToken.expires_at <= datetime.utcnow())).rowcount
+        db.commit()
+        return deleted
+
+
+token_service = TokenService()
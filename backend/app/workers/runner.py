@@ -0,0 +1,196 @@
+"""Job worker process.
+
+    python -m app.workers.runner                      # queues from JOB_WORKER_QUEUES
+    python -m app.workers.runner --queues ingest:1,ai:16
+
+Each queue gets ``<concurrency>`` slots. A slot blocks on the queue's stream for
+the next delivery, runs it and records the outcome. While a job runs, its
+delivery's idle time is refreshed every third of ``JOB_VISIBILITY_TIMEOUT``, so
+another worker only takes over jobs whose worker died. Slots also move
+due retries back onto the stream and reclaim deliveries abandoned by dead
+workers. SIGTERM stops claiming and waits for running jobs; jobs that don't
+finish are redelivered after the visibility timeout.
+
+Every worker also runs the ``JOB_SCHEDULE`` clock: each period, whichever
+worker first sets the task's schedule key in Redis enqueues it once.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+
+from app.core.config import settings
+from app.services.job_queue import (
+    describe,
+    execute,
+    get_task,
+    job_duration,
+    job_queue,
+    load_tasks,
+    parse_queues,
+    parse_schedule,
+)
+
+logger = logging.getLogger(__name__)
+
+BLOCK_MS = 2000
+PROMOTE_INTERVAL = 1.0
+RETRY_INTERVAL = 5.0
+SCHEDULE_TICK = 30.0
+
+
+def redis_client():
+    """Dedicated client: blocking stream reads need a longer socket timeout than the API's."""
+    import redis.asyncio as aioredis
+
+    return aioredis.Redis.from_url(
+        settings.REDIS_URL,
+        socket_timeout=BLOCK_MS / 1000 + 5,
+        socket_connect_timeout=5,
+        health_check_interval=30,
+    )
+
+
+class QueueConsumer:
+    def __init__(self, r, queue: str, concurrency: int, consumer: str, stop: asyncio.Event):
+        self.r = r
+        self.queue = queue
+        self.concurrency = concurrency
+        self.consumer = consumer
+        self.stop = stop
+        self._next_promote = 0.0
+        self._next_reclaim = 0.0
+
+    async def run(self):
+        while not self.stop.is_set():
+            try:
+                await job_queue.ensure_group(self.r, self.queue)
+                break
+            except Exception as e:
+                logger.warning(f"Queue {self.queue}: Redis unavailable ({e}); retrying")
+                await asyncio.sleep(RETRY_INTERVAL)
+        await asyncio.gather(*(self.slot() for _ in range(self.concurrency)))
+
+    async def _next_delivery(self) -> list[tuple[str, str]]:
+        now = time.monotonic()
+        if now >= self._next_promote:
+            self._next_promote = now + PROMOTE_INTERVAL
+            await job_queue.promote(self.r, self.queue)
+        if now >= self._next_reclaim:
+            claimed = await job_queue.reclaim(self.r, self.queue, self.consumer)
+            if claimed:
+                # Keep it due so the other slots drain the rest of a dead worker's jobs
+                return claimed
+            self._next_reclaim = now + settings.JOB_VISIBILITY_TIMEOUT / 4
+        return await job_queue.claim(self.r, self.queue, self.consumer, BLOCK_MS)
+
+    async def slot(self):
+        while not self.stop.is_set():
+            try:
+                for entry_id, job_id in await self._next_delivery():
+                    await self.process(entry_id, job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Queue {self.queue}: {e}; retrying in {RETRY_INTERVAL}s")
+                await asyncio.sleep(RETRY_INTERVAL)
+
+    async def _heartbeat(self, entry_id: str):
+        while True:
+            await asyncio.sleep(settings.JOB_VISIBILITY_TIMEOUT / 3)
+            try:
+                await job_queue.touch(self.r, self.queue, self.consumer, entry_id)
+            except Exception as e:
+                logger.warning(f"Could not extend job delivery {entry_id}: {e}")
+
+    async def process(self, entry_id: str, job_id: str):
+        record = await job_queue.start(self.r, self.queue, entry_id, job_id)
+        if record is None:
+            return
+        if int(record["attempts"]) > int(record["max_attempts"]):
+            # Redelivered after its worker died on every attempt
+            await job_queue.finish(self.r, self.queue, entry_id, record, error="Worker lost on every attempt")
+            return
+        heartbeat = asyncio.create_task(self._heartbeat(entry_id))
+        started = time.perf_counter()
+        result, error = None, None
+        try:
+            result = await execute(get_task(record["task"]), orjson.loads(record["kwargs"]))
+        except Exception as e:
+            error = describe(e)
+            logger.warning(f"Job {job_id} ({record['task']}) attempt {record['attempts']} failed: {error}")
+        finally:
+            heartbeat.cancel()
+            job_duration.observe(time.perf_counter() - started, labels=(self.queue, record["task"]))
+        await job_queue.finish(self.r, self.queue, entry_id, record, result=result, error=error)
+
+
+class Scheduler:
+    """Enqueues ``JOB_SCHEDULE`` tasks once per interval across all workers."""
+
+    def __init__(self, r, schedule: dict[str, float], consumer: str, stop: asyncio.Event):
+        self.r = r
+        self.schedule = schedule
+        self.consumer = consumer
+        self.stop = stop
+
+    async def tick(self):
+        for name, interval in self.schedule.items():
+            key = f"{job_queue.prefix}:schedule:{name}"
+            try:
+                # The key lives for one period, so only its first setter enqueues
+                if await self.r.set(key, self.consumer, nx=True, px=int(interval * 1000)):
+                    await job_queue.enqueue(name, dedup_key=f"schedule:{name}")
+            except Exception as e:
+                logger.warning(f"Could not schedule {name}: {e}")
+
+    async def run(self):
+        while not self.stop.is_set():
+            await self.tick()
+            try:
+                await asyncio.wait_for(self.stop.wait(), SCHEDULE_TICK)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def main(queues: dict[str, int]):
+    if not settings.REDIS_URL:
+        sys.exit("REDIS_URL is not set; without Redis jobs run inside the API process")
+    load_tasks()
+    schedule = parse_schedule(settings.JOB_SCHEDULE)
+    for name in schedule:
+        get_task(name)  # fail at startup on a typo
+    # Sync tasks run in the default executor; one thread per slot
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=sum(queues.values())))
+    stop = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+
+    r = redis_client()
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+    logger.info(f"Worker {consumer} consuming {queues}")
+    try:
+        await asyncio.gather(
+            Scheduler(r, schedule, consumer, stop).run(),
+            *(QueueConsumer(r, queue, concurrency, consumer, stop).run() for queue, concurrency in queues.items()),
+        )
+    finally:
+        if "app.services.ai_orchestrator" in sys.modules:
+            await sys.modules["app.services.ai_orchestrator"].ai_orchestrator.close()
+        await r.aclose()
+    logger.info(f"Worker {consumer} stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queues", default=settings.JOB_WORKER_QUEUES, help="<queue>:<concurrency>,...")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main(parse_queues(args.queues)))
@@ -1,2 +1,84 @@
-
 # Async task definitions
+# Registered with the job queue (app/services/job_queue.py) and run by
+# `python -m app.workers.runner`; each stays callable directly (cron, scripts).
+
+from app.db.session import SessionLocal
+from app.services.job_queue import task
+from app.services.personalization_service import personalization_service
+from app.services.token_service import token_service
+
+
+@task(queue="default")
+def rebuild_user_feeds():
+    """Re-materialize every active user's personalized feed."""
+    db = SessionLocal()
+    try:
+        return personalization_service.rebuild_all(db)
+    finally:
+        db.close()
+
+
+@task(queue="default")
+def materialize_user_feed(user_id: int):
+    """Build one user's personalized feed (enqueued by /feed/me when it is empty)."""
+    db = SessionLocal()
+    try:
+        return personalization_service.rebuild_users(db, [user_id])
+    finally:
+        db.close()
+
+
+@task(queue="default")
+def purge_refresh_tokens():
+    """Delete expired refresh tokens."""
+    db = SessionLocal()
+    try:
+        return token_service.purge_expired(db)
+    finally:
+        db.close()
+
+
+@task(queue="ingest")
+def run_ingestion(job_id: int, batch_size: int | None = None):
+    """Run (or resume) an ingestion job; progress and failures are recorded on its row."""
+    from app.models.ingestion_job import IngestionJob
+    from app.services.ingestion_service import IngestionService
+
+    db = SessionLocal()
+    try:
+        job = db.get(IngestionJob, job_id)
+        if job is None:
+            raise ValueError(f"Ingestion job {job_id} not found")
+        IngestionService(batch_size=batch_size).run(db, job)
+        return {"rows_committed": job.rows_committed, "rows_rejected": job.rows_rejected}
+    finally:
+        db.close()
+
+
+@task(queue="ingest")
+def rebuild_lesson_index():
+    """Re-embed every lesson into a new similar-lessons index generation (retrains IVF partitions)."""
+    from app.services.similarity_service import lesson_index
+
+    db = SessionLocal()
+    try:
+        return lesson_index.build(db)
+    finally:
+        db.close()
+
+
+@task(queue="ai", max_attempts=2)
+async def ai_complete(provider: str, model: str, messages: list[dict], params: dict | None = None):
+    """Chat completion through the orchestrator (its own retries, dedup and cache apply)."""
+    from app.services.ai_orchestrator import ai_orchestrator
+
+    response = await ai_orchestrator.complete(provider, model, messages, **(params or {}))
+    return response.to_dict()
+
+
+@task(queue="audio")
+def transcode_audio(lesson_id: int, bitrate: int):
+    """Build a lesson's audio variant (enqueued by /lessons/{id}/audio on a cache miss)."""
+    from app.services.audio_service import audio_service
+
+    return str(audio_service.resolve(lesson_id, bitrate))
@@ -0,0 +1,85 @@
+"""Drive the AI orchestrator against the local fake provider.
+
+Fires --requests calls drawn from --distinct prompts with --concurrency
+callers and reports latency, how many calls reached the upstream (dedup +
+cache effectiveness), peak upstream concurrency and estimated cost.
+
+    python benchmarks/bench_ai_orchestrator.py --requests 2000 --distinct 100
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+
+from app.services.ai_orchestrator import AIOrchestrator, DiskCache, ProviderConfig
+from benchmarks.loadgen import percentile, serve
+
+
+async def drive(base_url: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as cache_dir:
+        orchestrator = AIOrchestrator(
+            [ProviderConfig(
+                name="fake", base_url=base_url, http2=False,
+                max_concurrency=args.max_concurrency, rate_per_second=args.rate, burst=args.max_concurrency,
+                cost_per_1k_input=0.15, cost_per_1k_output=0.6,
+            )],
+            cache=DiskCache(cache_dir, 64 * 1024 ** 2),
+        )
+        rng = random.Random(3)
+        prompts = [f"Explain concept number {i} in one sentence." for i in range(args.distinct)]
+        queue = [rng.choice(prompts) for _ in range(args.requests)]
+        latencies, cost = [], 0.0
+
+        async def worker():
+            nonlocal cost
+            while queue:
+                prompt = queue.pop()
+                started = time.perf_counter()
+                resp = await orchestrator.complete("fake", "fake-model", [{"role": "user", "content": prompt}])
+                latencies.append(time.perf_counter() - started)
+                if not resp.cached:
+                    cost += resp.cost_usd
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        await orchestrator.close()
+
+    upstream = httpx.get(f"{base_url}/stats").json()
+    ms = [x * 1000 for x in latencies]
+    return {
+        "requests": args.requests,
+        "distinct_prompts": args.distinct,
+        "seconds": round(elapsed, 2),
+        "upstream_calls": upstream["completions"],
+        "upstream_max_in_flight": upstream["max_in_flight"],
+        "p50_ms": round(statistics.median(ms), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "estimated_cost_usd": round(cost, 6),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=50.0)
+    args = parser.parse_args()
+
+    with serve("benchmarks.fake_ai_provider:app", env={"FAKE_AI_LATENCY_MS": "200"}) as base_url:
+        print(json.dumps(asyncio.run(drive(base_url, args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Load test: legacy sync DB path vs the async (asyncpg) path.
+
+``legacy_app`` below reproduces the pre-async handlers: sync ``def`` routes on
+the threadpool, a ``pool_pre_ping=True`` engine with default pool sizing and a
+user row query per request. Both apps are started with uvicorn against the
+same database and driven with the same request mix.
+
+    DATABASE_URL=postgresql://... python benchmarks/bench_async_db.py --concurrency 100
+
+The database must already be seeded (e.g. with benchmarks/seed.py
+pointed at the same URL) and contain user id 1.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi import Depends, FastAPI
+from fastapi.security import OAuth2PasswordBearer
+from jose import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models.feed_item import FeedItem
+from app.models.user import User
+from benchmarks.loadgen import run_load, serve
+
+# --- legacy sync app (pre-async behaviour) ---
+
+legacy_app = FastAPI()
+_legacy_engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+_LegacySession = sessionmaker(autocommit=False, autoflush=False, bind=_legacy_engine)
+_oauth2 = OAuth2PasswordBearer(tokenUrl="/auth/login")
+
+
+def _legacy_db():
+    db = _LegacySession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _legacy_user(token: str = Depends(_oauth2), db: Session = Depends(_legacy_db)):
+    payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=["HS256"], options={"leeway": 60})
+    return db.query(User).filter(User.id == int(payload["sub"])).first()
+
+
+@legacy_app.get("/health")
+def legacy_health():
+    return {"status": "ok"}
+
+
+@legacy_app.get("/feed")
+def legacy_feed(db: Session = Depends(_legacy_db)):
+    return db.query(FeedItem).order_by(FeedItem.order.asc()).limit(20).all()
+
+
+@legacy_app.get("/users/me")
+def legacy_me(user: User = Depends(_legacy_user)):
+    return {"id": user.id, "email": user.email, "role": user.role}
+
+
+# --- driver ---
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--user-id", type=int, default=1)
+    args = parser.parse_args()
+
+    token = create_access_token(user_id=args.user_id, role="user")
+    mix = [
+        ("GET", "/feed", {}),
+        ("GET", "/users/me", {"headers": {"Authorization": f"Bearer {token}"}}),
+    ]
+    results = {}
+    for name, target in (("legacy_sync", "benchmarks.bench_async_db:legacy_app"), ("async", "app.main:app")):
+        with serve(target, args=["--workers", str(args.workers)]) as base_url:
+            # Warm up pools and caches before measuring
+            asyncio.run(run_load(base_url, mix, concurrency=args.concurrency, duration=2.0))
+            results[name] = asyncio.run(
+                run_load(base_url, mix, concurrency=args.concurrency, duration=args.duration)
+            )
+        print(f"{name}: {json.dumps(results[name]['total'])}", file=sys.stderr)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
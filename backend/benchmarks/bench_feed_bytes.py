@@ -0,0 +1,106 @@
+"""Bytes read from the database per /feed page: full bodies vs. excerpts.
+
+Seeds a text-heavy catalog (--body-kib per lesson), then walks --pages feed
+pages with the previous query (``Lesson.content``) and the current one
+(``Lesson.excerpt``) and reports the bytes of lesson text fetched per page,
+the reduction and the query time.
+
+    python benchmarks/bench_feed_bytes.py --lessons 5000 --body-kib 20
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_feed_bytes.py
+
+Defaults to a local SQLite file so it runs without Postgres.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import bindparam, create_engine, select, update
+
+from app.models.feed_item import FeedItem
+from app.models.lesson import Lesson, make_excerpt
+from benchmarks.seed import DEFAULT_DATABASE_URL, seed
+
+WORDS = "the of lesson practice example vocabulary grammar sentence listen repeat review answer".split()
+
+
+def make_body(rng: random.Random, size: int) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def fatten(engine, lessons: int, body_chars: int, batch: int = 500):
+    rng = random.Random(7)
+    stmt = (
+        update(Lesson.__table__)
+        .where(Lesson.__table__.c.id == bindparam("lesson_id"))
+        .values(content=bindparam("body"), excerpt=bindparam("short"))
+    )
+    with engine.begin() as conn:
+        for start in range(1, lessons + 1, batch):
+            rows = []
+            for i in range(start, min(start + batch, lessons + 1)):
+                body = make_body(rng, body_chars)
+                rows.append({"lesson_id": i, "body": body, "short": make_excerpt(body)})
+            conn.execute(stmt, rows)
+
+
+def walk(engine, text_column, pages: int, limit: int) -> tuple[list[int], list[float]]:
+    page_bytes, timings = [], []
+    after = (0, 0)
+    with engine.connect() as conn:
+        for _ in range(pages):
+            started = time.perf_counter()
+            rows = conn.execute(
+                select(FeedItem.id, FeedItem.order, Lesson.title, text_column, Lesson.type)
+                .join(Lesson, Lesson.id == FeedItem.lesson_id)
+                .where((FeedItem.order > after[0]) | ((FeedItem.order == after[0]) & (FeedItem.id > after[1])))
+                .order_by(FeedItem.order, FeedItem.id)
+                .limit(limit)
+            ).all()
+            timings.append(time.perf_counter() - started)
+            if not rows:
+                break
+            page_bytes.append(sum(len((row[2] or "").encode()) + len((row[3] or "").encode()) for row in rows))
+            after = (rows[-1].order, rows[-1].id)
+    return page_bytes, timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lessons", type=int, default=5_000)
+    parser.add_argument("--body-kib", type=float, default=20)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(os.getenv("BENCH_DATABASE_URL", DEFAULT_DATABASE_URL))
+    seed(engine, users=1, lessons=args.lessons, progress_per_user=0, admins=0, with_passwords=False)
+    fatten(engine, args.lessons, int(args.body_kib * 1024))
+
+    result = {"lessons": args.lessons, "body_kib": args.body_kib, "limit": args.limit}
+    for name, column in (("content", Lesson.content), ("excerpt", Lesson.excerpt)):
+        page_bytes, timings = walk(engine, column, args.pages, args.limit)
+        result[name] = {
+            "bytes_per_page": round(statistics.mean(page_bytes)),
+            "ms_per_page": round(statistics.mean(timings) * 1000, 2),
+        }
+    result["bytes_reduction_pct"] = round(
+        100 * (1 - result["excerpt"]["bytes_per_page"] / result["content"]["bytes_per_page"]), 1
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Job queue throughput and enqueue latency against a local Redis.
+
+* enqueue: --enqueues sequential ``job_queue.enqueue`` calls (one EVALSHA each),
+  plus the same with a repeated dedup key (the deduplicated path);
+* throughput: starts --workers ``app.workers.runner`` processes consuming the
+  ``bench`` queue with --concurrency slots each, enqueues --jobs no-op jobs
+  (--job-ms of sleep each) and times until the queue is drained.
+
+    docker run --rm -p 6379:6379 redis:7
+    REDIS_URL=redis://localhost:6379/15 python benchmarks/bench_jobs.py --jobs 20000 --workers 2
+
+The benchmark's task is registered from this module (JOB_TASK_MODULES) and
+its keys are deleted before each run; use a scratch Redis database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.services.job_queue import GROUP, task
+from benchmarks.loadgen import BACKEND_DIR, percentile
+
+QUEUE = "bench"
+TASK_MODULES = "app.workers.tasks,benchmarks.bench_jobs"
+
+
+@task(queue=QUEUE, max_attempts=1)
+def bench_noop(n: int, sleep_ms: float = 0):
+    if sleep_ms:
+        time.sleep(sleep_ms / 1000)
+    return n
+
+
+def redis_client():
+    import redis.asyncio as aioredis
+
+    return aioredis.Redis.from_url(os.environ["REDIS_URL"], socket_timeout=10)
+
+
+async def reset(r, queue):
+    await r.delete(queue.stream_key(QUEUE), queue.delayed_key(QUEUE))
+    async for key in r.scan_iter(match=f"{queue.prefix}:dedup:bench-*"):
+        await r.delete(key)
+
+
+async def time_enqueues(r, queue, count: int, dedup: bool) -> dict:
+    latencies, ids = [], set()
+    for i in range(count):
+        started = time.perf_counter()
+        job, _ = await queue.enqueue("bench_noop", {"n": i}, dedup_key="bench-same" if dedup else None)
+        latencies.append(time.perf_counter() - started)
+        ids.add(job["id"])
+    # These are never run; drop their records
+    await r.delete(*(queue.job_key(job_id) for job_id in ids))
+    us = [x * 1e6 for x in latencies]
+    return {"p50_us": round(percentile(us, 50), 1), "p99_us": round(percentile(us, 99), 1)}
+
+
+async def drained(r, queue) -> bool:
+    stream = queue.stream_key(QUEUE)
+    if await r.xlen(stream) or await r.zcard(queue.delayed_key(QUEUE)):
+        return False
+    return (await r.xpending(stream, GROUP))["pending"] == 0
+
+
+async def run(args) -> dict:
+    from app.services import job_queue as jq
+
+    r = redis_client()
+    queue = jq.JobQueue(redis_factory=lambda: r)
+    result = {}
+    await reset(r, queue)
+    result["enqueue"] = await time_enqueues(r, queue, args.enqueues, dedup=False)
+    result["enqueue_dedup_hit"] = await time_enqueues(r, queue, args.enqueues, dedup=True)
+    await reset(r, queue)
+
+    env = {**os.environ, "JOB_TASK_MODULES": TASK_MODULES}
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "app.workers.runner", "--queues", f"{QUEUE}:{args.concurrency}"],
+            cwd=BACKEND_DIR, env=env,
+        )
+        for _ in range(args.workers)
+    ]
+    try:
+        await asyncio.sleep(2)  # consumer groups created, slots blocking on the stream
+        started = time.perf_counter()
+        sem = asyncio.Semaphore(64)
+
+        async def enqueue(i):
+            async with sem:
+                await queue.enqueue("bench_noop", {"n": i, "sleep_ms": args.job_ms})
+
+        await asyncio.gather(*(enqueue(i) for i in range(args.jobs)))
+        enqueued_in = time.perf_counter() - started
+        while not await drained(r, queue):
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - started
+    finally:
+        for proc in workers:
+            proc.terminate()
+        for proc in workers:
+            proc.wait(timeout=30)
+        await r.aclose()
+
+    result.update({
+        "jobs": args.jobs,
+        "workers": args.workers,
+        "concurrency": args.concurrency,
+        "job_ms": args.job_ms,
+        "enqueue_per_s": round(args.jobs / enqueued_in),
+        "jobs_per_s": round(args.jobs / elapsed),
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--enqueues", type=int, default=5_000)
+    parser.add_argument("--jobs", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--job-ms", type=float, default=0)
+    args = parser.parse_args()
+    if not os.getenv("REDIS_URL"):
+        sys.exit("REDIS_URL must point at a scratch Redis database")
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Per-request overhead of MetricsMiddleware.
+
+Calls a no-op ASGI app directly (no server, no network) with and without the
+middleware and reports the difference in microseconds per request.
+
+    python benchmarks/bench_metrics_overhead.py --requests 200000
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.instrumentation import MetricsMiddleware
+
+
+class _Route:
+    path = "/lessons/{lesson_id}"
+
+
+async def noop_app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+async def time_app(app, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app({"type": "http", "method": "GET", "path": "/lessons/1"}, receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+async def main(requests: int, rounds: int):
+    wrapped = MetricsMiddleware(noop_app)
+    bare_best, wrapped_best = float("inf"), float("inf")
+    for _ in range(rounds):
+        bare_best = min(bare_best, await time_app(noop_app, requests))
+        wrapped_best = min(wrapped_best, await time_app(wrapped, requests))
+    print(f"bare:       {bare_best * 1e6:.2f} us/request")
+    print(f"middleware: {wrapped_best * 1e6:.2f} us/request")
+    print(f"overhead:   {(wrapped_best - bare_best) * 1e6:.2f} us/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.rounds))
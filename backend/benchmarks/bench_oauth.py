@@ -0,0 +1,141 @@
+"""Load test for the OAuth sign-in flow against a local identity provider.
+
+Starts benchmarks/fake_oidc_provider.py and the app (configured to use it as
+"google"), seeds users, then has --concurrency virtual browsers run the whole
+flow in a loop for --duration seconds:
+
+    GET /auth/google -> IdP /authorize -> GET /auth/complete/google-oauth2/ (code
+    exchange, ID token verification, user lookup, token issue) -> frontend URL
+
+While that runs, a separate loop polls /health; its p99 shows whether the
+callbacks block the event loop. Afterwards the IdP rotates its signing key and
+one more login checks the JWKS refresh. IdP /stats should show discovery and
+JWKS fetched once per worker (plus the rotation), not once per login.
+
+    python benchmarks/bench_oauth.py --users 1000 --concurrency 50 --duration 20
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_oauth.py --workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+from sqlalchemy import create_engine
+
+from benchmarks.loadgen import free_port, percentile, serve
+from benchmarks.seed import DEFAULT_DATABASE_URL, seed
+
+
+async def login(client: httpx.AsyncClient, app_url: str, user: int) -> tuple[float, float]:
+    """One sign-in; returns (total seconds, callback seconds)."""
+    started = time.perf_counter()
+    start = await client.get(f"{app_url}/auth/google")
+    if not start.is_redirect:
+        raise RuntimeError(f"/auth/google answered {start.status_code}")
+    authorize = await client.get(start.headers["location"], params={"login_hint": user})
+    callback_url = authorize.headers["location"]
+    callback_started = time.perf_counter()
+    done = await client.get(callback_url)
+    finished = time.perf_counter()
+    if not done.is_redirect or "access_token" not in parse_qs(urlparse(done.headers["location"]).query):
+        raise RuntimeError(f"callback answered {done.status_code}: {done.text[:200]}")
+    return finished - started, finished - callback_started
+
+
+async def drive(app_url: str, idp_url: str, args) -> dict:
+    rng = random.Random(1)
+    flows, callbacks, health = [], [], []
+    errors = 0
+    deadline = time.perf_counter() + args.duration
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        async def browser():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                try:
+                    total, callback = await login(client, app_url, rng.randint(1, args.users))
+                except (httpx.HTTPError, RuntimeError, KeyError):
+                    errors += 1
+                    continue
+                flows.append(total)
+                callbacks.append(callback)
+
+        async def probe():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await client.get(f"{app_url}/health")
+                health.append(time.perf_counter() - started)
+                await asyncio.sleep(0.05)
+
+        started = time.perf_counter()
+        await asyncio.gather(probe(), *(browser() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+        await client.post(f"{idp_url}/rotate")
+        try:
+            await login(client, app_url, 1)
+            rotation = "ok"
+        except (httpx.HTTPError, RuntimeError, KeyError) as e:
+            rotation = f"failed: {e}"
+        idp_stats = (await client.get(f"{idp_url}/stats")).json()
+
+    def ms(samples, pct):
+        return round(percentile(samples, pct) * 1000, 2)
+
+    return {
+        "logins": len(flows),
+        "errors": errors,
+        "logins_per_s": round(len(flows) / elapsed, 1),
+        "flow_p50_ms": ms(flows, 50),
+        "flow_p99_ms": ms(flows, 99),
+        "callback_p50_ms": ms(callbacks, 50),
+        "callback_p99_ms": ms(callbacks, 99),
+        "health_p99_ms": ms(health, 99),
+        "after_key_rotation": rotation,
+        "idp": idp_stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--idp-latency-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    url = os.getenv("BENCH_DATABASE_URL", DEFAULT_DATABASE_URL)
+    # Seeded users are matched by verified email on first sign-in, then by google_id
+    seed(create_engine(url), args.users, lessons=10, progress_per_user=0, admins=0, with_passwords=False)
+
+    idp_env = {"FAKE_OIDC_LATENCY_MS": str(args.idp_latency_ms), "FAKE_OIDC_USERS": str(args.users)}
+    with serve("benchmarks.fake_oidc_provider:app", env=idp_env) as idp_url:
+        port = free_port()
+        app_url = f"http://127.0.0.1:{port}"
+        env = {
+            "DATABASE_URL": url,
+            "ASYNC_DATABASE_URL": "",
+            "RATE_LIMIT_ENABLED": "false",
+            "API_BASE_URL": app_url,
+            "FRONTEND_URL": "http://frontend.invalid",
+            "GOOGLE_CLIENT_ID": "bench",
+            "GOOGLE_CLIENT_SECRET": "bench",
+            "GOOGLE_DISCOVERY_URL": f"{idp_url}/.well-known/openid-configuration",
+        }
+        with serve("app.main:app", port=port, env=env, args=["--workers", str(args.workers)]):
+            result = asyncio.run(drive(app_url, idp_url, args))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Microbenchmark: quiz grades per second on one core.
+
+Grades submissions against a compiled answer key in memory, which is the whole
+request-path cost of grading once a quiz is cached.
+
+    python benchmarks/bench_quiz_grading.py --questions 10 --submissions 1000000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.services.quiz_service import CompiledQuiz
+
+
+def make_quiz(questions: int, rng: random.Random) -> CompiledQuiz:
+    qs = []
+    for i in range(questions):
+        # Every fourth question is multiple-answer
+        answer = sorted(rng.sample(range(4), 2)) if i % 4 == 3 else rng.randrange(4)
+        qs.append({"id": f"q{i}", "prompt": f"Question {i}", "choices": ["a", "b", "c", "d"], "answer": answer})
+    return CompiledQuiz.compile(SimpleNamespace(lesson_id=1, version=1, pass_score=0.7, questions=qs))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--submissions", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    quiz = make_quiz(args.questions, rng)
+    pool = [
+        {f"q{i}": (sorted(rng.sample(range(4), 2)) if i % 4 == 3 else rng.randrange(4)) for i in range(args.questions)}
+        for _ in range(1000)
+    ]
+
+    grade = quiz.grade
+    started = time.perf_counter()
+    passed = 0
+    for n in range(args.submissions):
+        passed += grade(pool[n % 1000]).passed
+    elapsed = time.perf_counter() - started
+
+    print(json.dumps({
+        "questions": args.questions,
+        "submissions": args.submissions,
+        "seconds": round(elapsed, 3),
+        "grades_per_second": round(args.submissions / elapsed),
+        "us_per_grade": round(elapsed / args.submissions * 1e6, 3),
+        "passed": passed,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Per-request cost of the auth rate limiter.
+
+Runs the ``rate_limit("login")`` dependency directly (no server) on a login
+body, against the in-process fallback and, when ``REDIS_URL`` is set, against
+Redis (one EVALSHA round-trip per check). Three cases are measured:
+
+* allowed:  a new IP and email each time, so every check passes and counts;
+* rejected: one IP/email over its limit, which is the cost of shedding an attack;
+* baseline: parsing the body and resolving the client IP without the limiter.
+
+    REDIS_URL=redis://localhost:6379/15 python benchmarks/bench_rate_limit.py --checks 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from starlette.requests import Request
+
+from benchmarks.loadgen import percentile
+
+
+def make_request(ip: str, email: str) -> Request:
+    body = f'{{"email": "{email}", "password": "correct horse battery staple"}}'.encode()
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/auth/login",
+        "headers": [(b"content-type", b"application/json"), (b"x-real-ip", ip.encode())],
+        "client": ("127.0.0.1", 50000),
+    }
+    return Request(scope, receive)
+
+
+async def time_checks(check, requests: list[Request]) -> list[float]:
+    latencies = []
+    for request in requests:
+        started = time.perf_counter()
+        try:
+            await check(request)
+        except Exception as e:
+            if getattr(e, "status_code", None) != 429:
+                raise
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def report(name: str, latencies: list[float]):
+    us = [x * 1e6 for x in latencies]
+    print(f"{name:<18} mean {sum(us) / len(us):8.1f} us   p50 {percentile(us, 50):8.1f} us   p99 {percentile(us, 99):8.1f} us")
+
+
+async def main(checks: int):
+    from app.core import rate_limit
+    from app.core.rate_limit import client_ip, _request_email
+
+    async def baseline(request: Request):
+        client_ip(request)
+        await _request_email(request)
+
+    report("baseline", await time_checks(baseline, [make_request(f"10.0.{i // 250}.{i % 250}", f"u{i}@bench.test") for i in range(checks)]))
+
+    backends = [("local", lambda: None)]
+    if os.getenv("REDIS_URL"):
+        backends.append(("redis", rate_limit.get_async_redis))
+    run_id = int(time.time())
+    for name, factory in backends:
+        rate_limit.rate_limiter = rate_limit.RateLimiter(prefix=f"bench-rl:{run_id}:{name}", local_size=checks * 4, redis_factory=factory)
+        dependency = rate_limit.rate_limit("login")
+        allowed = [make_request(f"10.1.{i // 250}.{i % 250}", f"u{i}@bench.test") for i in range(checks)]
+        report(f"{name} allowed", await time_checks(dependency, allowed))
+        attacker = [make_request("10.2.0.1", "victim@bench.test") for _ in range(checks)]
+        report(f"{name} rejected", await time_checks(dependency, attacker))
+    decisions = rate_limit.rate_limit_decisions
+    print(f"decisions: {decisions.value(('login', 'allowed')):.0f} allowed, {decisions.value(('login', 'rejected')):.0f} rejected")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checks", type=int, default=20_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.checks))
@@ -0,0 +1,149 @@
+"""Read/write splitting check and load test with a stand-in replica.
+
+By default the primary and the "replica" are SQLite files; the replica is a
+copy of the primary taken after seeding, so it never sees later writes (an
+extreme form of replication lag). Against that setup the script checks:
+
+* reads of a user who just wrote go to the primary and see the write;
+* reads of other users, and of the writer once DB_READ_YOUR_WRITES_SECONDS has
+  passed, go to the replica (which doesn't have the write);
+* under --duration seconds of /feed load, the share of reads served by the
+  replica (``db_read_routes_total`` from /metrics) and the latency.
+
+    python benchmarks/bench_replicas.py
+    BENCH_DATABASE_URL=postgresql://.../primary BENCH_REPLICA_URL=postgresql://.../standby \\
+        python benchmarks/bench_replicas.py
+
+With real Postgres replication the "stale after window" check is expected to
+report the write (the standby caught up).
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+from sqlalchemy import create_engine
+
+from app.core.security import create_access_token
+from benchmarks.loadgen import BACKEND_DIR, run_load, serve
+from benchmarks.seed import seed
+
+PRIMARY_FILE = "bench_primary.db"
+REPLICA_FILE = "bench_replica.db"
+STICKY_SECONDS = 2.0
+
+
+def read_routes(base_url: str) -> dict:
+    routes = {}
+    for line in httpx.get(f"{base_url}/metrics", timeout=10).text.splitlines():
+        if line.startswith("db_read_routes_total{"):
+            target = line.split('target="', 1)[1].split('"', 1)[0]
+            routes[target] = float(line.split()[-1])
+        elif line.startswith("db_replica_up{"):
+            routes["replica_up"] = float(line.split()[-1])
+    return routes
+
+
+def wait_for_replica(base_url: str, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if read_routes(base_url).get("replica_up") == 1:
+            return
+        time.sleep(0.2)
+    raise RuntimeError("replica never passed its health check")
+
+
+def completed(client: httpx.Client, token: str, lesson_id: int) -> bool:
+    response = client.get("/progress", headers={"Authorization": f"Bearer {token}"})
+    response.raise_for_status()
+    return any(p["lesson_id"] == lesson_id and p["completed"] for p in response.json()["progress"])
+
+
+def check_read_your_writes(base_url: str, lessons: int) -> dict:
+    writer, other = create_access_token(user_id=1, role="user"), create_access_token(user_id=2, role="user")
+    lesson_id = lessons  # seeded progress covers the first lessons only
+    with httpx.Client(base_url=base_url, timeout=10) as client:
+        before = read_routes(base_url)
+        client.post(
+            "/progress/events",
+            json={"events": [{"lesson_id": lesson_id, "completed": True}]},
+            headers={"Authorization": f"Bearer {writer}"},
+        ).raise_for_status()
+        result = {"writer_sees_write": completed(client, writer, lesson_id)}
+        completed(client, other, lesson_id)
+        after = read_routes(base_url)
+        time.sleep(STICKY_SECONDS + 0.5)
+        result["writer_sees_write_after_window"] = completed(client, writer, lesson_id)
+        done = read_routes(base_url)
+
+    def delta(a, b, key):
+        return int(b.get(key, 0) - a.get(key, 0))
+
+    result.update({
+        "sticky_reads": delta(before, after, "primary_sticky"),
+        "replica_reads": delta(before, after, "replica"),
+        "replica_reads_after_window": delta(after, done, "replica"),
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--lessons", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    primary = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{PRIMARY_FILE}")
+    replica = os.getenv("BENCH_REPLICA_URL")
+    seed(create_engine(primary), args.users, args.lessons, progress_per_user=10, admins=0, with_passwords=False)
+    if replica is None:
+        if not primary.startswith("sqlite:///"):
+            sys.exit("Set BENCH_REPLICA_URL when BENCH_DATABASE_URL isn't a SQLite file")
+        shutil.copyfile(BACKEND_DIR / primary[len("sqlite:///"):], BACKEND_DIR / REPLICA_FILE)
+        replica = f"sqlite:///{REPLICA_FILE}"
+
+    env = {
+        "DATABASE_URL": primary,
+        "ASYNC_DATABASE_URL": "",
+        "DATABASE_REPLICA_URLS": replica,
+        "DB_REPLICA_CHECK_INTERVAL": "0.5",
+        "DB_READ_YOUR_WRITES_SECONDS": str(STICKY_SECONDS),
+        "PROGRESS_DURABILITY": "sync",
+        "RATE_LIMIT_ENABLED": "false",
+        "REDIS_URL": os.getenv("REDIS_URL", ""),
+    }
+    with serve("app.main:app", env=env) as base_url:
+        wait_for_replica(base_url)
+        result = {"read_your_writes": check_read_your_writes(base_url, args.lessons)}
+        before = read_routes(base_url)
+        result["feed_load"] = asyncio.run(run_load(
+            base_url, [("GET", "/feed", {"params": {"limit": 20}})],
+            concurrency=args.concurrency, duration=args.duration,
+        ))["total"]
+        after = read_routes(base_url)
+        reads = {k: int(after.get(k, 0) - before.get(k, 0)) for k in ("replica", "primary_sticky", "primary_fallback")}
+        result["feed_load"]["routes"] = reads
+    print(json.dumps(result, indent=2))
+
+    rw = result["read_your_writes"]
+    problems = []
+    if not rw["writer_sees_write"] or not rw["sticky_reads"]:
+        problems.append("the writer's read did not go to the primary")
+    if not rw["replica_reads"] or not rw["replica_reads_after_window"]:
+        problems.append("reads did not go to the replica")
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
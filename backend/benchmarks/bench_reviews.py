@@ -0,0 +1,172 @@
+"""Spaced-repetition due queue and batch scheduler.
+
+Seeds --users x --cards-per-user review cards with due dates spread over 90
+days (a third of them overdue), then:
+
+* plan: EXPLAIN of "next 20 due reviews" for one user. Fails unless it is a
+  range scan on ix_review_cards_user_due with no sort step; on Postgres it also
+  reports the pages the query touched (EXPLAIN ANALYZE BUFFERS), which should
+  stay in single digits whatever the table size;
+* reads: latency of that query for --reads random users;
+* scheduler: --batches batches of --batch-size graded reviews applied with
+  ``ReviewScheduler.apply`` and committed, as results per second.
+
+    python benchmarks/bench_reviews.py
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_reviews.py --users 1000000 --cards-per-user 100
+
+On Postgres the cards are generated server-side (INSERT ... SELECT
+generate_series), so the 100M-row case takes minutes rather than hours.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models.review_card import ReviewCard
+from app.services.review_service import ReviewScheduler
+from benchmarks.loadgen import percentile
+from benchmarks.seed import seed
+
+SPREAD_MINUTES = 90 * 24 * 60
+OVERDUE_MINUTES = 30 * 24 * 60
+
+# Per user, lessons (user * 7919 + k) % lessons + 1 for k < cards-per-user: distinct while cards <= lessons
+POSTGRES_CARDS = text("""
+    INSERT INTO review_cards (user_id, lesson_id, ease, interval_days, repetitions, lapses, due_at)
+    SELECT u, (u * 7919 + k) % :lessons + 1, 2.5, 1, 0, 0,
+           (now() AT TIME ZONE 'utc') + ((u * 31 + k * 17) % :spread - :overdue) * interval '1 minute'
+    FROM generate_series(:first, :last) AS u, generate_series(0, :cards - 1) AS k
+""")
+
+
+def seed_cards(engine, users: int, lessons: int, cards: int, batch_users: int = 10_000):
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for first in range(1, users + 1, batch_users):
+            last = min(first + batch_users - 1, users)
+            if engine.dialect.name == "postgresql":
+                conn.execute(POSTGRES_CARDS, {
+                    "first": first, "last": last, "lessons": lessons, "cards": cards,
+                    "spread": SPREAD_MINUTES, "overdue": OVERDUE_MINUTES,
+                })
+                continue
+            conn.execute(insert(ReviewCard), [
+                {
+                    "user_id": u, "lesson_id": (u * 7919 + k) % lessons + 1, "ease": 2.5, "interval_days": 1.0,
+                    "repetitions": 0, "lapses": 0,
+                    "due_at": now + timedelta(minutes=(u * 31 + k * 17) % SPREAD_MINUTES - OVERDUE_MINUTES),
+                }
+                for u in range(first, last + 1)
+                for k in range(cards)
+            ])
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM ANALYZE review_cards"))
+
+
+def explain(engine, query) -> dict:
+    compiled = query.compile(engine)
+    if compiled.positiontup is not None:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            plan = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {compiled}", params).scalar()[0]
+            nodes, stack = [], [plan["Plan"]]
+            while stack:
+                node = stack.pop()
+                nodes.append(node)
+                stack.extend(node.get("Plans", []))
+            scan = next((n for n in nodes if n.get("Index Name") == "ix_review_cards_user_due"), None)
+            return {
+                "uses_due_index": scan is not None,
+                "sorts": any(n["Node Type"] in ("Sort", "Incremental Sort") for n in nodes),
+                "scan": scan and scan["Node Type"],
+                "pages": plan["Plan"].get("Shared Hit Blocks", 0) + plan["Plan"].get("Shared Read Blocks", 0),
+                "execution_ms": plan["Execution Time"],
+            }
+        rows = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)]
+        return {
+            "uses_due_index": any("ix_review_cards_user_due" in row for row in rows),
+            "sorts": any("TEMP B-TREE" in row for row in rows),
+            "plan": rows,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--lessons", type=int, default=5_000)
+    parser.add_argument("--cards-per-user", type=int, default=50)
+    parser.add_argument("--reads", type=int, default=5_000)
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+    if args.cards_per_user > args.lessons:
+        sys.exit("--cards-per-user can't exceed --lessons")
+
+    url = os.getenv("BENCH_DATABASE_URL", "sqlite:///bench_reviews.db")
+    engine = create_engine(url)
+    Session = sessionmaker(bind=engine)
+    scheduler = ReviewScheduler()
+
+    if not args.skip_seed:
+        started = time.perf_counter()
+        seed(engine, args.users, args.lessons, progress_per_user=0, admins=0, with_passwords=False)
+        seed_cards(engine, args.users, args.lessons, args.cards_per_user)
+        print(f"seeded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    now = datetime.utcnow()
+    plan = explain(engine, scheduler.due_query(args.users // 2, now, limit=20))
+
+    rng = random.Random(7)
+    latencies = []
+    with Session() as db:
+        for _ in range(args.reads):
+            started = time.perf_counter()
+            db.execute(scheduler.due_query(rng.randint(1, args.users), now, limit=20)).all()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    # Each result reviews one of the user's seeded cards (k < cards-per-user), with the
+    # grade mix of a typical session
+    applied, elapsed = 0, 0.0
+    with Session() as db:
+        for _ in range(args.batches):
+            results = []
+            for _ in range(args.batch_size):
+                user_id = rng.randint(1, args.users)
+                lesson_id = (user_id * 7919 + rng.randrange(args.cards_per_user)) % args.lessons + 1
+                results.append((user_id, lesson_id, rng.choice((1, 3, 4, 4, 4, 5)), datetime.utcnow()))
+            started = time.perf_counter()
+            applied += len(scheduler.apply(db, results))
+            db.commit()
+            elapsed += time.perf_counter() - started
+
+    print(json.dumps({
+        "database": engine.url.get_backend_name(),
+        "cards": args.users * args.cards_per_user,
+        "plan": plan,
+        "due_p50_ms": round(statistics.median(latencies), 3),
+        "due_p99_ms": round(percentile(latencies, 99), 3),
+        "scheduler_results_per_second": round(args.batches * args.batch_size / elapsed),
+        "cards_updated": applied,
+    }, indent=2))
+    if not plan["uses_due_index"] or plan["sorts"]:
+        print("FAIL: due query is not a sort-free range scan on ix_review_cards_user_due")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
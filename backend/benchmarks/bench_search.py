@@ -0,0 +1,159 @@
+"""Benchmark /lessons/search queries against a large Postgres catalog.
+
+The database must be migrated (``alembic upgrade head``) so the search vector
+and GIN indexes exist. ``--seed`` TRUNCATES lessons (cascading to feed items,
+progress and quizzes) and COPYs in a synthetic catalog first:
+
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_search.py --seed --lessons 1000000
+
+Queries mix common/rare words, multi-word queries, prefixes (typing) and title
+typos. Latency is measured through ``SearchService.search`` on the async engine,
+i.e. what the endpoint pays on a cache miss. Target: p95 < 50 ms.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.session import async_database_url
+from app.services.personalization_service import LESSON_TYPES
+from app.services.search_service import SearchService
+from benchmarks.loadgen import percentile
+
+TARGET_P95_MS = 50.0
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "shi", "po", "va", "de", "zu", "an", "el", "or", "is", "ut"]
+
+
+def vocabulary(size: int, rng: random.Random) -> list[str]:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def zipf_word(words: list[str], rng: random.Random) -> str:
+    # Heavy-tailed: a few very common words, a long tail of rare ones
+    return words[min(len(words) - 1, int(rng.paretovariate(1.1)) - 1)]
+
+
+def seed(url: str, lessons: int, words: list[str], batch: int = 100_000):
+    rng = random.Random(42)
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("TRUNCATE lessons RESTART IDENTITY CASCADE"))
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for start in range(0, lessons, batch):
+            buf = io.StringIO()
+            for _ in range(min(batch, lessons - start)):
+                title = " ".join(zipf_word(words, rng) for _ in range(rng.randint(3, 6))).capitalize()
+                content = " ".join(zipf_word(words, rng) for _ in range(rng.randint(50, 300)))
+                buf.write(f"{title}\t{content}\t{rng.choice(LESSON_TYPES)}\n")
+            buf.seek(0)
+            cursor.copy_expert("COPY lessons (title, content, type) FROM STDIN", buf)
+            raw.commit()
+            print(f"\r{start + batch} lessons", end="", file=sys.stderr)
+        print(file=sys.stderr)
+        cursor.execute("ANALYZE lessons")
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def make_queries(words: list[str], count: int, rng: random.Random) -> list[tuple[str, str]]:
+    queries = []
+    for _ in range(count):
+        kind = rng.choices(["common", "rare", "multi", "prefix", "typo"], weights=[30, 20, 20, 20, 10])[0]
+        if kind == "common":
+            q = words[rng.randint(0, 20)] + " "
+        elif kind == "rare":
+            q = rng.choice(words) + " "
+        elif kind == "multi":
+            q = " ".join(zipf_word(words, rng) for _ in range(2)) + " "
+        elif kind == "prefix":
+            word = zipf_word(words, rng)
+            q = word[:max(3, len(word) - 2)]
+        else:
+            word = list(" ".join(zipf_word(words, rng) for _ in range(3)))
+            i = rng.randrange(len(word) - 1)
+            word[i], word[i + 1] = word[i + 1], word[i]
+            q = "".join(word) + " "
+        queries.append((kind, q))
+    return queries
+
+
+async def run(url: str, queries: list[tuple[str, str]], limit: int, pages: int) -> dict:
+    engine = create_async_engine(async_database_url(url))
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    service = SearchService()
+    by_kind: dict[str, list[float]] = {}
+    async with Session() as db:
+        # Warm up plans and buffers
+        for _, q in queries[:20]:
+            await service.search(db, q, limit)
+        for kind, q in queries:
+            after = None
+            for _ in range(pages):
+                started = time.perf_counter()
+                result = await service.search(db, q, limit, after)
+                by_kind.setdefault(kind, []).append((time.perf_counter() - started) * 1000)
+                after = result["next_key"]
+                if after is None:
+                    break
+    await engine.dispose()
+
+    def stats(ms):
+        return {
+            "queries": len(ms),
+            "p50_ms": round(statistics.median(ms), 2),
+            "p95_ms": round(percentile(ms, 95), 2),
+            "p99_ms": round(percentile(ms, 99), 2),
+        }
+
+    overall = stats([x for ms in by_kind.values() for x in ms])
+    return {
+        "overall": overall,
+        "by_kind": {kind: stats(ms) for kind, ms in sorted(by_kind.items())},
+        "target_p95_ms": TARGET_P95_MS,
+        "pass": overall["p95_ms"] < TARGET_P95_MS,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", action="store_true", help="TRUNCATE lessons and load a synthetic catalog")
+    parser.add_argument("--lessons", type=int, default=1_000_000)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=1, help="Follow next_cursor this many pages per query")
+    args = parser.parse_args()
+
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url or not url.startswith("postgresql"):
+        sys.exit("BENCH_DATABASE_URL must point at a migrated Postgres database")
+    words = vocabulary(args.vocabulary, random.Random(7))
+    if args.seed:
+        started = time.perf_counter()
+        seed(url, args.lessons, words)
+        print(f"seeded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    queries = make_queries(words, args.queries, random.Random(11))
+    result = asyncio.run(run(url, queries, args.limit, args.pages))
+    print(json.dumps({"lessons": args.lessons, **result}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Serialization cost per 1k feed items, before/after the fast JSON path.
+
+* ``orm_jsonable_encoder`` - FeedItem ORM objects walked by ``jsonable_encoder``
+  then ``json.dumps`` (the original /feed)
+* ``dict_jsonable_encoder`` - plain dicts through ``jsonable_encoder`` + ``json.dumps``
+* ``dict_orjson`` - column rows -> dicts -> ``app.core.serialization.dumps`` (current)
+* ``pydantic_dump_json`` - the ``FeedPage`` response model's compiled serializer
+
+Also reports compressed size/time for the resulting body. No database needed.
+
+    python benchmarks/bench_serialization.py --items 1000
+"""
+import argparse
+import gzip
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+
+from app.api.feed import FeedPage
+from app.core.serialization import dumps
+from app.models.feed_item import FeedItem
+from app.models.lesson import Lesson, make_excerpt
+
+
+def make_rows(count: int) -> list[tuple]:
+    rng = random.Random(1)
+    base = datetime(2026, 1, 1)
+    return [
+        (i, i, i, "lesson", base + timedelta(minutes=i), f"Lesson {i}",
+         make_excerpt("Lorem ipsum dolor sit amet. " * rng.randint(5, 40)), rng.choice(["text", "quiz", "audio"]))
+        for i in range(1, count + 1)
+    ]
+
+
+def rows_to_page(rows) -> dict:
+    return {
+        "items": [
+            {
+                "id": item_id,
+                "lesson_id": lesson_id,
+                "order": order,
+                "content_type": content_type,
+                "created_at": created_at,
+                "lesson": {"id": lesson_id, "title": title, "excerpt": excerpt, "type": lesson_type},
+            }
+            for item_id, lesson_id, order, content_type, created_at, title, excerpt, lesson_type in rows
+        ],
+        "next_cursor": None,
+    }
+
+
+def rows_to_orm(rows) -> list[FeedItem]:
+    items = []
+    for item_id, lesson_id, order, content_type, created_at, title, excerpt, lesson_type in rows:
+        item = FeedItem(id=item_id, lesson_id=lesson_id, order=order, content_type=content_type, created_at=created_at)
+        item.lesson = Lesson(id=lesson_id, title=title, excerpt=excerpt, type=lesson_type)
+        items.append(item)
+    return items
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = make_rows(args.items)
+    orm_items = rows_to_orm(rows)
+    page_model = FeedPage.model_validate(rows_to_page(rows))
+
+    cases = {
+        "orm_jsonable_encoder": lambda: json.dumps(jsonable_encoder(orm_items)).encode(),
+        "dict_jsonable_encoder": lambda: json.dumps(jsonable_encoder(rows_to_page(rows)), separators=(",", ":")).encode(),
+        "dict_orjson": lambda: dumps(rows_to_page(rows)),
+        "pydantic_dump_json": lambda: page_model.model_dump_json().encode(),
+    }
+    per_1k = 1000 / args.items
+    result = {"items": args.items, "ms_per_1k_items": {}}
+    for name, fn in cases.items():
+        result["ms_per_1k_items"][name] = round(best_of(fn, args.repeat) * 1000 * per_1k, 3)
+    baseline = result["ms_per_1k_items"]["orm_jsonable_encoder"]
+    result["speedup_vs_orm"] = {
+        name: round(baseline / ms, 1) for name, ms in result["ms_per_1k_items"].items() if ms
+    }
+
+    body = dumps(rows_to_page(rows))
+    compression = {"identity": {"bytes": len(body)}}
+    compression["gzip_5"] = {
+        "bytes": len(gzip.compress(body, compresslevel=5)),
+        "ms": round(best_of(lambda: gzip.compress(body, compresslevel=5), 5) * 1000, 3),
+    }
+    try:
+        import brotli
+
+        compression["br_4"] = {
+            "bytes": len(brotli.compress(body, quality=4)),
+            "ms": round(best_of(lambda: brotli.compress(body, quality=4), 5) * 1000, 3),
+        }
+    except ImportError:
+        pass
+    result["compression"] = compression
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Similar-lessons index: build time, top-10 latency and IVF recall on one core.
+
+Generates --lessons lessons whose words come from --topics topic vocabularies
+(so there is real neighbour structure), builds the index with
+``LessonIndex.build`` and the hashing encoder, then times top-10 queries for
+random lessons:
+
+* exact: every row scored;
+* IVF at each --nprobe, with recall@10 against the exact results.
+
+Both report the share of results about the query lesson's main topic, which is
+what a reader of "similar lessons" cares about; recall@10 understates IVF when
+many lessons tie for the exact top 10.
+
+BLAS is limited to one thread, so the numbers are per core. The target is a
+p50 under 10 ms for top-10 over 1M lessons:
+
+    python benchmarks/bench_similar.py --lessons 1000000
+
+The index is written to bench_vector_index/ and the lessons to a SQLite file.
+"""
+import os
+
+# Before numpy loads: one BLAS thread, and this benchmark's own index directory
+for var in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(var, "1")
+os.environ.setdefault("VECTOR_INDEX_DIR", "bench_vector_index")
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.base import Base
+from app.models.lesson import Lesson, make_excerpt
+from app.services.similarity_service import LessonIndex
+from benchmarks.loadgen import percentile
+
+WORDS_PER_TOPIC = 50
+
+
+def seed_lessons(engine, lessons: int, topics: int, batch: int = 20_000) -> dict[int, int]:
+    """Lessons mixing words from a main topic (70%), a second topic and common filler; returns each one's main topic."""
+    rng = random.Random(42)
+    vocab = [[f"t{t}w{w}" for w in range(WORDS_PER_TOPIC)] for t in range(topics)]
+    filler = [f"common{w}" for w in range(500)]
+    Base.metadata.drop_all(engine, tables=[Lesson.__table__])
+    Base.metadata.create_all(engine, tables=[Lesson.__table__])
+    main_topic = {}
+    with engine.begin() as conn:
+        for start in range(1, lessons + 1, batch):
+            rows = []
+            for i in range(start, min(start + batch, lessons + 1)):
+                main, other = rng.randrange(topics), rng.randrange(topics)
+                main_topic[i] = main
+                words = [
+                    rng.choice(vocab[main] if r < 0.7 else vocab[other] if r < 0.85 else filler)
+                    for r in (rng.random() for _ in range(rng.randint(40, 120)))
+                ]
+                content = " ".join(words)
+                rows.append({
+                    "id": i,
+                    "title": " ".join(rng.sample(vocab[main], 4)),
+                    "content": content,
+                    "excerpt": make_excerpt(content),
+                    "type": "text",
+                })
+            conn.execute(insert(Lesson), rows)
+    return main_topic
+
+
+def time_queries(snapshot, queries, nprobe: int) -> tuple[list[float], list[list[int]]]:
+    latencies, results = [], []
+    for row, lesson_id in queries:
+        started = time.perf_counter()
+        query = snapshot.vectors[row].astype("float32")
+        found = snapshot.search(query, 10, exclude=lesson_id, nprobe=nprobe)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append([match for match, _ in found])
+    return latencies, results
+
+
+def summary(latencies: list[float], queries, results, main_topic: dict[int, int] | None) -> dict:
+    out = {
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+    if main_topic:
+        # Share of results about the query lesson's main topic
+        out["same_topic_at_10"] = round(statistics.mean(
+            sum(main_topic[m] == main_topic[lesson_id] for m in found) / max(1, len(found))
+            for (_, lesson_id), found in zip(queries, results)
+        ), 3)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lessons", type=int, default=200_000)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32, 64])
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    engine = create_engine(os.getenv("BENCH_DATABASE_URL", "sqlite:///bench_similar.db"))
+    index = LessonIndex()
+    result = {"lessons": args.lessons, "dim": index.dim, "dtype": index.dtype.name}
+    main_topic = None
+    if not args.skip_seed:
+        started = time.perf_counter()
+        main_topic = seed_lessons(engine, args.lessons, args.topics)
+        print(f"seeded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        with Session(engine) as db:
+            result["build"] = index.build(db)
+    snapshot = index.snapshot()
+    if snapshot is None:
+        sys.exit(f"No index in {settings.VECTOR_INDEX_DIR}; run without --skip-seed")
+    result["vectors_mb"] = round(snapshot.vectors[:snapshot.count].nbytes / 1e6, 1)
+    result["lists"] = 0 if snapshot.centroids is None else len(snapshot.centroids)
+
+    rng = random.Random(7)
+    rows = rng.sample(range(snapshot.count), min(args.queries, snapshot.count))
+    queries = [(row, int(snapshot.ids[row])) for row in rows]
+    exact_latencies, exact = time_queries(snapshot, queries, nprobe=sys.maxsize)
+    result["exact"] = summary(exact_latencies, queries, exact, main_topic)
+    if snapshot.centroids is not None:
+        result["ivf"] = {}
+        for nprobe in args.nprobe:
+            latencies, found = time_queries(snapshot, queries, nprobe)
+            recall = statistics.mean(
+                len(set(f) & set(e)) / len(e) for f, e in zip(found, exact) if e
+            )
+            result["ivf"][nprobe] = {**summary(latencies, queries, found, main_topic), "recall_at_10": round(recall, 3)}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Measure the cost of importing the application.
+
+Runs ``python -X importtime -c "import app.main"`` in fresh interpreters and
+reports the median wall time plus the modules with the largest cumulative
+import time, e.g. to confirm authlib/jose/passlib are no longer loaded eagerly.
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+LAZY_PACKAGES = ("authlib", "jose", "passlib")
+
+
+def import_once(module: str) -> tuple[float, list[tuple[str, int]]]:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    elapsed = time.perf_counter() - started
+    modules = []
+    for line in proc.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules.append((name.strip(), int(cumulative)))
+    return elapsed, modules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    walls, last = [], []
+    for _ in range(args.runs):
+        elapsed, last = import_once(args.module)
+        walls.append(elapsed)
+
+    top_level = {}
+    for name, cumulative in last:
+        root = name.split(".")[0]
+        if name == root:
+            top_level[root] = max(top_level.get(root, 0), cumulative)
+    print(json.dumps({
+        "module": args.module,
+        "runs": args.runs,
+        "wall_median_ms": round(statistics.median(walls) * 1000, 1),
+        "lazy_packages_imported": sorted(p for p in LAZY_PACKAGES if p in top_level),
+        "top_packages_ms": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(top_level.items(), key=lambda kv: -kv[1])[:args.top]
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark per-user feed materialization.
+
+Seeds users/lessons/feed items/progress, runs a full chunked rebuild and then
+measures read latency of the materialized feed.
+
+    python benchmarks/bench_user_feed.py --users 100000 --lessons 10000
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_user_feed.py
+
+Defaults to a local SQLite file so it runs without Postgres.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.services.feed_service import FeedService
+from app.services.personalization_service import PersonalizationService
+from benchmarks.seed import seed
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--lessons", type=int, default=10_000)
+    parser.add_argument("--progress-per-user", type=int, default=20)
+    parser.add_argument("--feed-size", type=int, default=100)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--reads", type=int, default=10_000)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    url = os.getenv("BENCH_DATABASE_URL", "sqlite:///bench_user_feed.db")
+    engine = create_engine(url)
+    Session = sessionmaker(bind=engine)
+
+    if not args.skip_seed:
+        started = time.perf_counter()
+        seed(engine, args.users, args.lessons, args.progress_per_user, admins=0, with_passwords=False)
+        print(f"seeded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    service = PersonalizationService(feed_size=args.feed_size, chunk_size=args.chunk_size)
+    with Session() as db:
+        stats = service.rebuild_all(
+            db,
+            progress=lambda users, rows: print(f"\r{users} users, {rows} rows", end="", file=sys.stderr),
+        )
+    print(file=sys.stderr)
+
+    reader = FeedService()
+    rng = random.Random(7)
+    latencies = []
+    with Session() as db:
+        for _ in range(args.reads):
+            user_id = rng.randint(1, args.users)
+            started = time.perf_counter()
+            db.execute(reader.user_feed_query(user_id, limit=20)).all()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    print(json.dumps({
+        "database": engine.url.get_backend_name(),
+        "users": args.users,
+        "lessons": args.lessons,
+        "rebuild_seconds": round(stats["seconds"], 2),
+        "rebuild_users_per_second": round(stats["users"] / stats["seconds"], 1),
+        "rows_written": stats["rows"],
+        "read_p50_ms": round(statistics.median(latencies), 3),
+        "read_p99_ms": round(percentile(latencies, 99), 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
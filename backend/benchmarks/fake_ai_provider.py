@@ -0,0 +1,58 @@
+"""Local stand-in for an OpenAI-compatible provider.
+
+    uvicorn benchmarks.fake_ai_provider:app --port 9100
+    AI_PROVIDERS='{"fake": {"base_url": "http://127.0.0.1:9100", "http2": false}}'
+
+Responses are deterministic (derived from the prompt), latency is configurable
+with FAKE_AI_LATENCY_MS, and FAKE_AI_ERROR_RATE injects 503s to exercise retries.
+/stats reports how many completions actually reached the "upstream".
+"""
+import asyncio
+import hashlib
+import os
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI()
+
+LATENCY = float(os.getenv("FAKE_AI_LATENCY_MS", "200")) / 1000
+ERROR_RATE = float(os.getenv("FAKE_AI_ERROR_RATE", "0"))
+stats = {"completions": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if random.random() < ERROR_RATE:
+        stats["errors"] += 1
+        return JSONResponse({"error": "overloaded"}, status_code=503, headers={"Retry-After": "0.1"})
+
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+    try:
+        await asyncio.sleep(LATENCY)
+    finally:
+        stats["in_flight"] -= 1
+    stats["completions"] += 1
+
+    prompt = " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+    digest = hashlib.sha256(f"{body.get('model')}:{prompt}".encode()).hexdigest()[:16]
+    prompt_tokens = max(1, len(prompt.split()))
+    return {
+        "id": f"fake-{digest}",
+        "model": body.get("model"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": f"answer-{digest}"}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 8, "total_tokens": prompt_tokens + 8},
+    }
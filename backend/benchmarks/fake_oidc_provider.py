@@ -0,0 +1,148 @@
+"""Local stand-in for an OpenID Connect identity provider (Google-style).
+
+    uvicorn benchmarks.fake_oidc_provider:app --port 9200
+    GOOGLE_CLIENT_ID=bench GOOGLE_CLIENT_SECRET=bench \
+    GOOGLE_DISCOVERY_URL=http://127.0.0.1:9200/.well-known/openid-configuration
+
+/authorize redirects straight back with a code (no login page); the user is
+picked with ``login_hint=<n>`` (random in 1..FAKE_OIDC_USERS otherwise) and
+gets ``sub=bench-<n>`` and the seeded ``benchmarks.seed.user_email(n)``. /token
+returns an RS256 ID token signed with a key generated at startup; POST /rotate
+switches to a new key to exercise JWKS refresh. FAKE_OIDC_LATENCY_MS delays
+every response. /stats counts requests per endpoint, so a run can confirm
+discovery and JWKS were fetched once per worker rather than per login.
+"""
+import asyncio
+import os
+import random
+import secrets
+import time
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import RedirectResponse
+from urllib.parse import parse_qs, urlencode
+
+from benchmarks.seed import user_email
+
+app = FastAPI()
+
+LATENCY = float(os.getenv("FAKE_OIDC_LATENCY_MS", "50")) / 1000
+USERS = int(os.getenv("FAKE_OIDC_USERS", "1000"))
+CODE_TTL = 60
+stats = {"discovery": 0, "jwks": 0, "authorize": 0, "token": 0, "rotations": 0}
+# code -> (claims, expires_at)
+codes: dict[str, tuple[dict, float]] = {}
+keys: list[tuple[str, str, dict]] = []  # (kid, private PEM, public JWK); newest last
+
+
+def new_key():
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from jose import jwk
+
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public_pem = private.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    kid = secrets.token_hex(8)
+    public = {**jwk.construct(public_pem, "RS256").to_dict(), "kid": kid, "use": "sig"}
+    keys.append((kid, pem, public))
+    # Publish the previous key too, as real providers do during rotation
+    del keys[:-2]
+
+
+new_key()
+
+
+def issuer(request: Request) -> str:
+    return str(request.base_url).rstrip("/")
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
+
+
+@app.get("/.well-known/openid-configuration")
+async def discovery(request: Request):
+    stats["discovery"] += 1
+    await asyncio.sleep(LATENCY)
+    base = issuer(request)
+    return {
+        "issuer": base,
+        "authorization_endpoint": f"{base}/authorize",
+        "token_endpoint": f"{base}/token",
+        "jwks_uri": f"{base}/jwks",
+        "response_types_supported": ["code"],
+        "subject_types_supported": ["public"],
+        "id_token_signing_alg_values_supported": ["RS256"],
+    }
+
+
+@app.get("/jwks")
+async def jwks():
+    stats["jwks"] += 1
+    await asyncio.sleep(LATENCY)
+    return {"keys": [public for _, _, public in keys]}
+
+
+@app.post("/rotate")
+def rotate():
+    stats["rotations"] += 1
+    new_key()
+    return {"kid": keys[-1][0]}
+
+
+@app.get("/authorize")
+def authorize(
+    request: Request,
+    client_id: str,
+    redirect_uri: str,
+    state: str,
+    nonce: str | None = None,
+    login_hint: str | None = None,
+):
+    stats["authorize"] += 1
+    n = int(login_hint) if login_hint else random.randint(1, USERS)
+    code = secrets.token_urlsafe(16)
+    codes[code] = ({
+        "iss": issuer(request),
+        "aud": client_id,
+        "sub": f"bench-{n}",
+        "email": user_email(n),
+        "email_verified": True,
+        "nonce": nonce,
+    }, time.time() + CODE_TTL)
+    return RedirectResponse(f"{redirect_uri}?{urlencode({'code': code, 'state': state})}")
+
+
+@app.post("/token")
+async def token(request: Request):
+    from jose import jwt
+
+    stats["token"] += 1
+    await asyncio.sleep(LATENCY)
+    # Parsed by hand: Form() would need python-multipart just for this stub
+    form = {k: v[0] for k, v in parse_qs((await request.body()).decode()).items()}
+    claims, expires_at = codes.pop(form.get("code", ""), (None, 0))
+    if claims is None or expires_at < time.time() or claims["aud"] != form.get("client_id"):
+        raise HTTPException(status_code=400, detail={"error": "invalid_grant"})
+    now = int(time.time())
+    access_token = secrets.token_urlsafe(32)
+    kid, pem, _ = keys[-1]
+    id_token = jwt.encode(
+        {**claims, "iat": now, "exp": now + 3600},
+        pem,
+        algorithm="RS256",
+        headers={"kid": kid},
+        access_token=access_token,
+    )
+    return {"access_token": access_token, "id_token": id_token, "token_type": "Bearer", "expires_in": 3600}
@@ -0,0 +1,109 @@
+"""Minimal HTTP load generator and server launcher shared by the benchmarks."""
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    ms = [x * 1000 for x in latencies]
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "rps": round(len(ms) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(statistics.median(ms), 2) if ms else 0.0,
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+    }
+
+
+async def run_load(
+    base_url: str,
+    requests: list[tuple[str, str, dict]],
+    concurrency: int = 50,
+    duration: float = 10.0,
+    weights: list[float] | None = None,
+) -> dict:
+    """Drive ``requests`` ((method, path, kwargs) tuples) for ``duration`` seconds.
+
+    Each of ``concurrency`` virtual users picks a request (by ``weights``) in a
+    closed loop. Returns per-path and overall latency summaries.
+    """
+    rng = random.Random(1)
+    per_path = {path: [] for _, path, _ in requests}
+    errors = {path: 0 for _, path, _ in requests}
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        async def user():
+            while time.perf_counter() < deadline:
+                method, path, kwargs = rng.choices(requests, weights=weights)[0]
+                started = time.perf_counter()
+                try:
+                    resp = await client.request(method, path, **kwargs)
+                    ok = resp.status_code < 500
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    per_path[path].append(time.perf_counter() - started)
+                else:
+                    errors[path] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    result = {path: summarize(lat, errors[path], elapsed) for path, lat in per_path.items()}
+    result["total"] = summarize(
+        [x for lat in per_path.values() for x in lat], sum(errors.values()), elapsed
+    )
+    return result
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def serve(app_path: str, port: int | None = None, env: dict | None = None, args: list[str] | None = None):
+    """Run ``uvicorn <app_path>`` in a subprocess and yield its base URL once /health answers."""
+    port = port or free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_path, "--port", str(port), "--log-level", "warning", *(args or [])],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **(env or {})},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"{base_url}/health", timeout=1.0)
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError(f"{app_path} did not start on port {port}")
+        yield base_url
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
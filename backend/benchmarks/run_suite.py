@@ -0,0 +1,184 @@
+"""Reproducible load test of the API hot paths.
+
+Seeds a dataset (benchmarks/seed.py), starts ``app.main:app`` with uvicorn
+against it and drives each scenario at each concurrency level:
+
+    login       POST /auth/login
+    read_heavy  GET /feed, /users/me, /admin/stats
+    mixed       all of the above, mostly reads
+
+Results (throughput, p50/p95/p99 per path) are written as JSON together with
+the commit, scale and machine they were measured on. Pass ``--baseline`` with
+an earlier result file to flag regressions (exit status 1):
+
+    python benchmarks/run_suite.py --output bench-before.json
+    git checkout my-branch
+    python benchmarks/run_suite.py --output bench-after.json --baseline bench-before.json
+
+Defaults to SQLite; set BENCH_DATABASE_URL=postgresql://... to match production.
+Size ``--workers`` like the target box (2 vCPU -> 2-3 workers).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine
+
+from app.core.security import create_access_token
+from benchmarks.loadgen import BACKEND_DIR, run_load, serve
+from benchmarks.seed import BENCH_PASSWORD, DEFAULT_DATABASE_URL, seed, user_email
+
+# path -> weight per scenario
+SCENARIOS = {
+    "login": {"/auth/login": 1},
+    "read_heavy": {"/feed": 60, "/users/me": 30, "/admin/stats": 10},
+    "mixed": {"/auth/login": 5, "/feed": 50, "/users/me": 35, "/admin/stats": 10},
+}
+# Requests per path to pre-build (distinct users/tokens) so caches see realistic key spread
+VARIANTS = 200
+
+
+def build_requests(path: str, users: int, admins: int, rng: random.Random) -> list[tuple[str, str, dict]]:
+    if path == "/auth/login":
+        return [
+            ("POST", path, {"json": {"email": user_email(rng.randint(1, users)), "password": BENCH_PASSWORD}})
+            for _ in range(VARIANTS)
+        ]
+    if path == "/admin/stats":
+        ids = [users + rng.randint(1, admins) for _ in range(VARIANTS)]
+        role = "admin"
+    elif path == "/feed":
+        # Mostly the first page, sometimes a little deeper
+        return [("GET", path, {"params": {"limit": 20}})] * (VARIANTS - 20) + [
+            ("GET", path, {"params": {"limit": 50}}) for _ in range(20)
+        ]
+    else:
+        ids = [rng.randint(1, users) for _ in range(VARIANTS)]
+        role = "user"
+    return [
+        ("GET", path, {"headers": {"Authorization": f"Bearer {create_access_token(user_id=i, role=role)}"}})
+        for i in ids
+    ]
+
+
+def build_mix(scenario: str, users: int, admins: int) -> tuple[list, list[float]]:
+    rng = random.Random(scenario)
+    requests, weights = [], []
+    for path, weight in SCENARIOS[scenario].items():
+        variants = build_requests(path, users, admins, rng)
+        requests.extend(variants)
+        weights.extend([weight / len(variants)] * len(variants))
+    return requests, weights
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[str]:
+    """Regressions beyond ``tolerance`` (fraction) in p95 latency or throughput."""
+    regressions = []
+    for scenario, levels in current["results"].items():
+        for concurrency, paths in levels.items():
+            before_paths = baseline.get("results", {}).get(scenario, {}).get(concurrency, {})
+            for path, after in paths.items():
+                before = before_paths.get(path)
+                if not before or not before["requests"]:
+                    continue
+                where = f"{scenario} c={concurrency} {path}"
+                if before["p95_ms"] and after["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                    regressions.append(f"{where}: p95 {before['p95_ms']}ms -> {after['p95_ms']}ms")
+                if after["rps"] < before["rps"] * (1 - tolerance):
+                    regressions.append(f"{where}: rps {before['rps']} -> {after['rps']}")
+                if after["errors"] > before["errors"]:
+                    regressions.append(f"{where}: errors {before['errors']} -> {after['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--admins", type=int, default=10)
+    parser.add_argument("--lessons", type=int, default=5_000)
+    parser.add_argument("--progress-per-user", type=int, default=20)
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="10,50,100")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    url = os.getenv("BENCH_DATABASE_URL", DEFAULT_DATABASE_URL)
+    if url.startswith("sqlite:///") and not url.startswith("sqlite:////"):
+        # The server runs from backend/; keep relative SQLite paths pointing at the same file
+        url = f"sqlite:///{(BACKEND_DIR / url[len('sqlite:///'):]).resolve()}"
+    if not args.skip_seed:
+        stats = seed(create_engine(url), args.users, args.lessons, args.progress_per_user, args.admins)
+        print(f"seeded in {stats['seconds']}s", file=sys.stderr)
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    levels = [int(c) for c in args.concurrency.split(",") if c]
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "database": url.split(":", 1)[0],
+            "workers": args.workers,
+            "duration": args.duration,
+            "scale": {
+                "users": args.users,
+                "admins": args.admins,
+                "lessons": args.lessons,
+                "progress_per_user": args.progress_per_user,
+            },
+        },
+        "results": {},
+    }
+
+    # Every virtual user logs in from 127.0.0.1; throughput, not throttling, is measured
+    env = {"DATABASE_URL": url, "ASYNC_DATABASE_URL": "", "RATE_LIMIT_ENABLED": "false"}
+    with serve("app.main:app", env=env, args=["--workers", str(args.workers)]) as base_url:
+        for scenario in scenarios:
+            requests, weights = build_mix(scenario, args.users, args.admins)
+            report["results"][scenario] = {}
+            for concurrency in levels:
+                asyncio.run(run_load(base_url, requests, concurrency, args.warmup, weights))
+                result = asyncio.run(run_load(base_url, requests, concurrency, args.duration, weights))
+                report["results"][scenario][str(concurrency)] = result
+                print(f"{scenario} c={concurrency}: {json.dumps(result['total'])}", file=sys.stderr)
+
+    body = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(body + "\n")
+    else:
+        print(body)
+
+    if args.baseline:
+        regressions = compare(json.loads(Path(args.baseline).read_text()), report, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Deterministic benchmark dataset: users, lessons, feed items and progress.
+
+    python benchmarks/seed.py --users 10000 --lessons 5000
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/seed.py
+
+Every user (``user{i}@bench.local``) and admin (``admin{i}@bench.local``) shares
+``BENCH_PASSWORD``; it is hashed once so seeding doesn't spend minutes in bcrypt.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, insert
+
+from app.core.hashing import get_password_hash
+from app.db.base import Base
+from app.models.feed_item import FeedItem
+from app.models.lesson import Lesson, make_excerpt
+from app.models.user import User
+from app.models.user_feed import UserFeedEntry  # noqa: F401 (registers table)
+from app.models.user_progress import UserProgress
+from app.services.personalization_service import LESSON_TYPES
+
+BENCH_PASSWORD = "bench-password"
+DEFAULT_DATABASE_URL = "sqlite:///bench.db"
+
+
+def user_email(i: int) -> str:
+    return f"user{i}@bench.local"
+
+
+def admin_email(i: int) -> str:
+    return f"admin{i}@bench.local"
+
+
+def seed(
+    engine,
+    users: int,
+    lessons: int,
+    progress_per_user: int,
+    admins: int = 1,
+    with_passwords: bool = True,
+    batch: int = 50_000,
+) -> dict:
+    """Drop and recreate all tables, then bulk insert the dataset. Same arguments -> same rows."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    rng = random.Random(42)
+    hashed = get_password_hash(BENCH_PASSWORD) if with_passwords else None
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for start in range(1, lessons + 1, batch):
+            ids = range(start, min(start + batch, lessons + 1))
+            lesson_rows = []
+            for i in ids:
+                content = f"Lesson {i} body. " * rng.randint(5, 50)
+                lesson_rows.append({
+                    "id": i,
+                    "title": f"Lesson {i}",
+                    "content": content,
+                    "excerpt": make_excerpt(content),
+                    "type": rng.choice(LESSON_TYPES),
+                })
+            conn.execute(insert(Lesson), lesson_rows)
+            conn.execute(insert(FeedItem), [
+                {"id": i, "lesson_id": i, "order": i, "content_type": "lesson"} for i in ids
+            ])
+        for start in range(1, users + 1, batch):
+            ids = range(start, min(start + batch, users + 1))
+            conn.execute(insert(User), [
+                {"id": i, "email": user_email(i), "hashed_password": hashed, "role": "user", "is_active": True}
+                for i in ids
+            ])
+        if admins:
+            conn.execute(insert(User), [
+                {"id": users + i, "email": admin_email(i), "hashed_password": hashed, "role": "admin", "is_active": True}
+                for i in range(1, admins + 1)
+            ])
+        rows = []
+        for user_id in range(1, users + 1):
+            for lesson_id in rng.sample(range(1, lessons + 1), min(progress_per_user, lessons)):
+                rows.append({"user_id": user_id, "lesson_id": lesson_id, "completed": rng.random() < 0.8})
+            if len(rows) >= batch:
+                conn.execute(insert(UserProgress), rows)
+                rows = []
+        if rows:
+            conn.execute(insert(UserProgress), rows)
+    return {
+        "users": users,
+        "admins": admins,
+        "lessons": lessons,
+        "progress_per_user": progress_per_user,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--admins", type=int, default=1)
+    parser.add_argument("--lessons", type=int, default=5_000)
+    parser.add_argument("--progress-per-user", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(os.getenv("BENCH_DATABASE_URL", DEFAULT_DATABASE_URL))
+    print(json.dumps(seed(engine, args.users, args.lessons, args.progress_per_user, args.admins), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Soak test for idle live connections (memory budget and heartbeats).
+
+Starts one uvicorn worker, opens --connections idle SSE streams (or WebSockets
+with --transport ws), holds them for --hold seconds and reads the worker's RSS
+and ``live_connections`` from /metrics before and after. Fails (exit 1) when:
+
+* RSS grew by more than --budget-kib per connection (default 64 KiB, the budget
+  documented in app/services/live_service.py);
+* the worker lost connections, or a connection missed a heartbeat.
+
+No database is needed: the live endpoints only verify the JWT.
+
+    ulimit -n 65536
+    python benchmarks/soak_live.py --connections 10000 --hold 60
+"""
+import argparse
+import asyncio
+import json
+import resource
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+
+from app.core.security import create_access_token
+from benchmarks.loadgen import serve
+
+OPEN_BATCH = 500
+
+
+def read_metrics(base_url: str) -> dict:
+    text = httpx.get(f"{base_url}/metrics", timeout=10).text
+    values = {}
+    for line in text.splitlines():
+        if line.startswith("process_resident_memory_bytes "):
+            values["rss"] = float(line.split()[1])
+        elif line.startswith("live_connections{"):
+            values["connections"] = values.get("connections", 0) + float(line.split()[1])
+    return values
+
+
+async def hold_sse(port: int, token: str, heartbeats: list, index: int, stop: asyncio.Event):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"GET /live/sse HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n"
+        f"Authorization: Bearer {token}\r\n\r\n".encode()
+    )
+    await writer.drain()
+    status = await reader.readline()
+    if b" 200 " not in status:
+        raise RuntimeError(f"SSE connection rejected: {status!r}")
+    try:
+        while not stop.is_set():
+            line = await reader.readline()
+            if not line:
+                return
+            if b": ping" in line:
+                heartbeats[index] += 1
+    finally:
+        writer.close()
+
+
+async def hold_ws(port: int, token: str, heartbeats: list, index: int, stop: asyncio.Event):
+    import websockets
+
+    async with websockets.connect(f"ws://127.0.0.1:{port}/live/ws?token={token}", ping_interval=None) as ws:
+        while not stop.is_set():
+            message = json.loads(await ws.recv())
+            if message["type"] == "ping":
+                heartbeats[index] += 1
+
+
+async def soak(base_url: str, args) -> dict:
+    port = int(base_url.rsplit(":", 1)[1])
+    hold = hold_ws if args.transport == "ws" else hold_sse
+    before = read_metrics(base_url)
+    heartbeats = [0] * args.connections
+    stop = asyncio.Event()
+    tasks = []
+    started = time.perf_counter()
+    for offset in range(0, args.connections, OPEN_BATCH):
+        for i in range(offset, min(offset + OPEN_BATCH, args.connections)):
+            # Spread connections over many users, like real traffic
+            token = create_access_token(user_id=i % 1000 + 1, role="user")
+            tasks.append(asyncio.create_task(hold(port, token, heartbeats, i, stop)))
+        await asyncio.sleep(0.05)
+    opened_in = time.perf_counter() - started
+    await asyncio.sleep(args.hold)
+    after = await asyncio.to_thread(read_metrics, base_url)
+    failed = sum(1 for t in tasks if t.done() and t.exception() is not None)
+    stop.set()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    grown = after.get("rss", 0) - before.get("rss", 0)
+    return {
+        "transport": args.transport,
+        "connections": args.connections,
+        "open_seconds": round(opened_in, 2),
+        "server_connections": after.get("connections", 0),
+        "failed": failed,
+        "missed_heartbeats": sum(1 for n in heartbeats if n == 0),
+        "rss_before_mib": round(before.get("rss", 0) / 1024 ** 2, 1),
+        "rss_after_mib": round(after.get("rss", 0) / 1024 ** 2, 1),
+        "kib_per_connection": round(grown / 1024 / args.connections, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=10_000)
+    parser.add_argument("--transport", choices=("sse", "ws"), default="sse")
+    parser.add_argument("--hold", type=float, default=30.0, help="seconds to hold idle connections")
+    parser.add_argument("--heartbeat", type=float, default=10.0)
+    parser.add_argument("--budget-kib", type=float, default=64.0)
+    args = parser.parse_args()
+    if args.hold <= args.heartbeat:
+        parser.error("--hold must be longer than --heartbeat")
+
+    # Both this process and the server (which inherits the limit) hold one fd per connection
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = args.connections + 1024
+    if soft < wanted:
+        if hard != resource.RLIM_INFINITY and hard < wanted:
+            sys.exit(f"RLIMIT_NOFILE hard limit {hard} is too low for {args.connections} connections")
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+    env = {
+        "LIVE_MAX_CONNECTIONS": str(args.connections),
+        "LIVE_HEARTBEAT_SECONDS": str(args.heartbeat),
+        "RESPONSE_COMPRESSION": "off",
+    }
+    with serve("app.main:app", env=env, args=["--backlog", "4096"]) as base_url:
+        result = asyncio.run(soak(base_url, args))
+    print(json.dumps(result, indent=2))
+
+    problems = []
+    if result["kib_per_connection"] > args.budget_kib:
+        problems.append(f"{result['kib_per_connection']} KiB/connection exceeds the {args.budget_kib} KiB budget")
+    if result["failed"] or result["server_connections"] < args.connections:
+        problems.append(f"{result['failed']} connections failed; server held {result['server_connections']:.0f}")
+    if result["missed_heartbeats"]:
+        problems.append(f"{result['missed_heartbeats']} connections saw no heartbeat")
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
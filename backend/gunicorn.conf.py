@@ -0,0 +1,82 @@
+"""Production server profile: ``gunicorn -c gunicorn.conf.py app.main:app``.
+
+* Uvicorn workers, one per CPU by default (``WEB_CONCURRENCY`` overrides). The
+  handlers are async and bcrypt runs in a separate process pool, so more
+  workers than cores only adds context switching.
+* ``preload_app``: ``app.main`` and the heavy auth libraries it loads lazily
+  are imported once in the master and shared copy-on-write by the workers;
+  ``gc.freeze()`` keeps the collector from touching (and un-sharing) them.
+* Workers are recycled after ``GUNICORN_MAX_REQUESTS`` (+ jitter, so they
+  don't all restart together) and get ``graceful_timeout`` to drain.
+* ``WEB_CONCURRENCY`` is exported before the app is imported, so each worker's
+  DB pools are sized from the shared connection budget (app/db/session.py).
+* ``METRICS_MULTIPROC_DIR`` (a fresh temp dir unless set) collects every
+  worker's metric snapshots, so a scrape of ``/metrics`` covers all workers;
+  an exited worker's counters are folded into the archive there.
+"""
+import gc
+import importlib
+import os
+import tempfile
+from pathlib import Path
+
+workers = int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)
+os.environ["WEB_CONCURRENCY"] = str(workers)
+if not os.getenv("METRICS_MULTIPROC_DIR"):
+    os.environ["METRICS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="metrics-")
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+accesslog = None
+errorlog = "-"
+
+# Imported by request handlers on first use; load them before forking instead
+PRELOAD_MODULES = (
+    "jose.jwt",
+    "passlib.context",
+    "passlib.handlers.bcrypt",
+    "jose.jwk",
+    "jose.backends",
+)
+
+
+def when_ready(server):
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            server.log.warning(f"Could not preload {name}: {e}")
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Preloaded app; starting {workers} workers")
+
+
+def on_starting(server):
+    # Snapshots from a previous run would be merged into this one's totals
+    directory = Path(os.environ["METRICS_MULTIPROC_DIR"])
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in directory.glob("*.json"):
+        path.unlink(missing_ok=True)
+
+
+def child_exit(server, worker):
+    from app.core.metrics import mark_process_dead
+
+    mark_process_dead(os.environ["METRICS_MULTIPROC_DIR"], worker.pid)
+
+
+def post_fork(server, worker):
+    # Never share pooled DB sockets or Redis clients with the master
+    from app.core import redis
+    from app.db.session import async_engine, engine
+
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    redis._client = None
+    redis._async_client = None
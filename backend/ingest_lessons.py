@@ -0,0 +1,50 @@
+"""Bulk-load a lesson catalog (JSONL or CSV) into lessons + feed_items.
+
+    python ingest_lessons.py catalog.jsonl
+    python ingest_lessons.py catalog.csv --format csv --batch-size 10000
+    python ingest_lessons.py catalog.jsonl --resume 12   # continue job 12
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add the parent directory to sys.path so we can import app modules
+sys.path.append(str(Path(__file__).parent))
+
+from app.db.session import SessionLocal
+from app.models.ingestion_job import IngestionJob
+from app.services.ingestion_service import IngestionService
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source")
+    parser.add_argument("--format", choices=["jsonl", "csv"])
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--resume", type=int, help="ID of an interrupted ingestion job to continue")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.source.endswith(".csv") else "jsonl")
+    service = IngestionService(batch_size=args.batch_size)
+    db = SessionLocal()
+    try:
+        if args.resume:
+            job = db.get(IngestionJob, args.resume)
+            if job is None:
+                sys.exit(f"Ingestion job {args.resume} not found")
+            print(f"Resuming job {job.id} after {job.rows_committed} rows")
+        else:
+            job = service.create_job(db, str(Path(args.source).resolve()), fmt)
+            print(f"Created ingestion job {job.id}")
+        service.run(
+            db,
+            job,
+            progress=lambda rows, rate: print(f"\r{rows} rows committed ({rate:.0f} rows/s)", end="", flush=True),
+        )
+        print(f"\nDone: {job.rows_committed} rows, {job.rows_rejected} rejected")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""ResponseCache against fakeredis (through ``redis_factory``) and its in-process fallback."""
+import asyncio
+
+import fakeredis
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import cache as local_cache
+from app.core.response_cache import CachedResponder, CachedValue, ResponseCache, cache_response
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class Counter:
+    """Compute function that records how often it ran."""
+
+    def __init__(self, payload=None, delay: float = 0.0, release: asyncio.Event | None = None):
+        self.payload = payload if payload is not None else {"items": [1, 2, 3]}
+        self.delay = delay
+        self.release = release
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.payload
+
+
+class BrokenRedis:
+    """Every command fails, like a Redis that went away."""
+
+    def __getattr__(self, name):
+        async def fail(*args, **kwargs):
+            raise ConnectionError("redis down")
+        return fail
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def redis_cache(server, **kwargs) -> ResponseCache:
+    # One client per cache instance, created lazily on the test's event loop
+    clients = []
+
+    def factory():
+        if not clients:
+            clients.append(fakeredis.FakeAsyncRedis(server=server))
+        return clients[0]
+
+    return ResponseCache(redis_factory=factory, **kwargs)
+
+
+def local_only_cache(**kwargs) -> ResponseCache:
+    return ResponseCache(redis_factory=lambda: None, **kwargs)
+
+
+def test_miss_then_hit(server):
+    cache = redis_cache(server)
+    compute = Counter()
+
+    async def scenario():
+        first = await cache.get_or_compute("k", 30, compute)
+        second = await cache.get_or_compute("k", 30, compute)
+        return first, second
+
+    first, second = run(scenario())
+    assert compute.calls == 1
+    assert first.body == second.body == b'{"items":[1,2,3]}'
+    assert first.etag == second.etag
+
+
+def test_value_is_shared_through_redis(server):
+    # Two workers: the second finds the first one's value without computing
+    compute = Counter()
+    run(redis_cache(server).get_or_compute("k", 30, compute))
+    run(redis_cache(server).get_or_compute("k", 30, compute))
+    assert compute.calls == 1
+
+
+def test_redis_ttl_expiry(server):
+    cache = redis_cache(server)
+    compute = Counter()
+
+    async def scenario():
+        await cache.get_or_compute("k", 1, compute)
+        ttl = await cache._redis_factory().pttl(cache._key("k"))
+        await asyncio.sleep(1.1)
+        await cache.get_or_compute("k", 1, compute)
+        return ttl
+
+    ttl = run(scenario())
+    assert 0 < ttl <= 1000
+    assert compute.calls == 2
+
+
+def test_local_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(local_cache.time, "monotonic", lambda: now[0])
+    cache = local_only_cache()
+    compute = Counter()
+
+    run(cache.get_or_compute("k", 30, compute))
+    now[0] += 29
+    run(cache.get_or_compute("k", 30, compute))
+    assert compute.calls == 1
+    now[0] += 2
+    run(cache.get_or_compute("k", 30, compute))
+    assert compute.calls == 2
+
+
+def test_single_flight_within_a_worker():
+    cache = local_only_cache()
+    release = asyncio.Event()
+    compute = Counter(release=release)
+
+    async def scenario():
+        waiters = [asyncio.create_task(cache.get_or_compute("k", 30, compute)) for _ in range(20)]
+        await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.gather(*waiters)
+
+    values = run(scenario())
+    assert compute.calls == 1
+    assert len({v.etag for v in values}) == 1
+    assert cache._inflight == {}
+
+
+def test_single_flight_error_reaches_every_waiter():
+    cache = local_only_cache()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("db down")
+
+    async def scenario():
+        return await asyncio.gather(
+            *(cache.get_or_compute("k", 30, failing) for _ in range(5)), return_exceptions=True
+        )
+
+    results = run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    # A failed compute is not cached
+    assert run(cache.get("k")) is None
+
+
+def test_leader_cancellation_does_not_fail_waiters():
+    cache = local_only_cache()
+    leader_compute = Counter(release=asyncio.Event())  # never released
+    waiter_compute = Counter(payload={"from": "waiter"})
+
+    async def scenario():
+        leader = asyncio.create_task(cache.get_or_compute("k", 30, leader_compute))
+        await asyncio.sleep(0.01)
+        waiters = [asyncio.create_task(cache.get_or_compute("k", 30, waiter_compute)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        values = await asyncio.gather(*waiters)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return values
+
+    values = run(scenario())
+    # One waiter took over; the rest joined it
+    assert waiter_compute.calls == 1
+    assert all(v.body == b'{"from":"waiter"}' for v in values)
+    assert cache._inflight == {}
+
+
+def test_cancelled_waiter_leaves_leader_running():
+    cache = local_only_cache()
+    release = asyncio.Event()
+    compute = Counter(release=release)
+
+    async def scenario():
+        leader = asyncio.create_task(cache.get_or_compute("k", 30, compute))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.get_or_compute("k", 30, compute))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        release.set()
+        return await leader
+
+    assert run(scenario()).body == b'{"items":[1,2,3]}'
+    assert compute.calls == 1
+
+
+def test_cross_worker_lock(server):
+    worker_a, worker_b = redis_cache(server), redis_cache(server)
+    release = asyncio.Event()
+    compute_a = Counter(payload={"worker": "a"}, release=release)
+    compute_b = Counter(payload={"worker": "b"})
+
+    async def scenario():
+        a = asyncio.create_task(worker_a.get_or_compute("k", 30, compute_a))
+        await asyncio.sleep(0.01)
+        # A holds the lock: B polls for A's value instead of computing
+        assert await worker_a._redis_factory().exists(worker_a._key("lock:k"))
+        b = asyncio.create_task(worker_b.get_or_compute("k", 30, compute_b))
+        await asyncio.sleep(0.1)
+        release.set()
+        values = await asyncio.gather(a, b)
+        lock_left = await worker_a._redis_factory().exists(worker_a._key("lock:k"))
+        return values, lock_left
+
+    (value_a, value_b), lock_left = run(scenario())
+    assert compute_a.calls == 1
+    assert compute_b.calls == 0
+    assert value_a.body == value_b.body == b'{"worker":"a"}'
+    assert not lock_left
+
+
+def test_peer_lock_released_without_value(server):
+    # The lock holder gave up (or died and the lock was released): compute locally
+    cache = redis_cache(server)
+    compute = Counter()
+
+    async def scenario():
+        r = cache._redis_factory()
+        await r.set(cache._key("lock:k"), "someone-else", px=200)
+        return await cache.get_or_compute("k", 30, compute)
+
+    value = run(scenario())
+    assert compute.calls == 1
+    assert value.body == b'{"items":[1,2,3]}'
+
+
+def test_lru_fallback_when_redis_fails():
+    cache = ResponseCache(redis_factory=BrokenRedis)
+    compute = Counter()
+
+    first = run(cache.get_or_compute("k", 30, compute))
+    second = run(cache.get_or_compute("k", 30, compute))
+    assert compute.calls == 1
+    assert second.body == first.body
+    assert cache.local.get("k").etag == first.etag
+
+
+def test_lru_evicts_least_recently_used():
+    cache = local_only_cache(local_size=2)
+    for key in ("a", "b"):
+        run(cache.set(key, CachedValue.from_body(key.encode()), 30))
+    run(cache.get("a"))
+    run(cache.set("c", CachedValue.from_body(b"c"), 30))
+    assert run(cache.get("b")) is None
+    assert run(cache.get("a")).body == b"a"
+
+
+def test_delete_invalidates_redis_and_local(server):
+    cache = redis_cache(server)
+    compute = Counter()
+    run(cache.get_or_compute("k", 30, compute))
+    run(cache.delete("k"))
+    run(cache.get_or_compute("k", 30, compute))
+    assert compute.calls == 2
+
+
+@pytest.fixture
+def client():
+    cache = local_only_cache()
+    compute = Counter()
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items(
+        a: int | None = None,
+        b: int | None = None,
+        responder: CachedResponder = Depends(cache_response("items", ttl=30, cache=cache)),
+    ):
+        return await responder.respond(compute, headers={"Cache-Control": "private, no-cache"})
+
+    with TestClient(app) as test_client:
+        yield test_client, compute
+
+
+def test_etag_and_304(client):
+    test_client, compute = client
+    first = test_client.get("/items")
+    assert first.status_code == 200
+    assert first.json() == {"items": [1, 2, 3]}
+    etag = first.headers["etag"]
+
+    second = test_client.get("/items", headers={"If-None-Match": f'"other", {etag}'})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+    assert second.headers["cache-control"] == "private, no-cache"
+
+    stale = test_client.get("/items", headers={"If-None-Match": '"other"'})
+    assert stale.status_code == 200
+    assert compute.calls == 1
+
+
+def test_declared_query_params_are_part_of_the_key(client):
+    test_client, compute = client
+    test_client.get("/items?b=2&a=1")
+    test_client.get("/items?a=1&b=2")
+    assert compute.calls == 1
+    test_client.get("/items?a=2")
+    assert compute.calls == 2
+
+
+def test_unknown_query_params_share_an_entry(client):
+    test_client, compute = client
+    for buster in range(5):
+        test_client.get(f"/items?a=1&_={buster}")
+    assert compute.calls == 1
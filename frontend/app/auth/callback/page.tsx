@@ -4,6 +4,7 @@ import { useEffect } from 'react';
 import { useRouter, useSearchParams } from 'next/navigation';
 
 import { useAuth } from '@/context/AuthContext';
+import { exchangeOAuthCode } from '@/lib/auth';
 
 export default function AuthCallback() {
   const { loginWithToken } = useAuth();
@@ -11,13 +12,15 @@ export default function AuthCallback() {
   const searchParams = useSearchParams();
 
   useEffect(() => {
-    const token = searchParams.get('access_token');
+    const code = searchParams.get('code');
 
     async function handleCallback() {
-      if (token) {
+      if (code) {
         try {
+          // The redirect only carries a one-time code; tokens come back over POST
+          const tokens = await exchangeOAuthCode(code);
           // Use Context to login so state is updated immediately
-          const user = await loginWithToken(token);
+          const user = await loginWithToken(tokens.access_token);
 
           // Role-based redirect
           if (user.role === 'super admin') router.push('/superadmin');
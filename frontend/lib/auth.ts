@@ -15,6 +15,14 @@ export async function register(email: string, password: string) {
   });
 }
 
+// Trade the one-time code from the OAuth redirect for the token pair
+export async function exchangeOAuthCode(code: string) {
+  return apiFetch("/auth/oauth/token", {
+    method: "POST",
+    body: JSON.stringify({ code }),
+  });
+}
+
 // NEW: Fetch current user
 export async function getCurrentUser(token: string) {
   // Using fetch directly for the /users/me endpoint with Authorization header